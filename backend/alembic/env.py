@@ -27,10 +27,10 @@ from app.models.virtual_card import VirtualCard
 from app.models.payment_method import PaymentMethod
 from app.models.transaction import Transaction
 
-from app.core.config import settings
+from app.core.config import DATABASE_URL
 
 def get_url():
-    return str(settings.SQLALCHEMY_DATABASE_URI)
+    return DATABASE_URL
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -50,6 +50,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
     )
 
     with context.begin_transaction():
@@ -61,6 +62,7 @@ def do_run_migrations(connection: Connection) -> None:
         connection=connection,
         target_metadata=target_metadata,
         compare_type=True,
+        render_as_batch=True,
     )
 
     with context.begin_transaction():
@@ -4,84 +4,163 @@ Revision ID: 0004
 Revises: ab67cb520665
 Create Date: 2025-02-08 19:26:14.000000
 
+The NOT NULL columns are added nullable and without a default, which is a
+catalog-only change. Existing rows are then backfilled in id batches outside
+the migration transaction and the constraints are applied last. Writers are
+only blocked for the catalog updates and the SET NOT NULL validation scan
+(roughly a second per million cards); there is no table rewrite.
+
 """
 from alembic import op
 import sqlalchemy as sa
 from sqlalchemy.dialects import postgresql
 
+from app.db.migration_utils import (
+    JSONB,
+    add_backfilled_columns,
+    drop_columns,
+    is_postgresql,
+    is_squashed,
+)
+
 # revision identifiers, used by Alembic.
 revision = '0004'
 down_revision = '0003'
 branch_labels = None
 depends_on = None
 
+# GIN indexes backing the authorization-time ``@>`` containment checks on the
+# merchant/geographic list columns
+JSONB_LIST_INDEXES = {
+    'ix_vcards_allowed_mcats': 'allowed_merchant_categories',
+    'ix_vcards_blocked_mcats': 'blocked_merchant_categories',
+    'ix_vcards_allowed_merchants': 'allowed_merchants',
+    'ix_vcards_blocked_merchants': 'blocked_merchants',
+    'ix_vcards_allowed_countries': 'allowed_countries',
+    'ix_vcards_blocked_countries': 'blocked_countries',
+}
+
+# Server defaults for the NOT NULL columns, applied after the backfill
+NOT_NULL_DEFAULTS = {
+    'status': 'active',
+    'spending_limits': '{}',
+    'current_spend': '{}',
+    'last_spend_reset': '{}',
+    'allowed_merchant_categories': '[]',
+    'blocked_merchant_categories': '[]',
+    'allowed_merchants': '[]',
+    'blocked_merchants': '[]',
+    'allowed_countries': '[]',
+    'blocked_countries': '[]',
+    'allow_online_transactions': 'true',
+    'allow_contactless_transactions': 'true',
+    'allow_cash_withdrawals': 'false',
+    'allow_international_transactions': 'false',
+    'failed_transaction_count': '0',
+    'total_transaction_count': '0',
+    'total_spend': '0',
+}
+
 def upgrade():
+    # Applied by 0004a on fresh databases migrated with -x squash=1
+    if is_squashed():
+        return
+
     # Create CardStatus enum type
-    card_status = postgresql.ENUM('active', 'frozen', 'cancelled', 'expired', name='cardstatus')
+    # create_type=False keeps the column DDL below from emitting CREATE TYPE again
+    card_status = postgresql.ENUM('active', 'frozen', 'cancelled', 'expired', name='cardstatus', create_type=False)
     card_status.create(op.get_bind())
     
-    # Remove is_active column and add status column
-    op.drop_column('virtual_cards', 'is_active')
-    op.add_column('virtual_cards', sa.Column('status', sa.Enum('active', 'frozen', 'cancelled', 'expired', name='cardstatus'), nullable=False, server_default='active'))
-    
-    # Add spending limits and current spend
-    op.add_column('virtual_cards', sa.Column('spending_limits', postgresql.JSONB, nullable=False, server_default='{}'))
-    op.add_column('virtual_cards', sa.Column('current_spend', postgresql.JSONB, nullable=False, server_default='{}'))
-    op.add_column('virtual_cards', sa.Column('last_spend_reset', postgresql.JSONB, nullable=False, server_default='{}'))
-    
-    # Add merchant controls
-    op.add_column('virtual_cards', sa.Column('allowed_merchant_categories', postgresql.JSONB, nullable=False, server_default='[]'))
-    op.add_column('virtual_cards', sa.Column('blocked_merchant_categories', postgresql.JSONB, nullable=False, server_default='[]'))
-    op.add_column('virtual_cards', sa.Column('allowed_merchants', postgresql.JSONB, nullable=False, server_default='[]'))
-    op.add_column('virtual_cards', sa.Column('blocked_merchants', postgresql.JSONB, nullable=False, server_default='[]'))
-    
-    # Add geographic controls
-    op.add_column('virtual_cards', sa.Column('allowed_countries', postgresql.JSONB, nullable=False, server_default='[]'))
-    op.add_column('virtual_cards', sa.Column('blocked_countries', postgresql.JSONB, nullable=False, server_default='[]'))
-    
-    # Add transaction controls
-    op.add_column('virtual_cards', sa.Column('allow_online_transactions', sa.Boolean(), nullable=False, server_default='true'))
-    op.add_column('virtual_cards', sa.Column('allow_contactless_transactions', sa.Boolean(), nullable=False, server_default='true'))
-    op.add_column('virtual_cards', sa.Column('allow_cash_withdrawals', sa.Boolean(), nullable=False, server_default='false'))
-    op.add_column('virtual_cards', sa.Column('allow_international_transactions', sa.Boolean(), nullable=False, server_default='false'))
+    # Drop is_active and add all new columns in one ALTER TABLE (one batch on SQLite)
+    add_backfilled_columns(
+        'virtual_cards',
+        [
+            sa.Column('status', card_status, nullable=True),
+
+            # Add spending limits and current spend
+            sa.Column('spending_limits', JSONB, nullable=True),
+            sa.Column('current_spend', JSONB, nullable=True),
+            sa.Column('last_spend_reset', JSONB, nullable=True),
+
+            # Add merchant controls
+            sa.Column('allowed_merchant_categories', JSONB, nullable=True),
+            sa.Column('blocked_merchant_categories', JSONB, nullable=True),
+            sa.Column('allowed_merchants', JSONB, nullable=True),
+            sa.Column('blocked_merchants', JSONB, nullable=True),
+
+            # Add geographic controls
+            sa.Column('allowed_countries', JSONB, nullable=True),
+            sa.Column('blocked_countries', JSONB, nullable=True),
+
+            # Add transaction controls
+            sa.Column('allow_online_transactions', sa.Boolean(), nullable=True),
+            sa.Column('allow_contactless_transactions', sa.Boolean(), nullable=True),
+            sa.Column('allow_cash_withdrawals', sa.Boolean(), nullable=True),
+            sa.Column('allow_international_transactions', sa.Boolean(), nullable=True),
+
+            # Add card usage statistics
+            sa.Column('last_transaction_at', sa.DateTime(), nullable=True),
+            sa.Column('failed_transaction_count', sa.Integer(), nullable=True),
+            sa.Column('total_transaction_count', sa.Integer(), nullable=True),
+            sa.Column('total_spend', sa.Numeric(10, 2), nullable=True)
+        ],
+        NOT_NULL_DEFAULTS,
+        drop=['is_active']
+    )
     
-    # Add card usage statistics
-    op.add_column('virtual_cards', sa.Column('last_transaction_at', sa.DateTime(), nullable=True))
-    op.add_column('virtual_cards', sa.Column('failed_transaction_count', sa.Integer(), nullable=False, server_default='0'))
-    op.add_column('virtual_cards', sa.Column('total_transaction_count', sa.Integer(), nullable=False, server_default='0'))
-    op.add_column('virtual_cards', sa.Column('total_spend', sa.Numeric(10, 2), nullable=False, server_default='0'))
+    # CONCURRENTLY cannot run inside a transaction block
+    if is_postgresql():
+        with op.get_context().autocommit_block():
+            for index_name, column in JSONB_LIST_INDEXES.items():
+                op.execute(f'CREATE INDEX CONCURRENTLY {index_name} ON virtual_cards USING GIN ({column} jsonb_path_ops)')
 
 def downgrade():
-    # Remove card usage statistics
-    op.drop_column('virtual_cards', 'total_spend')
-    op.drop_column('virtual_cards', 'total_transaction_count')
-    op.drop_column('virtual_cards', 'failed_transaction_count')
-    op.drop_column('virtual_cards', 'last_transaction_at')
-    
-    # Remove transaction controls
-    op.drop_column('virtual_cards', 'allow_international_transactions')
-    op.drop_column('virtual_cards', 'allow_cash_withdrawals')
-    op.drop_column('virtual_cards', 'allow_contactless_transactions')
-    op.drop_column('virtual_cards', 'allow_online_transactions')
-    
-    # Remove geographic controls
-    op.drop_column('virtual_cards', 'blocked_countries')
-    op.drop_column('virtual_cards', 'allowed_countries')
-    
-    # Remove merchant controls
-    op.drop_column('virtual_cards', 'blocked_merchants')
-    op.drop_column('virtual_cards', 'allowed_merchants')
-    op.drop_column('virtual_cards', 'blocked_merchant_categories')
-    op.drop_column('virtual_cards', 'allowed_merchant_categories')
+    if is_squashed():
+        return
+
+    # Drop JSONB list indexes
+    if is_postgresql():
+        with op.get_context().autocommit_block():
+            for index_name in JSONB_LIST_INDEXES:
+                op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index_name}')
     
-    # Remove spending limits and current spend
-    op.drop_column('virtual_cards', 'last_spend_reset')
-    op.drop_column('virtual_cards', 'current_spend')
-    op.drop_column('virtual_cards', 'spending_limits')
+    # Drop all added columns in one ALTER TABLE
+    drop_columns(
+        'virtual_cards',
+        # Remove card usage statistics
+        'total_spend',
+        'total_transaction_count',
+        'failed_transaction_count',
+        'last_transaction_at',
+
+        # Remove transaction controls
+        'allow_international_transactions',
+        'allow_cash_withdrawals',
+        'allow_contactless_transactions',
+        'allow_online_transactions',
+
+        # Remove geographic controls
+        'blocked_countries',
+        'allowed_countries',
+
+        # Remove merchant controls
+        'blocked_merchants',
+        'allowed_merchants',
+        'blocked_merchant_categories',
+        'allowed_merchant_categories',
+
+        # Remove spending limits and current spend
+        'last_spend_reset',
+        'current_spend',
+        'spending_limits',
+
+        # Remove status
+        'status'
+    )
     
-    # Remove status and add back is_active
-    op.drop_column('virtual_cards', 'status')
+    # Add back is_active
     op.add_column('virtual_cards', sa.Column('is_active', sa.Boolean(), nullable=False, server_default='true'))
     
     # Drop CardStatus enum type
-    op.execute('DROP TYPE cardstatus')
+    if is_postgresql():
+        op.execute('DROP TYPE cardstatus')
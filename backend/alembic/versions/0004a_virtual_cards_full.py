@@ -0,0 +1,171 @@
+"""squashed virtual card and transaction enhancements
+
+Revision ID: 0004a
+Revises: 0004
+Create Date: 2025-02-08 19:50:00.000000
+
+Squashed form of 0004, 0005 and 0007 for fresh databases. It only runs with
+``alembic upgrade head -x squash=1``, in which case those three revisions
+are skipped. Instead of their add / backfill / set-not-null sequences, each
+table gets its final columns, defaults and constraints in a single ALTER
+TABLE, and the indexes are built directly on the empty tables. Without the
+flag this revision does nothing and the original chain runs unchanged.
+
+Downgrading a squashed database needs the same ``-x squash=1`` flag.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.db.migration_utils import (
+    JSONB,
+    add_column_clause,
+    add_columns,
+    alter_table,
+    drop_columns,
+    is_postgresql,
+    is_squashed,
+)
+
+# revision identifiers, used by Alembic.
+revision = '0004a'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+# GIN indexes on the virtual card list and limit columns (0004, 0007)
+JSONB_INDEXES = {
+    'ix_vcards_allowed_mcats': 'allowed_merchant_categories',
+    'ix_vcards_blocked_mcats': 'blocked_merchant_categories',
+    'ix_vcards_allowed_merchants': 'allowed_merchants',
+    'ix_vcards_blocked_merchants': 'blocked_merchants',
+    'ix_vcards_allowed_countries': 'allowed_countries',
+    'ix_vcards_blocked_countries': 'blocked_countries',
+    'ix_vcards_category_spending_limits': 'category_spending_limits',
+    'ix_vcards_subcategory_spending_limits': 'subcategory_spending_limits',
+}
+
+def virtual_card_columns(card_status):
+    return [
+        sa.Column('status', card_status, nullable=False, server_default='active'),
+
+        # Spending limits and current spend
+        sa.Column('spending_limits', JSONB, nullable=False, server_default='{}'),
+        sa.Column('current_spend', JSONB, nullable=False, server_default='{}'),
+        sa.Column('last_spend_reset', JSONB, nullable=False, server_default='{}'),
+
+        # Merchant controls
+        sa.Column('allowed_merchant_categories', JSONB, nullable=False, server_default='[]'),
+        sa.Column('blocked_merchant_categories', JSONB, nullable=False, server_default='[]'),
+        sa.Column('allowed_merchants', JSONB, nullable=False, server_default='[]'),
+        sa.Column('blocked_merchants', JSONB, nullable=False, server_default='[]'),
+
+        # Geographic controls
+        sa.Column('allowed_countries', JSONB, nullable=False, server_default='[]'),
+        sa.Column('blocked_countries', JSONB, nullable=False, server_default='[]'),
+
+        # Transaction controls
+        sa.Column('allow_online_transactions', sa.Boolean(), nullable=False, server_default='true'),
+        sa.Column('allow_contactless_transactions', sa.Boolean(), nullable=False, server_default='true'),
+        sa.Column('allow_cash_withdrawals', sa.Boolean(), nullable=False, server_default='false'),
+        sa.Column('allow_international_transactions', sa.Boolean(), nullable=False, server_default='false'),
+
+        # Card usage statistics
+        sa.Column('last_transaction_at', sa.DateTime(), nullable=True),
+        sa.Column('failed_transaction_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_transaction_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_spend', sa.Numeric(10, 2), nullable=False, server_default='0'),
+
+        # Category-specific spending limits (0007)
+        sa.Column('category_spending_limits', JSONB, server_default='{}'),
+        sa.Column('category_current_spend', JSONB, server_default='{}'),
+        sa.Column('category_last_spend_reset', JSONB, server_default='{}'),
+        sa.Column('subcategory_spending_limits', JSONB, server_default='{}'),
+        sa.Column('subcategory_current_spend', JSONB, server_default='{}'),
+        sa.Column('subcategory_last_spend_reset', JSONB, server_default='{}'),
+        sa.Column('category_transaction_counts', JSONB, server_default='{}'),
+        sa.Column('subcategory_transaction_counts', JSONB, server_default='{}'),
+    ]
+
+def transaction_columns():
+    return [
+        # Merchant fields
+        sa.Column('merchant_id', sa.String(64), nullable=True),
+        sa.Column('merchant_country', sa.String(2), nullable=True),
+
+        # Transaction characteristics
+        sa.Column('is_online', sa.Boolean(), nullable=False, server_default='false'),
+        sa.Column('is_international', sa.Boolean(), nullable=False, server_default='false'),
+        sa.Column('is_contactless', sa.Boolean(), nullable=False, server_default='false'),
+        sa.Column('is_recurring', sa.Boolean(), nullable=False, server_default='false'),
+
+        # Location data
+        sa.Column('location_city', sa.String(128), nullable=True),
+        sa.Column('location_country', sa.String(2), nullable=True),
+        sa.Column('location_postal_code', sa.String(16), nullable=True),
+        sa.Column('location_lat', sa.Double(), nullable=True),
+        sa.Column('location_lon', sa.Double(), nullable=True),
+
+        # Risk indicators
+        sa.Column('risk_score', sa.SmallInteger(), nullable=True),
+        sa.Column('risk_factors', JSONB, nullable=True),
+
+        # Error handling
+        sa.Column('decline_reason', sa.String(128), nullable=True),
+        sa.Column('error_code', sa.String(16), nullable=True),
+        sa.Column('error_message', sa.String(), nullable=True),
+    ]
+
+def upgrade():
+    if not is_squashed():
+        return
+
+    card_status = postgresql.ENUM('active', 'frozen', 'cancelled', 'expired', name='cardstatus', create_type=False)
+    card_status.create(op.get_bind())
+
+    if is_postgresql():
+        op.execute("ALTER TYPE transactiontype ADD VALUE IF NOT EXISTS 'withdrawal'")
+
+        # One ALTER TABLE per table: the swap from is_active to status plus every new column
+        alter_table(
+            'virtual_cards',
+            ['DROP COLUMN is_active'] + [add_column_clause(column) for column in virtual_card_columns(card_status)]
+        )
+        alter_table('transactions', [add_column_clause(column) for column in transaction_columns()])
+    else:
+        with op.batch_alter_table('virtual_cards') as batch_op:
+            batch_op.drop_column('is_active')
+            for column in virtual_card_columns(card_status):
+                batch_op.add_column(column)
+        add_columns('transactions', *transaction_columns())
+
+    # The tables are empty on a fresh database, so plain index builds are instant
+    if is_postgresql():
+        for index_name, column in JSONB_INDEXES.items():
+            op.create_index(index_name, 'virtual_cards', [column], postgresql_using='gin', postgresql_ops={column: 'jsonb_path_ops'})
+
+    op.create_index('ix_tx_risk_high', 'transactions', ['risk_score'], postgresql_where=sa.text('risk_score > 70'), sqlite_where=sa.text('risk_score > 70'))
+    op.create_index('ix_tx_merchant_country', 'transactions', ['merchant_country'], postgresql_where=sa.text('merchant_country IS NOT NULL'), sqlite_where=sa.text('merchant_country IS NOT NULL'))
+    op.create_index('ix_tx_intl', 'transactions', ['created_at'], postgresql_where=sa.text('is_international = true'), sqlite_where=sa.text('is_international = true'))
+
+def downgrade():
+    if not is_squashed():
+        return
+
+    op.drop_index('ix_tx_intl', table_name='transactions')
+    op.drop_index('ix_tx_merchant_country', table_name='transactions')
+    op.drop_index('ix_tx_risk_high', table_name='transactions')
+
+    if is_postgresql():
+        for index_name in JSONB_INDEXES:
+            op.drop_index(index_name, table_name='virtual_cards')
+
+    drop_columns('transactions', *(column.name for column in transaction_columns()))
+    drop_columns('virtual_cards', *(column.name for column in virtual_card_columns(None)))
+    op.add_column('virtual_cards', sa.Column('is_active', sa.Boolean(), nullable=False, server_default='true'))
+
+    if is_postgresql():
+        op.execute('DROP TYPE cardstatus')
+
+    # Note: Cannot remove enum value in downgrade, as it might be in use
@@ -1,75 +1,123 @@
 """enhance transactions
 
 Revision ID: 0005
-Revises: 0004
+Revises: 0004a
 Create Date: 2025-02-08 19:26:14.000000
 
+The NOT NULL flag columns follow the same add-nullable / backfill /
+set-not-null sequence as 0004, so transactions is never rewritten.
+
 """
 from alembic import op
 import sqlalchemy as sa
 from sqlalchemy.dialects import postgresql
 
+from app.db.migration_utils import (
+    JSONB,
+    add_backfilled_columns,
+    drop_columns,
+    is_postgresql,
+    is_squashed,
+)
+
 # revision identifiers, used by Alembic.
 revision = '0005'
-down_revision = '0004'
+down_revision = '0004a'
 branch_labels = None
 depends_on = None
 
+# Server defaults for the NOT NULL columns, applied after the backfill
+NOT_NULL_DEFAULTS = {
+    'is_online': 'false',
+    'is_international': 'false',
+    'is_contactless': 'false',
+    'is_recurring': 'false',
+}
+
 def upgrade():
+    # Applied by 0004a on fresh databases migrated with -x squash=1
+    if is_squashed():
+        return
+
     # Add new transaction type
-    op.execute("ALTER TYPE transactiontype ADD VALUE IF NOT EXISTS 'withdrawal'")
-    
-    # Add merchant fields
-    op.add_column('transactions', sa.Column('merchant_id', sa.String(), nullable=True))
-    op.add_column('transactions', sa.Column('merchant_country', sa.String(2), nullable=True))
+    if is_postgresql():
+        op.execute("ALTER TYPE transactiontype ADD VALUE IF NOT EXISTS 'withdrawal'")
     
-    # Add transaction characteristics
-    op.add_column('transactions', sa.Column('is_online', sa.Boolean(), nullable=False, server_default='false'))
-    op.add_column('transactions', sa.Column('is_international', sa.Boolean(), nullable=False, server_default='false'))
-    op.add_column('transactions', sa.Column('is_contactless', sa.Boolean(), nullable=False, server_default='false'))
-    op.add_column('transactions', sa.Column('is_recurring', sa.Boolean(), nullable=False, server_default='false'))
-    
-    # Add location data
-    op.add_column('transactions', sa.Column('location_city', sa.String(), nullable=True))
-    op.add_column('transactions', sa.Column('location_country', sa.String(2), nullable=True))
-    op.add_column('transactions', sa.Column('location_postal_code', sa.String(), nullable=True))
-    op.add_column('transactions', sa.Column('location_lat', sa.Numeric(9, 6), nullable=True))
-    op.add_column('transactions', sa.Column('location_lon', sa.Numeric(9, 6), nullable=True))
-    
-    # Add risk indicators
-    op.add_column('transactions', sa.Column('risk_score', sa.Integer(), nullable=True))
-    op.add_column('transactions', sa.Column('risk_factors', sa.String(), nullable=True))
+    add_backfilled_columns(
+        'transactions',
+        [
+            # Add merchant fields
+            sa.Column('merchant_id', sa.String(64), nullable=True),
+            sa.Column('merchant_country', sa.String(2), nullable=True),
+
+            # Add transaction characteristics
+            sa.Column('is_online', sa.Boolean(), nullable=True),
+            sa.Column('is_international', sa.Boolean(), nullable=True),
+            sa.Column('is_contactless', sa.Boolean(), nullable=True),
+            sa.Column('is_recurring', sa.Boolean(), nullable=True),
+
+            # Add location data
+            sa.Column('location_city', sa.String(128), nullable=True),
+            sa.Column('location_country', sa.String(2), nullable=True),
+            sa.Column('location_postal_code', sa.String(16), nullable=True),
+            sa.Column('location_lat', sa.Double(), nullable=True),
+            sa.Column('location_lon', sa.Double(), nullable=True),
+
+            # Add risk indicators
+            sa.Column('risk_score', sa.SmallInteger(), nullable=True),
+            sa.Column('risk_factors', JSONB, nullable=True),
+
+            # Add error handling
+            sa.Column('decline_reason', sa.String(128), nullable=True),
+            sa.Column('error_code', sa.String(16), nullable=True),
+            sa.Column('error_message', sa.String(), nullable=True)
+        ],
+        NOT_NULL_DEFAULTS
+    )
     
-    # Add error handling
-    op.add_column('transactions', sa.Column('decline_reason', sa.String(), nullable=True))
-    op.add_column('transactions', sa.Column('error_code', sa.String(), nullable=True))
-    op.add_column('transactions', sa.Column('error_message', sa.String(), nullable=True))
+    # Partial indexes for fraud review and geo analytics; only the matching rows are indexed
+    with op.get_context().autocommit_block():
+        op.create_index('ix_tx_risk_high', 'transactions', ['risk_score'], postgresql_where=sa.text('risk_score > 70'), sqlite_where=sa.text('risk_score > 70'), postgresql_concurrently=True)
+        op.create_index('ix_tx_merchant_country', 'transactions', ['merchant_country'], postgresql_where=sa.text('merchant_country IS NOT NULL'), sqlite_where=sa.text('merchant_country IS NOT NULL'), postgresql_concurrently=True)
+        op.create_index('ix_tx_intl', 'transactions', ['created_at'], postgresql_where=sa.text('is_international = true'), sqlite_where=sa.text('is_international = true'), postgresql_concurrently=True)
 
 def downgrade():
-    # Drop error handling
-    op.drop_column('transactions', 'error_message')
-    op.drop_column('transactions', 'error_code')
-    op.drop_column('transactions', 'decline_reason')
-    
-    # Drop risk indicators
-    op.drop_column('transactions', 'risk_factors')
-    op.drop_column('transactions', 'risk_score')
-    
-    # Drop location data
-    op.drop_column('transactions', 'location_lon')
-    op.drop_column('transactions', 'location_lat')
-    op.drop_column('transactions', 'location_postal_code')
-    op.drop_column('transactions', 'location_country')
-    op.drop_column('transactions', 'location_city')
-    
-    # Drop transaction characteristics
-    op.drop_column('transactions', 'is_recurring')
-    op.drop_column('transactions', 'is_contactless')
-    op.drop_column('transactions', 'is_international')
-    op.drop_column('transactions', 'is_online')
+    if is_squashed():
+        return
+
+    # Drop partial indexes
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tx_intl', table_name='transactions', postgresql_concurrently=True)
+        op.drop_index('ix_tx_merchant_country', table_name='transactions', postgresql_concurrently=True)
+        op.drop_index('ix_tx_risk_high', table_name='transactions', postgresql_concurrently=True)
     
-    # Drop merchant fields
-    op.drop_column('transactions', 'merchant_country')
-    op.drop_column('transactions', 'merchant_id')
+    drop_columns(
+        'transactions',
+        # Drop error handling
+        'error_message',
+        'error_code',
+        'decline_reason',
+
+        # Drop risk indicators
+        'risk_factors',
+        'risk_score',
+
+        # Drop location data
+        'location_lon',
+        'location_lat',
+        'location_postal_code',
+        'location_country',
+        'location_city',
+
+        # Drop transaction characteristics
+        'is_recurring',
+        'is_contactless',
+        'is_international',
+        'is_online',
+
+        # Drop merchant fields
+        'merchant_country',
+        'merchant_id'
+    )
     
     # Note: Cannot remove enum value in downgrade, as it might be in use
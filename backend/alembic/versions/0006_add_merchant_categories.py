@@ -5,17 +5,92 @@ Revises: 0005
 Create Date: 2025-02-08 19:45:00.000000
 
 """
+import json
+
 from alembic import op
 import sqlalchemy as sa
 from sqlalchemy.dialects import postgresql
 
+from app.db.types import Ltree
+
 # revision identifiers, used by Alembic.
 revision = '0006'
 down_revision = '0005'
 branch_labels = None
 depends_on = None
 
+SEED_COLUMNS = ('code', 'name', 'description', 'path', 'level', 'keywords', 'mcc_codes')
+
+# (code, name, description, path, level, keywords, mcc_codes)
+ROOT_CATEGORIES = [
+    ('retail', 'Retail', 'Retail goods and services', 'retail', 0,
+     ["shop", "store", "retail", "market", "outlet"],
+     ["5999"]),
+    ('food_and_drink', 'Food & Drink', 'Food and beverage services', 'food_and_drink', 0,
+     ["restaurant", "food", "cafe", "bar", "dining"],
+     ["5812", "5813", "5814"]),
+    ('travel', 'Travel', 'Travel and transportation services', 'travel', 0,
+     ["airline", "hotel", "travel", "transportation", "car rental"],
+     ["4511", "7011", "7512"]),
+    ('entertainment', 'Entertainment', 'Entertainment and recreation', 'entertainment', 0,
+     ["movie", "theater", "concert", "event", "game"],
+     ["7832", "7922", "7929"]),
+    ('services', 'Services', 'Professional and personal services', 'services', 0,
+     ["service", "professional", "consulting", "repair", "maintenance"],
+     ["7299"]),
+    ('healthcare', 'Healthcare', 'Medical and healthcare services', 'healthcare', 0,
+     ["medical", "doctor", "hospital", "clinic", "pharmacy"],
+     ["8011", "8021", "8031", "8041", "8042", "8043", "8049", "8062", "8071", "8099"]),
+]
+
+# Rows per INSERT statement; each chunk commits on its own
+SEED_CHUNK_SIZE = 500
+
+merchant_categories_table = sa.table(
+    'merchant_categories',
+    sa.column('code', sa.String()),
+    sa.column('name', sa.String()),
+    sa.column('description', sa.String()),
+    sa.column('path', Ltree()),
+    sa.column('level', sa.Integer()),
+    sa.column('keywords', postgresql.JSONB(astext_type=sa.Text())),
+    sa.column('mcc_codes', postgresql.JSONB(astext_type=sa.Text())),
+)
+
+def chunked(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def ltree_literal(value):
+    return sa.cast(sa.literal(value), Ltree())
+
+def jsonb_literal(value):
+    # Cast from JSON text so the statement also renders in --sql (offline) mode
+    return sa.cast(sa.literal(json.dumps(value)), postgresql.JSONB(astext_type=sa.Text()))
+
+def seed_merchant_categories(rows):
+    """
+    Load seed rows outside the migration transaction.
+
+    Rows go in as chunked multi-row INSERTs that skip existing codes, so a
+    failed run can simply be re-run.
+    """
+    with op.get_context().autocommit_block():
+        for chunk in chunked(rows, SEED_CHUNK_SIZE):
+            values = [
+                dict(zip(SEED_COLUMNS, row[:3] + (ltree_literal(row[3]), row[4], jsonb_literal(row[5]), jsonb_literal(row[6]))))
+                for row in chunk
+            ]
+            op.execute(
+                postgresql.insert(merchant_categories_table)
+                .values(values)
+                .on_conflict_do_nothing(index_elements=['code'])
+            )
+
 def upgrade():
+    # Native tree operators (<@, @>, ~) for the category path
+    op.execute("CREATE EXTENSION IF NOT EXISTS ltree")
+
     # Create merchant_categories table
     op.create_table(
         'merchant_categories',
@@ -24,57 +99,43 @@ def upgrade():
         sa.Column('name', sa.String(), nullable=False),
         sa.Column('description', sa.String(), nullable=True),
         sa.Column('parent_id', sa.Integer(), nullable=True),
-        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('path', Ltree(), nullable=False),
         sa.Column('level', sa.Integer(), nullable=False),
-        sa.Column('mcc_codes', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+        sa.Column('mcc_codes', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
         sa.Column('is_high_risk', sa.Boolean(), nullable=False, server_default='false'),
         sa.Column('requires_additional_verification', sa.Boolean(), nullable=False, server_default='false'),
-        sa.Column('allowed_card_schemes', postgresql.JSON(astext_type=sa.Text()), nullable=True),
-        sa.Column('keywords', postgresql.JSON(astext_type=sa.Text()), nullable=True),
-        sa.Column('similar_words', postgresql.JSON(astext_type=sa.Text()), nullable=True),
-        sa.Column('excluded_words', postgresql.JSON(astext_type=sa.Text()), nullable=True),
-        sa.Column('typical_amount_range', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+        sa.Column('allowed_card_schemes', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('keywords', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('similar_words', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('excluded_words', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('typical_amount_range', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
         sa.Column('typical_frequency', sa.String(), nullable=True),
-        sa.Column('common_payment_methods', postgresql.JSON(astext_type=sa.Text()), nullable=True),
-        sa.Column('restricted_jurisdictions', postgresql.JSON(astext_type=sa.Text()), nullable=True),
-        sa.Column('required_licenses', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+        sa.Column('common_payment_methods', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('restricted_jurisdictions', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('required_licenses', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
         sa.Column('aml_risk_level', sa.String(), nullable=True),
         sa.ForeignKeyConstraint(['parent_id'], ['merchant_categories.id'], ),
         sa.PrimaryKeyConstraint('id')
     )
     op.create_index(op.f('ix_merchant_categories_code'), 'merchant_categories', ['code'], unique=True)
     op.create_index(op.f('ix_merchant_categories_id'), 'merchant_categories', ['id'], unique=False)
+    
+    # GIN indexes for keyword / MCC containment lookups during categorization
+    op.create_index('ix_mc_keywords_gin', 'merchant_categories', ['keywords'], postgresql_using='gin', postgresql_ops={'keywords': 'jsonb_path_ops'})
+    op.create_index('ix_mc_mcc_codes_gin', 'merchant_categories', ['mcc_codes'], postgresql_using='gin', postgresql_ops={'mcc_codes': 'jsonb_path_ops'})
+    op.create_index('ix_mc_similar_gin', 'merchant_categories', ['similar_words'], postgresql_using='gin', postgresql_ops={'similar_words': 'jsonb_path_ops'})
+
+    # GiST index so subtree lookups (path <@ 'retail') avoid a sequential scan
+    op.create_index('ix_mc_path_gist', 'merchant_categories', ['path'], postgresql_using='gist')
 
     # Insert root categories
-    op.execute("""
-    INSERT INTO merchant_categories (code, name, description, path, level, keywords, mcc_codes)
-    VALUES
-    ('retail', 'Retail', 'Retail goods and services', 'retail', 0, 
-     '["shop", "store", "retail", "market", "outlet"]'::jsonb, 
-     '["5999"]'::jsonb),
-    
-    ('food_and_drink', 'Food & Drink', 'Food and beverage services', 'food_and_drink', 0,
-     '["restaurant", "food", "cafe", "bar", "dining"]'::jsonb,
-     '["5812", "5813", "5814"]'::jsonb),
-    
-    ('travel', 'Travel', 'Travel and transportation services', 'travel', 0,
-     '["airline", "hotel", "travel", "transportation", "car rental"]'::jsonb,
-     '["4511", "7011", "7512"]'::jsonb),
-    
-    ('entertainment', 'Entertainment', 'Entertainment and recreation', 'entertainment', 0,
-     '["movie", "theater", "concert", "event", "game"]'::jsonb,
-     '["7832", "7922", "7929"]'::jsonb),
-    
-    ('services', 'Services', 'Professional and personal services', 'services', 0,
-     '["service", "professional", "consulting", "repair", "maintenance"]'::jsonb,
-     '["7299"]'::jsonb),
-    
-    ('healthcare', 'Healthcare', 'Medical and healthcare services', 'healthcare', 0,
-     '["medical", "doctor", "hospital", "clinic", "pharmacy"]'::jsonb,
-     '["8011", "8021", "8031", "8041", "8042", "8043", "8049", "8062", "8071", "8099"]'::jsonb)
-    """)
+    seed_merchant_categories(ROOT_CATEGORIES)
 
 def downgrade():
+    op.drop_index('ix_mc_path_gist', table_name='merchant_categories')
+    op.drop_index('ix_mc_similar_gin', table_name='merchant_categories')
+    op.drop_index('ix_mc_mcc_codes_gin', table_name='merchant_categories')
+    op.drop_index('ix_mc_keywords_gin', table_name='merchant_categories')
     op.drop_index(op.f('ix_merchant_categories_id'), table_name='merchant_categories')
     op.drop_index(op.f('ix_merchant_categories_code'), table_name='merchant_categories')
     op.drop_table('merchant_categories')
@@ -4,43 +4,101 @@ Revision ID: 0007
 Revises: 0006
 Create Date: 2025-02-08 19:47:00.000000
 
+Columns are added without a default and backfilled in batches (see 0004)
+so virtual_cards is never rewritten.
+
 """
 from alembic import op
 import sqlalchemy as sa
 from sqlalchemy.dialects import postgresql
 
+from app.db.migration_utils import (
+    JSONB,
+    add_backfilled_columns,
+    drop_columns,
+    is_postgresql,
+    is_squashed,
+)
+
 # revision identifiers, used by Alembic.
 revision = '0007'
 down_revision = '0006'
 branch_labels = None
 depends_on = None
 
+# GIN indexes backing ``@>`` lookups on the per-category limit maps
+JSONB_INDEXES = {
+    'ix_vcards_category_spending_limits': 'category_spending_limits',
+    'ix_vcards_subcategory_spending_limits': 'subcategory_spending_limits',
+}
+
+# Server defaults, applied once the columns exist
+COLUMN_DEFAULTS = {
+    'category_spending_limits': '{}',
+    'category_current_spend': '{}',
+    'category_last_spend_reset': '{}',
+    'subcategory_spending_limits': '{}',
+    'subcategory_current_spend': '{}',
+    'subcategory_last_spend_reset': '{}',
+    'category_transaction_counts': '{}',
+    'subcategory_transaction_counts': '{}',
+}
+
 def upgrade():
-    # Add new columns for category-specific spending limits
-    op.add_column('virtual_cards', sa.Column('category_spending_limits', postgresql.JSON(astext_type=sa.Text()), server_default='{}'))
-    op.add_column('virtual_cards', sa.Column('category_current_spend', postgresql.JSON(astext_type=sa.Text()), server_default='{}'))
-    op.add_column('virtual_cards', sa.Column('category_last_spend_reset', postgresql.JSON(astext_type=sa.Text()), server_default='{}'))
-    
-    # Add new columns for subcategory-specific spending limits
-    op.add_column('virtual_cards', sa.Column('subcategory_spending_limits', postgresql.JSON(astext_type=sa.Text()), server_default='{}'))
-    op.add_column('virtual_cards', sa.Column('subcategory_current_spend', postgresql.JSON(astext_type=sa.Text()), server_default='{}'))
-    op.add_column('virtual_cards', sa.Column('subcategory_last_spend_reset', postgresql.JSON(astext_type=sa.Text()), server_default='{}'))
+    # Applied by 0004a on fresh databases migrated with -x squash=1
+    if is_squashed():
+        return
+
+    add_backfilled_columns(
+        'virtual_cards',
+        [
+            # Add new columns for category-specific spending limits
+            sa.Column('category_spending_limits', JSONB),
+            sa.Column('category_current_spend', JSONB),
+            sa.Column('category_last_spend_reset', JSONB),
+
+            # Add new columns for subcategory-specific spending limits
+            sa.Column('subcategory_spending_limits', JSONB),
+            sa.Column('subcategory_current_spend', JSONB),
+            sa.Column('subcategory_last_spend_reset', JSONB),
+
+            # Add columns for transaction tracking
+            sa.Column('category_transaction_counts', JSONB),
+            sa.Column('subcategory_transaction_counts', JSONB)
+        ],
+        COLUMN_DEFAULTS,
+        not_null=False
+    )
     
-    # Add columns for transaction tracking
-    op.add_column('virtual_cards', sa.Column('category_transaction_counts', postgresql.JSON(astext_type=sa.Text()), server_default='{}'))
-    op.add_column('virtual_cards', sa.Column('subcategory_transaction_counts', postgresql.JSON(astext_type=sa.Text()), server_default='{}'))
+    # CONCURRENTLY cannot run inside a transaction block
+    if is_postgresql():
+        with op.get_context().autocommit_block():
+            for index_name, column in JSONB_INDEXES.items():
+                op.execute(f'CREATE INDEX CONCURRENTLY {index_name} ON virtual_cards USING GIN ({column} jsonb_path_ops)')
 
 def downgrade():
-    # Remove category-specific columns
-    op.drop_column('virtual_cards', 'category_spending_limits')
-    op.drop_column('virtual_cards', 'category_current_spend')
-    op.drop_column('virtual_cards', 'category_last_spend_reset')
-    
-    # Remove subcategory-specific columns
-    op.drop_column('virtual_cards', 'subcategory_spending_limits')
-    op.drop_column('virtual_cards', 'subcategory_current_spend')
-    op.drop_column('virtual_cards', 'subcategory_last_spend_reset')
+    if is_squashed():
+        return
+
+    # Drop JSONB indexes
+    if is_postgresql():
+        with op.get_context().autocommit_block():
+            for index_name in JSONB_INDEXES:
+                op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index_name}')
     
-    # Remove transaction tracking columns
-    op.drop_column('virtual_cards', 'category_transaction_counts')
-    op.drop_column('virtual_cards', 'subcategory_transaction_counts')
+    drop_columns(
+        'virtual_cards',
+        # Remove category-specific columns
+        'category_spending_limits',
+        'category_current_spend',
+        'category_last_spend_reset',
+
+        # Remove subcategory-specific columns
+        'subcategory_spending_limits',
+        'subcategory_current_spend',
+        'subcategory_last_spend_reset',
+
+        # Remove transaction tracking columns
+        'category_transaction_counts',
+        'subcategory_transaction_counts'
+    )
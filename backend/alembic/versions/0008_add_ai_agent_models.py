@@ -10,6 +10,8 @@ import sqlalchemy as sa
 from sqlalchemy.dialects import postgresql
 from sqlalchemy import text
 
+from app.db.migration_utils import add_foreign_keys
+
 # revision identifiers, used by Alembic.
 revision = '0008'
 down_revision = '0007'
@@ -17,33 +19,17 @@ branch_labels = None
 depends_on = None
 
 def upgrade():
-    # Create enum types
+    # Create enum types that don't exist yet, in a single round-trip
     connection = op.get_bind()
-    
-    # Create agent_status enum if it doesn't exist
     connection.execute(text("""
         DO $$ 
         BEGIN 
             IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'agent_status') THEN
                 CREATE TYPE agent_status AS ENUM ('active', 'inactive', 'suspended');
             END IF;
-        END $$;
-    """))
-    
-    # Create transaction_status enum if it doesn't exist
-    connection.execute(text("""
-        DO $$ 
-        BEGIN 
             IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'transaction_status') THEN
                 CREATE TYPE transaction_status AS ENUM ('pending', 'approved', 'rejected', 'failed', 'completed');
             END IF;
-        END $$;
-    """))
-    
-    # Create risk_level enum if it doesn't exist
-    connection.execute(text("""
-        DO $$ 
-        BEGIN 
             IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'risk_level') THEN
                 CREATE TYPE risk_level AS ENUM ('low', 'medium', 'high', 'critical');
             END IF;
@@ -64,10 +50,10 @@ def upgrade():
         sa.Column('current_monthly_spend', sa.Numeric(precision=10, scale=2), nullable=True),
         sa.Column('last_daily_reset', sa.DateTime(), nullable=True),
         sa.Column('last_monthly_reset', sa.DateTime(), nullable=True),
-        sa.Column('allowed_merchant_categories', sa.JSON(), nullable=True),
-        sa.Column('blocked_merchant_categories', sa.JSON(), nullable=True),
-        sa.Column('allowed_merchants', sa.JSON(), nullable=True),
-        sa.Column('blocked_merchants', sa.JSON(), nullable=True),
+        sa.Column('allowed_merchant_categories', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('blocked_merchant_categories', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('allowed_merchants', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('blocked_merchants', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
         sa.Column('max_transaction_amount', sa.Numeric(precision=10, scale=2), nullable=True),
         sa.Column('require_approval_above', sa.Numeric(precision=10, scale=2), nullable=True),
         sa.Column('total_spend', sa.Numeric(precision=10, scale=2), nullable=True),
@@ -77,8 +63,6 @@ def upgrade():
         sa.Column('updated_at', sa.DateTime(), nullable=True),
         sa.PrimaryKeyConstraint('id')
     )
-    op.create_index(op.f('ix_ai_agents_id'), 'ai_agents', ['id'], unique=False)
-    op.create_index(op.f('ix_ai_agents_openai_assistant_id'), 'ai_agents', ['openai_assistant_id'], unique=True)
     
     # Create agent_transactions table
     op.create_table(
@@ -92,37 +76,98 @@ def upgrade():
         sa.Column('merchant_category', sa.String(), nullable=True),
         sa.Column('merchant_id', sa.String(), nullable=True),
         sa.Column('status', postgresql.ENUM('pending', 'approved', 'rejected', 'failed', 'completed', name='transaction_status', create_type=False), nullable=True),
-        sa.Column('external_transaction_id', sa.String(), nullable=True),
-        sa.Column('conversation_context', sa.JSON(), nullable=True),
-        sa.Column('decision_reasoning', sa.JSON(), nullable=True),
+        sa.Column('external_transaction_id', sa.String(length=64), nullable=True),
+        sa.Column('conversation_context', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('decision_reasoning', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
         sa.Column('user_intent', sa.String(), nullable=True),
-        sa.Column('risk_score', sa.Integer(), nullable=True),
+        sa.Column('risk_score', sa.SmallInteger(), nullable=True),
         sa.Column('risk_level', postgresql.ENUM('low', 'medium', 'high', 'critical', name='risk_level', create_type=False), nullable=True),
-        sa.Column('risk_factors', sa.JSON(), nullable=True),
-        sa.Column('validation_results', sa.JSON(), nullable=True),
-        sa.Column('validation_errors', sa.JSON(), nullable=True),
+        sa.Column('risk_factors', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('validation_results', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('validation_errors', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
         sa.Column('requires_manual_review', sa.Boolean(), nullable=True),
         sa.Column('manual_review_reason', sa.String(), nullable=True),
         sa.Column('created_at', sa.DateTime(), nullable=True),
         sa.Column('updated_at', sa.DateTime(), nullable=True),
         sa.Column('completed_at', sa.DateTime(), nullable=True),
-        sa.ForeignKeyConstraint(['agent_id'], ['ai_agents.id'], ),
-        sa.ForeignKeyConstraint(['virtual_card_id'], ['virtual_cards.id'], ),
         sa.PrimaryKeyConstraint('id')
     )
-    op.create_index(op.f('ix_agent_transactions_id'), 'agent_transactions', ['id'], unique=False)
+    # Foreign keys go in NOT VALID and are validated without blocking writes
+    add_foreign_keys('agent_transactions', {
+        'fk_agent_tx_agent': ('agent_id', 'ai_agents.id'),
+        'fk_agent_tx_vcard': ('virtual_card_id', 'virtual_cards.id'),
+    })
     
     # Create agent_virtual_cards association table
     op.create_table(
         'agent_virtual_cards',
         sa.Column('agent_id', sa.Integer(), nullable=False),
         sa.Column('virtual_card_id', sa.Integer(), nullable=False),
-        sa.ForeignKeyConstraint(['agent_id'], ['ai_agents.id'], ),
-        sa.ForeignKeyConstraint(['virtual_card_id'], ['virtual_cards.id'], ),
         sa.PrimaryKeyConstraint('agent_id', 'virtual_card_id')
     )
+    add_foreign_keys('agent_virtual_cards', {
+        'fk_agent_vcards_agent': ('agent_id', 'ai_agents.id'),
+        'fk_agent_vcards_vcard': ('virtual_card_id', 'virtual_cards.id'),
+    })
+    
+    # CONCURRENTLY builds take SHARE UPDATE EXCLUSIVE instead of blocking writes,
+    # but cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_ai_agents_id'), 'ai_agents', ['id'], unique=False, postgresql_concurrently=True)
+        # NULLs never conflict, so only assigned assistant ids are indexed
+        op.create_index(
+            op.f('ix_ai_agents_openai_assistant_id'),
+            'ai_agents',
+            ['openai_assistant_id'],
+            unique=True,
+            postgresql_where=sa.text('openai_assistant_id IS NOT NULL'),
+            postgresql_concurrently=True
+        )
+        
+        op.create_index(op.f('ix_agent_transactions_id'), 'agent_transactions', ['id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_agent_transactions_agent_created', 'agent_transactions', ['agent_id', sa.text('created_at DESC')], postgresql_concurrently=True)
+        op.create_index('ix_agent_transactions_vcard_created', 'agent_transactions', ['virtual_card_id', sa.text('created_at DESC')], postgresql_concurrently=True)
+        # Rows arrive in created_at order, so a BRIN covers global time sweeps at a fraction of a B-tree's size
+        op.create_index(
+            'ix_agent_tx_created_brin',
+            'agent_transactions',
+            ['created_at'],
+            postgresql_using='brin',
+            postgresql_with={'pages_per_range': 32},
+            postgresql_concurrently=True
+        )
+        # Unique among set ids so payment processor callbacks can upsert via ON CONFLICT
+        op.create_index(
+            'ix_agent_transactions_external_id',
+            'agent_transactions',
+            ['external_transaction_id'],
+            unique=True,
+            postgresql_where=sa.text('external_transaction_id IS NOT NULL'),
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_agent_transactions_status',
+            'agent_transactions',
+            ['status'],
+            postgresql_where=sa.text("status IN ('pending', 'failed')"),
+            postgresql_concurrently=True
+        )
+        
+        # The composite PK only serves agent_id lookups
+        op.create_index('ix_agent_vcards_card', 'agent_virtual_cards', ['virtual_card_id'], postgresql_concurrently=True)
 
 def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_agent_vcards_card', table_name='agent_virtual_cards', postgresql_concurrently=True)
+        op.drop_index('ix_agent_transactions_status', table_name='agent_transactions', postgresql_concurrently=True)
+        op.drop_index('ix_agent_transactions_external_id', table_name='agent_transactions', postgresql_concurrently=True)
+        op.drop_index('ix_agent_tx_created_brin', table_name='agent_transactions', postgresql_concurrently=True)
+        op.drop_index('ix_agent_transactions_vcard_created', table_name='agent_transactions', postgresql_concurrently=True)
+        op.drop_index('ix_agent_transactions_agent_created', table_name='agent_transactions', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_agent_transactions_id'), table_name='agent_transactions', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_ai_agents_openai_assistant_id'), table_name='ai_agents', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_ai_agents_id'), table_name='ai_agents', postgresql_concurrently=True)
+    
     # Drop tables
     op.drop_table('agent_virtual_cards')
     op.drop_table('agent_transactions')
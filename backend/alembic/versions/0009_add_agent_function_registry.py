@@ -9,6 +9,8 @@ from alembic import op
 import sqlalchemy as sa
 from sqlalchemy.dialects import postgresql
 
+from app.db.migration_utils import add_foreign_keys
+
 # revision identifiers, used by Alembic.
 revision = '0009'
 down_revision = '0008'
@@ -22,18 +24,16 @@ def upgrade():
         sa.Column('id', sa.Integer(), nullable=False),
         sa.Column('name', sa.String(), nullable=False),
         sa.Column('description', sa.String(), nullable=False),
-        sa.Column('parameters_schema', sa.JSON(), nullable=False),
-        sa.Column('return_schema', sa.JSON(), nullable=True),
+        sa.Column('parameters_schema', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('return_schema', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
         sa.Column('is_active', sa.Boolean(), default=True),
         sa.Column('requires_approval', sa.Boolean(), default=False),
-        sa.Column('required_permissions', sa.JSON(), default=list),
+        sa.Column('required_permissions', postgresql.JSONB(astext_type=sa.Text()), default=list),
         sa.Column('version', sa.Integer(), default=1),
         sa.Column('created_at', sa.DateTime(), nullable=True),
         sa.Column('updated_at', sa.DateTime(), nullable=True),
         sa.PrimaryKeyConstraint('id')
     )
-    op.create_index(op.f('ix_agent_functions_id'), 'agent_functions', ['id'], unique=False)
-    op.create_index(op.f('ix_agent_functions_name'), 'agent_functions', ['name'], unique=True)
 
     # Create function_permissions table
     op.create_table(
@@ -42,12 +42,14 @@ def upgrade():
         sa.Column('function_id', sa.Integer(), nullable=False),
         sa.Column('agent_type', sa.String(), nullable=False),
         sa.Column('permission_level', sa.String(), nullable=False),
-        sa.Column('conditions', sa.JSON(), nullable=True),
+        sa.Column('conditions', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
         sa.Column('created_at', sa.DateTime(), nullable=True),
-        sa.ForeignKeyConstraint(['function_id'], ['agent_functions.id'], ),
         sa.PrimaryKeyConstraint('id')
     )
-    op.create_index(op.f('ix_function_permissions_id'), 'function_permissions', ['id'], unique=False)
+    # Foreign keys go in NOT VALID and are validated without blocking writes
+    add_foreign_keys('function_permissions', {
+        'fk_func_perm_function': ('function_id', 'agent_functions.id'),
+    })
 
     # Create function_usage_stats table
     op.create_table(
@@ -62,17 +64,34 @@ def upgrade():
         sa.Column('last_called_at', sa.DateTime()),
         sa.Column('created_at', sa.DateTime(), nullable=True),
         sa.Column('updated_at', sa.DateTime(), nullable=True),
-        sa.ForeignKeyConstraint(['agent_id'], ['ai_agents.id'], ),
-        sa.ForeignKeyConstraint(['function_id'], ['agent_functions.id'], ),
         sa.PrimaryKeyConstraint('id')
     )
-    op.create_index(op.f('ix_function_usage_stats_id'), 'function_usage_stats', ['id'], unique=False)
+    add_foreign_keys('function_usage_stats', {
+        'fk_func_usage_function': ('function_id', 'agent_functions.id'),
+        'fk_func_usage_agent': ('agent_id', 'ai_agents.id'),
+    })
+
+    # CONCURRENTLY builds take SHARE UPDATE EXCLUSIVE instead of blocking writes,
+    # but cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_agent_functions_id'), 'agent_functions', ['id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_agent_functions_name'), 'agent_functions', ['name'], unique=True, postgresql_concurrently=True)
+        op.create_index(op.f('ix_function_permissions_id'), 'function_permissions', ['id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_func_perm_function', 'function_permissions', ['function_id'], postgresql_concurrently=True)
+        op.create_index(op.f('ix_function_usage_stats_id'), 'function_usage_stats', ['id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_func_usage_function_agent', 'function_usage_stats', ['function_id', 'agent_id'], postgresql_concurrently=True)
+        op.create_index('ix_func_usage_agent', 'function_usage_stats', ['agent_id'], postgresql_concurrently=True)
 
 def downgrade():
-    op.drop_index(op.f('ix_function_usage_stats_id'), table_name='function_usage_stats')
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_func_usage_agent', table_name='function_usage_stats', postgresql_concurrently=True)
+        op.drop_index('ix_func_usage_function_agent', table_name='function_usage_stats', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_function_usage_stats_id'), table_name='function_usage_stats', postgresql_concurrently=True)
+        op.drop_index('ix_func_perm_function', table_name='function_permissions', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_function_permissions_id'), table_name='function_permissions', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_agent_functions_name'), table_name='agent_functions', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_agent_functions_id'), table_name='agent_functions', postgresql_concurrently=True)
+
     op.drop_table('function_usage_stats')
-    op.drop_index(op.f('ix_function_permissions_id'), table_name='function_permissions')
     op.drop_table('function_permissions')
-    op.drop_index(op.f('ix_agent_functions_name'), table_name='agent_functions')
-    op.drop_index(op.f('ix_agent_functions_id'), table_name='agent_functions')
     op.drop_table('agent_functions') 
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""add BRIN index on transactions.created_at
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2025-02-12 10:00:00.000000
+
+transactions is append-only, so created_at follows the physical row order
+and a BRIN index serves time-range scans while staying a few pages in size.
+
+"""
+from alembic import op
+
+from app.db.migration_utils import is_postgresql
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if not is_postgresql():
+        return
+
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tx_created_brin',
+            'transactions',
+            ['created_at'],
+            postgresql_using='brin',
+            postgresql_with={'pages_per_range': 32},
+            postgresql_concurrently=True
+        )
+
+def downgrade():
+    if not is_postgresql():
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tx_created_brin', table_name='transactions', postgresql_concurrently=True)
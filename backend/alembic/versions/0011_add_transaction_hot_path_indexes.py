@@ -0,0 +1,31 @@
+"""add composite indexes for transaction hot paths
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2025-02-12 11:00:00.000000
+
+Covers per-user and per-card history reads (newest first) and per-user
+category breakdowns, which otherwise scan the whole transactions table.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index('ix_tx_user_created', 'transactions', ['user_id', sa.text('created_at DESC')], postgresql_concurrently=True)
+        op.create_index('ix_tx_vcard_created', 'transactions', ['virtual_card_id', sa.text('created_at DESC')], postgresql_concurrently=True)
+        op.create_index('ix_tx_user_merchant_cat', 'transactions', ['user_id', 'merchant_category'], postgresql_concurrently=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tx_user_merchant_cat', table_name='transactions', postgresql_concurrently=True)
+        op.drop_index('ix_tx_vcard_created', table_name='transactions', postgresql_concurrently=True)
+        op.drop_index('ix_tx_user_created', table_name='transactions', postgresql_concurrently=True)
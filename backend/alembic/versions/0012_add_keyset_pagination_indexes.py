@@ -0,0 +1,33 @@
+"""add keyset pagination indexes
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2025-02-13 10:00:00.000000
+
+Per-user transaction and payment method lists page on (created_at, id)
+newest first. The id column joins ix_tx_user_created so the tie-breaker is
+served by the index too; the narrower index is dropped once the new one
+is in place.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index('ix_tx_user_created_id', 'transactions', ['user_id', sa.text('created_at DESC'), sa.text('id DESC')], postgresql_concurrently=True)
+        op.drop_index('ix_tx_user_created', table_name='transactions', postgresql_concurrently=True)
+        op.create_index('ix_pm_user_created_id', 'payment_methods', ['user_id', sa.text('created_at DESC'), sa.text('id DESC')], postgresql_concurrently=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_pm_user_created_id', table_name='payment_methods', postgresql_concurrently=True)
+        op.create_index('ix_tx_user_created', 'transactions', ['user_id', sa.text('created_at DESC')], postgresql_concurrently=True)
+        op.drop_index('ix_tx_user_created_id', table_name='transactions', postgresql_concurrently=True)
@@ -0,0 +1,28 @@
+"""add owner index on virtual cards
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2025-02-14 09:00:00.000000
+
+Card lists and active-card lookups filter virtual_cards on user_id (and
+status), which had no index beyond the primary key. Ownership checks probe
+the primary key and need nothing new; per-user and per-card transaction
+reads are already covered by 0011 and 0012.
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index('ix_vcards_user_status', 'virtual_cards', ['user_id', 'status'], postgresql_concurrently=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_vcards_user_status', table_name='virtual_cards', postgresql_concurrently=True)
@@ -1,85 +1,359 @@
-from typing import List, Dict
-from langchain.agents import AgentExecutor, create_openai_functions_agent
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.tools import Tool
-from langchain.memory import ConversationBufferMemory
+import asyncio
+import json
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, List, Dict, Optional
+from cachetools import LRUCache
+from langchain.tools import BaseTool
+import httpx
+from openai import AsyncOpenAI
 
+from app.core.http_client import http_client as shared_http_client
+from app.db.database import get_db_session
 from app.ai.tools.transaction_tools import (
+    DbFactory,
+    OPENAI_TOOL_SCHEMAS,
+    TOOL_ARGS,
+    prefetched_history,
     GetTransactionHistoryTool,
     AnalyzeSpendingPatternsTool,
     GetBudgetRecommendationsTool
 )
 
+# Kept free of per-request values so OpenAI's automatic prompt caching can
+# reuse it as a shared prefix
+SYSTEM_PROMPT = """You are a helpful financial advisor AI.
+Your goal is to help users understand their spending patterns and make better financial decisions.
+Use the available tools to analyze transactions and provide personalized recommendations.
+Always be professional but friendly in your responses."""
+
+# Per-user context only; transaction data reaches the model through tools
+USER_CONTEXT_PROMPT = "You are assisting the user with id {user_id}."
+
+SUMMARY_PROMPT = """Progressively summarize the conversation between a user and their financial advisor.
+Extend the existing summary with the new lines and return only the new summary.
+
+Existing summary:
+{summary}
+
+New lines:
+{lines}"""
+
+ITERATION_LIMIT_MESSAGE = "Agent stopped due to iteration limit."
+
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class ConversationMemory:
+    """One user's recent messages plus a running summary of older turns."""
+    history: List[Dict[str, Any]] = field(default_factory=list)
+    summary: str = ""
+    # In-flight summarisation, at most one per user
+    summarizing: Optional[asyncio.Task] = None
+
+def _sse(event: str, data: Any) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _merge_tool_call_delta(tool_calls: Dict[int, Dict[str, Any]], delta: Dict[str, Any]) -> None:
+    """Fold a streamed tool-call fragment into the call at its index."""
+    call = tool_calls.setdefault(delta.get("index", 0), {
+        "id": None,
+        "type": "function",
+        "function": {"name": "", "arguments": ""}
+    })
+    if delta.get("id"):
+        call["id"] = delta["id"]
+    function = delta.get("function") or {}
+    call["function"]["name"] += function.get("name") or ""
+    call["function"]["arguments"] += function.get("arguments") or ""
+
+def _compile_dispatcher(tools: List[BaseTool]) -> Callable[[str, Dict[str, Any], str], Awaitable[Any]]:
+    """
+    Generate a dispatch function specialized to a fixed tool list.
+
+    Each tool gets its own ``if`` branch that calls ``_arun`` on the bound
+    instance, with the authenticated user id injected for tools that take one,
+    so dispatch needs no registry lookup or per-call schema check.
+    """
+    namespace: Dict[str, Any] = {}
+    lines = ["async def _dispatch(name, args, user_id):"]
+    for index, tool in enumerate(tools):
+        namespace[f"_t{index}"] = tool
+        lines.append(f"    {'if' if index == 0 else 'elif'} name == {tool.name!r}:")
+        if "user_id" in TOOL_ARGS[tool.name]:
+            # Always scope lookups to the authenticated user
+            lines.append("        args['user_id'] = user_id")
+        lines.append(f"        return await _t{index}._arun(**args)")
+    lines.append("    return f'Unknown tool: {name}'")
+    exec("\n".join(lines), namespace)
+    return namespace["_dispatch"]
+
 class FinancialAdvisorAgent:
-    def __init__(self, openai_api_key: str):
-        # Initialize the language model
-        self.llm = ChatOpenAI(
-            temperature=0,
-            model="gpt-4-turbo-preview",
-            api_key=openai_api_key
-        )
-        
-        # Initialize memory
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True
-        )
+    model = "gpt-4-turbo-preview"
+    # Upper bound on planning turns before giving up on a final answer
+    max_iterations = 10
+    # Messages kept verbatim; older turns are folded into a running summary
+    history_window = 10
+    # Users whose conversation memory is kept; least recently active drop first
+    max_conversations = 10_000
+
+    def __init__(
+        self,
+        openai_api_key: str,
+        db_factory: DbFactory = get_db_session,
+        http_client: httpx.AsyncClient = shared_http_client
+    ):
+        # Chat completions are called directly; the loop below replaces AgentExecutor.
+        # The HTTP client (and its connection pool) is shared app-wide.
+        self.client = AsyncOpenAI(api_key=openai_api_key, http_client=http_client)
 
-        # Initialize tools
+        # Conversation memory per user; the agent is shared by every request,
+        # so one user's turns never reach another user's prompt
+        self.memories: LRUCache = LRUCache(maxsize=self.max_conversations)
+
+        # Initialize tools; they share one session factory (and its pool)
         self.tools = [
-            GetTransactionHistoryTool(),
-            AnalyzeSpendingPatternsTool(),
+            GetTransactionHistoryTool(db_factory=db_factory),
+            AnalyzeSpendingPatternsTool(db_factory=db_factory),
             GetBudgetRecommendationsTool()
         ]
+        self.tools_by_name = {tool.name: tool for tool in self.tools}
+        self.tool_schemas = [OPENAI_TOOL_SCHEMAS[tool.name] for tool in self.tools]
+        self._dispatch = _compile_dispatcher(self.tools)
 
-        # Create the agent prompt
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a helpful financial advisor AI. 
-            Your goal is to help users understand their spending patterns and make better financial decisions.
-            Use the available tools to analyze transactions and provide personalized recommendations.
-            Always be professional but friendly in your responses."""),
-            MessagesPlaceholder(variable_name="chat_history"),
-            ("human", "{input}"),
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
+    @staticmethod
+    def _partition_tool_calls(
+        tool_calls: List[Dict[str, Any]],
+        tools_by_name: Dict[str, BaseTool]
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Group consecutive concurrency-safe tool calls into batches.
 
-        # Create the agent
-        self.agent = create_openai_functions_agent(
-            llm=self.llm,
-            prompt=prompt,
-            tools=self.tools
-        )
+        Calls to tools that are not concurrency-safe (or unknown) get a batch of
+        their own, so they still run in the order the model requested them.
+        """
+        batches: List[List[Dict[str, Any]]] = []
+        for call in tool_calls:
+            tool = tools_by_name.get(call["function"]["name"])
+            is_safe = bool(tool and getattr(tool, "is_concurrency_safe", False))
+            if is_safe and batches and batches[-1][0]["is_safe"]:
+                batches[-1].append({**call, "is_safe": True})
+            else:
+                batches.append([{**call, "is_safe": is_safe}])
+        return batches
+
+    async def _invoke_tool(self, call: Dict[str, Any], user_id: str) -> Any:
+        """Run a single tool call, returning the error text if it fails."""
+        try:
+            tool_input = json.loads(call["function"]["arguments"] or "{}")
+            return await self._dispatch(call["function"]["name"], tool_input, user_id)
+        except Exception as e:
+            return f"Error: {str(e)}"
 
-        # Create the agent executor
-        self.agent_executor = AgentExecutor(
-            agent=self.agent,
-            tools=self.tools,
-            memory=self.memory,
-            verbose=True
+    async def get_transaction_histories(
+        self,
+        user_ids: List[int],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> Dict[str, List[Dict]]:
+        """Fetch several users' transaction histories in one round trip."""
+        return await self.tools_by_name["get_transaction_history"].arun_batch(
+            user_ids, start_date=start_date, end_date=end_date
         )
 
+    @contextmanager
+    def _history_prefetch(self, user_id: str) -> Iterator[None]:
+        """
+        Fetch the user's history while the model plans its first turn.
+
+        Most queries start with get_transaction_history, which picks up the
+        task's result instead of querying again. Unused fetches are cancelled.
+        """
+        task = asyncio.create_task(self.tools_by_name["get_transaction_history"]._arun(user_id))
+        # Retrieve the outcome so an unused failed fetch is not reported as unhandled
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        token = prefetched_history.set((user_id, task))
+        try:
+            yield
+        finally:
+            prefetched_history.reset(token)
+            task.cancel()
+
+    def _build_messages(self, user_id: str, query: str) -> List[Dict[str, Any]]:
+        # Static instructions first and the per-user block second, so the
+        # leading tokens are identical across requests and users; history and
+        # the query go last
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "system", "content": USER_CONTEXT_PROMPT.format(user_id=user_id)},
+        ]
+        memory = self.memories.get(user_id)
+        if memory:
+            if memory.summary:
+                messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{memory.summary}"})
+            messages.extend(memory.history)
+        messages.append({"role": "user", "content": query})
+        return messages
+
+    async def _run_tool_calls(
+        self,
+        tool_calls: List[Dict[str, Any]],
+        user_id: str,
+        messages: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Run one turn's tool calls and append their results to the conversation.
+
+        Independent (concurrency-safe) calls are awaited together with
+        asyncio.gather. Returns the executed steps in request order.
+        """
+        steps = []
+        for batch in self._partition_tool_calls(tool_calls, self.tools_by_name):
+            observations = await asyncio.gather(
+                *(self._invoke_tool(call, user_id) for call in batch)
+            )
+            for call, observation in zip(batch, observations):
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": call["id"],
+                    "content": json.dumps(observation, default=str)
+                })
+                steps.append({
+                    "tool": call["function"]["name"],
+                    "tool_input": call["function"]["arguments"],
+                    "observation": observation
+                })
+        return steps
+
+    def _save_turn(self, user_id: str, query: str, output: str) -> None:
+        # Memory is only written once every gathered call has finished
+        memory = self.memories.get(user_id)
+        if memory is None:
+            memory = self.memories[user_id] = ConversationMemory()
+        memory.history.extend([
+            {"role": "user", "content": query},
+            {"role": "assistant", "content": output},
+        ])
+        if len(memory.history) > self.history_window and memory.summarizing is None:
+            # Summarise off the request path; the reply does not wait for it
+            memory.summarizing = asyncio.create_task(self._summarize(memory))
+
+    async def _summarize(self, memory: ConversationMemory) -> None:
+        """Fold a user's overflowing history into their summary so the prompt stays bounded."""
+        try:
+            while len(memory.history) > self.history_window:
+                overflow_count = len(memory.history) - self.history_window
+                lines = "\n".join(
+                    f"{message['role']}: {message['content']}"
+                    for message in memory.history[:overflow_count]
+                )
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    temperature=0,
+                    messages=[{"role": "user", "content": SUMMARY_PROMPT.format(summary=memory.summary, lines=lines)}]
+                )
+                memory.summary = response.choices[0].message.content
+                # Turns only ever append, so the summarised messages are still the oldest
+                del memory.history[:overflow_count]
+        except Exception:
+            logger.exception("Conversation summary failed")
+            # Keep the prompt bounded even without a summary
+            del memory.history[:-self.history_window]
+        finally:
+            memory.summarizing = None
+
     async def process_query(self, user_id: str, query: str) -> Dict:
         """
         Process a user query and return the agent's response
         """
-        # Add user context to the query
-        context = {"user_id": user_id}
-        
         try:
-            response = await self.agent_executor.ainvoke(
-                {
-                    "input": query,
-                    "context": context
+            with self._history_prefetch(user_id):
+                messages = self._build_messages(user_id, query)
+                thought_process = []
+                output = None
+
+                for _ in range(self.max_iterations):
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        temperature=0,
+                        messages=messages,
+                        tools=self.tool_schemas
+                    )
+                    message = response.choices[0].message
+                    messages.append(message.model_dump(exclude_none=True))
+
+                    if not message.tool_calls:
+                        output = message.content
+                        break
+
+                    tool_calls = [tool_call.model_dump() for tool_call in message.tool_calls]
+                    thought_process.extend(await self._run_tool_calls(tool_calls, user_id, messages))
+                else:
+                    output = ITERATION_LIMIT_MESSAGE
+
+                self._save_turn(user_id, query, output)
+
+                return {
+                    "status": "success",
+                    "response": output,
+                    "thought_process": thought_process
                 }
-            )
-            return {
-                "status": "success",
-                "response": response["output"],
-                "thought_process": response.get("intermediate_steps", [])
-            }
         except Exception as e:
             return {
                 "status": "error",
                 "error": str(e)
             }
+
+    async def stream_query(self, user_id: str, query: str) -> AsyncIterator[str]:
+        """
+        Process a user query, yielding server-sent events as work happens
+
+        Emits a ``step`` event per tool call, ``token`` events while the answer
+        is generated, then ``done`` (or ``error``).
+        """
+        try:
+            with self._history_prefetch(user_id):
+                messages = self._build_messages(user_id, query)
+                output = None
+
+                for _ in range(self.max_iterations):
+                    content: List[str] = []
+                    tool_calls: Dict[int, Dict[str, Any]] = {}
+                    stream = await self.client.chat.completions.create(
+                        model=self.model,
+                        temperature=0,
+                        messages=messages,
+                        tools=self.tool_schemas,
+                        stream=True
+                    )
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta
+                        if delta.content:
+                            content.append(delta.content)
+                            yield _sse("token", delta.content)
+                        for tool_call in delta.tool_calls or []:
+                            _merge_tool_call_delta(tool_calls, tool_call.model_dump(exclude_none=True))
+
+                    calls = [tool_calls[index] for index in sorted(tool_calls)]
+                    assistant_message = {"role": "assistant", "content": "".join(content)}
+                    if calls:
+                        assistant_message["tool_calls"] = calls
+                    messages.append(assistant_message)
+                    if not calls:
+                        output = assistant_message["content"]
+                        break
+
+                    for step in await self._run_tool_calls(calls, user_id, messages):
+                        yield _sse("step", step)
+                else:
+                    output = ITERATION_LIMIT_MESSAGE
+                    yield _sse("token", output)
+
+                self._save_turn(user_id, query, output)
+                yield _sse("done", {"status": "success"})
+        except Exception as e:
+            yield _sse("error", {"status": "error", "error": str(e)})
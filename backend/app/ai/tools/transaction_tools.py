@@ -1,121 +1,215 @@
-from typing import Dict, List, Optional
+import asyncio
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import AsyncContextManager, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from langchain.tools import BaseTool
+from langchain.tools.render import format_tool_to_openai_tool
 from pydantic import BaseModel
 
-from app.api.deps import get_db
+from app.db.database import get_db_session
 from app.models.virtual_card import VirtualCard
 from app.models.transaction import Transaction
-from sqlalchemy import select, func
+from sqlalchemy import JSON, Float, String, and_, cast, select, func
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
 
+# Opens a pooled session; the agent passes its own factory to every tool
+DbFactory = Callable[[], AsyncContextManager[AsyncSession]]
+
+# History fetch started speculatively by the agent for the current query,
+# as (user_id, task); only covers the default (undated) request
+prefetched_history: ContextVar[Optional[Tuple[str, asyncio.Task]]] = ContextVar(
+    "prefetched_history", default=None
+)
+
+def _date_conditions(start_date: Optional[str], end_date: Optional[str]) -> List:
+    """Transaction date bounds; each is only added when given."""
+    conditions = []
+    if start_date:
+        conditions.append(Transaction.created_at >= datetime.fromisoformat(start_date))
+    if end_date:
+        conditions.append(Transaction.created_at <= datetime.fromisoformat(end_date))
+    return conditions
+
+def _transaction_conditions(user_id: str, start_date: Optional[str], end_date: Optional[str]) -> List:
+    """WHERE clauses for a user's transactions."""
+    return [VirtualCard.user_id == int(user_id)] + _date_conditions(start_date, end_date)
+
+# Only the fields the tools return, selected as plain rows (no ORM hydration);
+# id and amount arrive already converted from the database
+_HISTORY_COLUMNS = (
+    cast(Transaction.id, String).label("id"),
+    Transaction.created_at.label("date"),
+    Transaction.merchant_name,
+    cast(Transaction.amount, Float).label("amount"),
+    Transaction.merchant_category.label("category"),
+    Transaction.status,
+)
+
+def _serialize_row(row) -> Dict:
+    item = dict(row)
+    item["date"] = item["date"].isoformat()
+    item["status"] = item["status"].value
+    return item
+
 class GetTransactionHistoryTool(BaseTool):
     name = "get_transaction_history"
+    # Read-only, so the agent may run it alongside other safe tools
+    is_concurrency_safe: bool = True
+    db_factory: DbFactory = get_db_session
     description = """
     Retrieves the transaction history for a user.
     Input should be a JSON string containing user_id and optional parameters like start_date and end_date.
     """
 
     async def _arun(self, user_id: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict]:
-        async with get_db() as db:
-            # Build query for virtual cards owned by the user
-            query = (
-                select(VirtualCard)
-                .where(VirtualCard.user_id == user_id)
+        prefetch = prefetched_history.get()
+        if prefetch is not None and prefetch[0] == user_id and start_date is None and end_date is None:
+            # Shielded so one cancelled caller does not cancel the shared fetch
+            return await asyncio.shield(prefetch[1])
+
+        conditions = _transaction_conditions(user_id, start_date, end_date)
+
+        async with self.db_factory() as db:
+            # Transactions across all of the user's cards in one round trip
+            result = await db.execute(
+                select(*_HISTORY_COLUMNS)
+                .join(VirtualCard, Transaction.virtual_card_id == VirtualCard.id)
+                .where(and_(*conditions))
+                .order_by(Transaction.created_at.desc())
             )
             
-            # Execute query
-            result = await db.execute(query)
-            cards = result.scalars().all()
-            
-            # Get transactions from all cards
-            transactions = []
-            for card in cards:
-                card_transactions = await db.execute(
-                    select(Transaction)
-                    .where(
-                        Transaction.card_id == card.id,
-                        Transaction.date >= start_date if start_date else True,
-                        Transaction.date <= end_date if end_date else True
-                    )
-                    .order_by(Transaction.date.desc())
-                )
-                transactions.extend(card_transactions.scalars().all())
-            
             # Convert to dictionary format
-            return [
-                {
-                    "id": str(t.id),
-                    "date": t.date.isoformat(),
-                    "merchant_name": t.merchant_name,
-                    "amount": float(t.amount),
-                    "category": t.category,
-                    "status": t.status
-                }
-                for t in transactions
-            ]
+            return [_serialize_row(row) for row in result.mappings()]
+
+    async def arun_batch(
+        self,
+        user_ids: List[int],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> Dict[str, List[Dict]]:
+        """
+        Retrieve transaction histories for several users with one query.
+
+        Returns a mapping of user id to that user's transactions, newest first;
+        users without transactions map to an empty list.
+        """
+        conditions = [VirtualCard.user_id.in_(user_ids)]
+        conditions += _date_conditions(start_date, end_date)
+
+        async with self.db_factory() as db:
+            result = await db.execute(
+                select(*_HISTORY_COLUMNS, VirtualCard.user_id.label("owner_id"))
+                .join(VirtualCard, Transaction.virtual_card_id == VirtualCard.id)
+                .where(and_(*conditions))
+                .order_by(Transaction.created_at.desc())
+            )
+
+            histories: Dict[str, List[Dict]] = defaultdict(list)
+            for row in result.mappings():
+                item = _serialize_row(row)
+                histories[str(item.pop("owner_id"))].append(item)
+
+        return {str(user_id): histories.get(str(user_id), []) for user_id in user_ids}
 
     def _run(self, user_id: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict]:
         raise NotImplementedError("Use async version")
 
 class AnalyzeSpendingPatternsTool(BaseTool):
     name = "analyze_spending_patterns"
+    # Read-only, so the agent may run it alongside other safe tools
+    is_concurrency_safe: bool = True
+    db_factory: DbFactory = get_db_session
     description = """
     Analyzes spending patterns from transaction history.
-    Input should be a JSON string containing transaction data.
+    Input should be a JSON string containing user_id and optional parameters like start_date and end_date.
     """
 
-    async def _arun(self, transactions: List[Dict]) -> Dict:
-        # Group transactions by category
-        category_totals = {}
-        for transaction in transactions:
-            category = transaction['category']
-            amount = transaction['amount']
-            if category in category_totals:
-                category_totals[category] += amount
-            else:
-                category_totals[category] = amount
+    @staticmethod
+    def _analysis_query(conditions: List):
+        """
+        Every aggregate the analysis needs, as one row from one statement.
+
+        The user's transactions are selected once in a CTE; the category
+        breakdown and top merchants are built into JSON by PostgreSQL in scalar
+        subqueries next to the overall totals.
+        """
+        base = (
+            select(
+                # json_object_agg rejects NULL keys
+                func.coalesce(Transaction.merchant_category, "uncategorized").label("category"),
+                Transaction.merchant_name,
+                Transaction.amount,
+                Transaction.created_at
+            )
+            .join(VirtualCard, Transaction.virtual_card_id == VirtualCard.id)
+            .where(and_(*conditions))
+            .cte("base")
+        )
+
+        by_category = (
+            select(base.c.category, func.sum(base.c.amount).label("total"))
+            .group_by(base.c.category)
+            .subquery("by_category")
+        )
+        merchant_total = func.sum(base.c.amount).label("total")
+        top_merchants = (
+            select(base.c.merchant_name.label("name"), merchant_total)
+            .group_by(base.c.merchant_name)
+            .order_by(merchant_total.desc())
+            .limit(5)
+            .subquery("top_merchants")
+        )
+
+        return select(
+            select(func.json_object_agg(by_category.c.category, by_category.c.total, type_=JSON))
+            .scalar_subquery().label("category_breakdown"),
+            select(func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object("name", top_merchants.c.name, "total", top_merchants.c.total),
+                    top_merchants.c.total.desc()
+                ),
+                type_=JSON
+            )).scalar_subquery().label("top_merchants"),
+            func.min(base.c.created_at).label("min_date"),
+            func.max(base.c.created_at).label("max_date"),
+            func.coalesce(func.sum(base.c.amount), 0).label("total_spent"),
+            func.count().label("transaction_count")
+        ).select_from(base)
+
+    async def _arun(self, user_id: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
+        # Aggregation happens in the database in a single round trip
+        conditions = _transaction_conditions(user_id, start_date, end_date)
+        async with self.db_factory() as db:
+            result = await db.execute(self._analysis_query(conditions))
+            analysis = result.mappings().one()
+
+        transaction_count = analysis["transaction_count"]
+        total_spent = float(analysis["total_spent"])
 
         # Calculate daily spending averages
-        if transactions:
-            dates = [datetime.fromisoformat(t['date']) for t in transactions]
-            min_date = min(dates)
-            max_date = max(dates)
-            days = (max_date - min_date).days + 1
-            total_spent = sum(t['amount'] for t in transactions)
+        if transaction_count:
+            days = (analysis["max_date"] - analysis["min_date"]).days + 1
             daily_average = total_spent / days
         else:
             daily_average = 0
 
-        # Find top merchants
-        merchant_totals = {}
-        for transaction in transactions:
-            merchant = transaction['merchant_name']
-            amount = transaction['amount']
-            if merchant in merchant_totals:
-                merchant_totals[merchant] += amount
-            else:
-                merchant_totals[merchant] = amount
-
-        top_merchants = sorted(
-            [{'name': k, 'total': v} for k, v in merchant_totals.items()],
-            key=lambda x: x['total'],
-            reverse=True
-        )[:5]
-
         return {
-            'category_breakdown': category_totals,
+            'category_breakdown': analysis["category_breakdown"] or {},
             'daily_average': daily_average,
-            'top_merchants': top_merchants,
-            'total_transactions': len(transactions),
-            'total_spent': sum(t['amount'] for t in transactions)
+            'top_merchants': analysis["top_merchants"] or [],
+            'total_transactions': transaction_count,
+            'total_spent': total_spent
         }
 
-    def _run(self, transactions: List[Dict]) -> Dict:
+    def _run(self, user_id: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
         raise NotImplementedError("Use async version")
 
 class GetBudgetRecommendationsTool(BaseTool):
     name = "get_budget_recommendations"
+    # Read-only, so the agent may run it alongside other safe tools
+    is_concurrency_safe: bool = True
     description = """
     Generates budget recommendations based on spending patterns.
     Input should be a JSON string containing spending analysis data.
@@ -153,3 +247,14 @@ class GetBudgetRecommendationsTool(BaseTool):
 
     def _run(self, spending_analysis: Dict) -> Dict:
         raise NotImplementedError("Use async version")
+
+def _build_tool_schemas():
+    tools = [GetTransactionHistoryTool(), AnalyzeSpendingPatternsTool(), GetBudgetRecommendationsTool()]
+    return (
+        {tool.name: format_tool_to_openai_tool(tool) for tool in tools},
+        {tool.name: tool.args for tool in tools}
+    )
+
+# Tool schemas only depend on the classes, so they are introspected once at import
+# rather than for every agent and every call
+OPENAI_TOOL_SCHEMAS, TOOL_ARGS = _build_tool_schemas()
@@ -1,50 +1,193 @@
-from typing import Optional
-from fastapi import Depends, HTTPException, status
+import hashlib
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+from cachetools import TTLCache
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import crud
+from app.core.auth_cache import cache_user, get_cached_user
 from app.core.config import settings
+from app.core.rate_limiter import RateLimitRule, rate_limit_middleware
+from app.db.database import get_db
+from app.db.redis import redis_client
+from app.schemas.token import TokenPayload
 from app.schemas.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login", auto_error=False)
 
+@dataclass(slots=True)
+class MockUser:
+    """In-memory user for mock auth; a plain slotted object, no validation."""
+    id: int
+    email: str
+    full_name: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    is_active: bool = True
+    is_superuser: bool = False
+    email_verified: bool = False
+    last_login: Optional[datetime] = None
+
 # Mock user storage (this would normally come from a database)
-mock_users = {}
+mock_users: Dict[str, MockUser] = {}
+
+# Resolved once at import; the dict is only ever mutated in place
+_MOCK_USER_EMAIL = 'test@example.com'
+_get_mock_user = mock_users.get
+
+# Resolved mock users keyed by token digest. Entries are copied on the way
+# out, so requests never share (or mutate) the same user object.
+_token_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+
+# JWT verification parameters, captured once at import
+_SECRET_KEY = settings.SECRET_KEY.get_secret_value()
+_ALGORITHMS = ["HS256"]
+
+# (subject, exp) of verified tokens keyed by token digest, so repeat requests
+# skip the signature check. Users themselves are only cached in Redis, where
+# invalidate_cached_user reaches every worker.
+_token_subject_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+
+def _token_cache_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+def _verified_subject(token: str, cache_key: bytes) -> Optional[int]:
+    """Return the user id of a valid, unexpired token, or None."""
+    cached = _token_subject_cache.get(cache_key)
+    if cached is not None:
+        user_id, expires_at = cached
+        # The signature check is skipped on a hit, the expiry check is not
+        if expires_at <= time.time():
+            _token_subject_cache.pop(cache_key, None)
+            return None
+        return user_id
+
+    try:
+        payload = jwt.decode(token, _SECRET_KEY, algorithms=_ALGORITHMS)
+        token_data = TokenPayload.model_validate(payload)
+    except (JWTError, ValueError):
+        return None
+    if token_data.sub is None:
+        return None
 
-async def get_current_user(token: Optional[str] = Depends(oauth2_scheme)) -> Optional[User]:
+    if token_data.exp is not None:
+        _token_subject_cache[cache_key] = (token_data.sub, token_data.exp)
+    return token_data.sub
+
+async def _mock_get_current_user(token: Optional[str] = Depends(oauth2_scheme)) -> Optional[User]:
     """Get the current user from the token."""
     if not token:
         return None
+
+    cache_key = _token_cache_key(token)
+    cached_user = _token_cache.get(cache_key)
+    if cached_user is not None:
+        return replace(cached_user)
         
     try:
-        # Split the token into parts
-        parts = token.split('.')
-        if len(parts) != 3:
+        # A JWT has exactly three dot-separated parts; count avoids building the list
+        if token.count('.') != 2:
             return None
             
         # For now, just return a mock user since we're mocking the auth
-        user = mock_users.get('test@example.com')
+        user = _get_mock_user(_MOCK_USER_EMAIL)
         if not user:
             return None
             
+        _token_cache[cache_key] = replace(user)
         return user
     except Exception:
         return None
 
+async def _jwt_get_current_user(
+    token: Optional[str] = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db),
+) -> Optional[User]:
+    """Get the current user from a signed access token."""
+    if not token:
+        return None
+
+    cache_key = _token_cache_key(token)
+    user_id = _verified_subject(token, cache_key)
+    if user_id is None:
+        return None
+
+    # Shared Redis cache next, so other workers' lookups skip PostgreSQL too;
+    # every hit builds a new user object for this request
+    user = await get_cached_user(cache_key)
+    if user is None:
+        user = await crud.user.get_for_auth(db, id=user_id)
+        if not user:
+            return None
+        await cache_user(cache_key, user)
+    return user
+
+# Chosen once at import so every request resolves a single dependency
+get_current_user = _jwt_get_current_user if settings.AUTH_MODE == "jwt" else _mock_get_current_user
+
+def _unauthenticated() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Not authenticated",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+async def _jwt_get_current_user_id(token: Optional[str] = Depends(oauth2_scheme)) -> int:
+    """
+    Get the caller's user id from the access token alone.
+
+    No user lookup is made, so this is only for routes that need nothing but
+    the id to scope their queries; a deactivated user keeps that access until
+    the token expires.
+    """
+    if not token:
+        raise _unauthenticated()
+
+    user_id = _verified_subject(token, _token_cache_key(token))
+    if user_id is None:
+        raise _unauthenticated()
+    return user_id
+
+async def _mock_get_current_user_id(
+    current_user: Optional[User] = Depends(_mock_get_current_user),
+) -> int:
+    """Get the mock user's id."""
+    if not current_user:
+        raise _unauthenticated()
+    return current_user.id
+
+get_current_user_id = _jwt_get_current_user_id if settings.AUTH_MODE == "jwt" else _mock_get_current_user_id
+
 async def get_current_active_user(
     current_user: Optional[User] = Depends(get_current_user),
 ) -> User:
     """Get the current active user."""
     if not current_user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _unauthenticated()
     
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+def rate_limit(rule: RateLimitRule) -> Callable[..., Awaitable[None]]:
+    """
+    Route dependency enforcing a rate limit rule per authenticated user.
+
+    Rejections happen before the handler runs, so they never reach the database.
+    """
+    async def dependency(
+        request: Request,
+        current_user: User = Depends(get_current_active_user),
+    ) -> None:
+        request.state.user = current_user
+        await rate_limit_middleware(request, redis_client, rule)
+    return dependency
+
 async def get_current_active_superuser(
     current_user: User = Depends(get_current_active_user),
 ) -> User:
@@ -1,14 +1,15 @@
-from typing import Dict
+from typing import Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from app.core.config import settings
-from app.core.deps import get_current_user
+from app.api.deps import get_current_active_superuser, get_current_active_user, get_current_user
 from app.ai.agent import FinancialAdvisorAgent
 from pydantic import BaseModel
 
 router = APIRouter()
 
 # Initialize the AI agent
-financial_advisor = FinancialAdvisorAgent(openai_api_key=settings.OPENAI_API_KEY)
+financial_advisor = FinancialAdvisorAgent(openai_api_key=settings.OPENAI_API_KEY.get_secret_value())
 
 class QueryRequest(BaseModel):
     query: str
@@ -18,6 +19,15 @@ class QueryResponse(BaseModel):
     response: str
     thought_process: list = []
 
+class BatchQueryRequest(BaseModel):
+    user_ids: List[int]
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+class BatchQueryResponse(BaseModel):
+    status: str
+    transactions: Dict[str, list]
+
 @router.post("/query", response_model=QueryResponse)
 async def process_query(
     request: QueryRequest,
@@ -37,3 +47,41 @@ async def process_query(
             status_code=500,
             detail=f"Error processing query: {str(e)}"
         )
+
+
+@router.post("/query/stream")
+async def stream_query(
+    request: QueryRequest,
+    current_user = Depends(get_current_active_user)
+) -> StreamingResponse:
+    """
+    Process a natural language query, streaming tool steps and answer tokens as server-sent events
+    """
+    return StreamingResponse(
+        financial_advisor.stream_query(
+            user_id=str(current_user.id),
+            query=request.query
+        ),
+        media_type="text/event-stream"
+    )
+
+@router.post("/batch-query", response_model=BatchQueryResponse)
+async def batch_query(
+    request: BatchQueryRequest,
+    current_user = Depends(get_current_active_superuser)
+) -> Dict:
+    """
+    Fetch transaction histories for several users at once (superusers only)
+    """
+    try:
+        transactions = await financial_advisor.get_transaction_histories(
+            request.user_ids,
+            start_date=request.start_date,
+            end_date=request.end_date
+        )
+        return {"status": "success", "transactions": transactions}
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing batch query: {str(e)}"
+        )
@@ -4,7 +4,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, conint
 
 from app.api.deps import get_current_user, get_db
+from app.core.cache import invalidate_user_cache
 from app.models.user import User
+from app.models.virtual_card import VirtualCard
 from app.services.card_management_service import CardManagementService
 
 router = APIRouter()
@@ -54,6 +56,11 @@ class CardClone(BaseModel):
     count: conint(gt=0, lt=11)  # Limit to 10 clones at a time
     name_prefix: Optional[str] = None
 
+async def _invalidate_owners(cards: List[VirtualCard]) -> None:
+    """Drop cached analytics for every owner whose cards were changed."""
+    for user_id in {card.user_id for card in cards}:
+        await invalidate_user_cache(user_id)
+
 # Endpoints
 @router.post("/templates")
 async def create_template(
@@ -81,6 +88,7 @@ async def apply_template(
         template_id=template_id,
         card_ids=card_ids
     )
+    await _invalidate_owners(cards)
     return {
         "success": len(cards),
         "errors": errors,
@@ -105,6 +113,7 @@ async def bulk_create_cards(
         spending_limits=data.spending_limits,
         category_spending_limits=data.category_spending_limits
     )
+    await _invalidate_owners(cards)
     return {
         "success": len(cards),
         "errors": errors,
@@ -125,6 +134,7 @@ async def clone_card(
         count=data.count,
         name_prefix=data.name_prefix
     )
+    await _invalidate_owners(cards)
     return {
         "success": len(cards),
         "errors": errors,
@@ -143,6 +153,7 @@ async def bulk_update_cards(
         card_ids=data.card_ids,
         updates=data.updates
     )
+    await _invalidate_owners(cards)
     return {
         "success": len(cards),
         "errors": errors,
@@ -162,6 +173,7 @@ async def bulk_freeze_cards(
         reason=data.reason,
         duration=data.duration
     )
+    await _invalidate_owners(cards)
     return {
         "success": len(cards),
         "errors": errors,
@@ -175,6 +187,7 @@ async def process_auto_unfreezes(
 ):
     """Process cards that should be automatically unfrozen."""
     cards, errors = await CardManagementService.process_auto_unfreezes(db=db)
+    await _invalidate_owners(cards)
     return {
         "success": len(cards),
         "errors": errors,
@@ -188,6 +201,7 @@ async def process_auto_renewals(
 ):
     """Process cards that need automatic renewal."""
     cards, errors = await CardManagementService.process_auto_renewals(db=db)
+    await _invalidate_owners(cards)
     return {
         "success": len(cards),
         "errors": errors,
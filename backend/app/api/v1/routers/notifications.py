@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from typing import List, Dict, Any, Optional
 
 from app.api.deps import get_current_user
@@ -9,12 +9,18 @@ router = APIRouter()
 # Mock notifications storage
 mock_notifications: List[Dict[str, Any]] = []
 
-@router.get("/", response_model=List[Dict[str, Any]])
-async def get_notifications(current_user: Optional[User] = Depends(get_current_user)) -> List[Dict[str, Any]]:
+# Pre-encoded body for the (currently always) empty list
+EMPTY_LIST_BODY = b"[]"
+
+@router.get("/")
+async def get_notifications(current_user: Optional[User] = Depends(get_current_user)) -> Response:
     """Get user notifications."""
+    # The body is pre-encoded, so no response_model validation or JSON encoding
+    # runs. A fresh Response per request, since middleware may modify its headers.
+
     # If user is not authenticated, return an empty list
     if not current_user:
-        return []
+        return Response(content=EMPTY_LIST_BODY, media_type="application/json")
     
     # For now, return an empty list since we're using mock data
-    return [] 
\ No newline at end of file
+    return Response(content=EMPTY_LIST_BODY, media_type="application/json") 
\ No newline at end of file
@@ -1,16 +1,30 @@
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
+from decimal import Decimal
 from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ....crud import crud_virtual_card, crud_transaction
-from ....core import security
+from ....api.deps import get_current_active_user, rate_limit
+from ....core.cache import invalidate_user_cache
+from ....core.config import settings
+from ....core.rate_limiter import RateLimitRule
+from ....crud.crud_virtual_card import CARD_NOT_FOUND, virtual_card as crud_virtual_card
+from ....crud.crud_transaction import transaction as crud_transaction
 from ....db.database import get_db
 from ....schemas.virtual_card import VirtualCardCreate, VirtualCardUpdate
-from ....schemas.transaction import TransactionCreate, TransactionStatus
+from ....models.transaction import Transaction, TransactionStatus, TransactionType
 
 router = APIRouter()
 
+def _function_rate_limit(name: str):
+    """Per-user limit for endpoints an LLM tool loop can call repeatedly."""
+    return Depends(rate_limit(RateLimitRule(
+        key=f"openai_function:{name}",
+        max_requests=settings.RATE_LIMIT_AI_FUNCTION_MAX,
+        window_seconds=settings.RATE_LIMIT_AI_FUNCTION_WINDOW
+    )))
+
 # Card Management Function Models
 class CreateVirtualCardRequest(BaseModel):
     user_id: int = Field(..., description="ID of the user creating the card")
@@ -37,11 +51,11 @@ class VerifyTransactionRequest(BaseModel):
     transaction_id: int = Field(..., description="ID of the transaction to verify")
 
 # Card Management Functions
-@router.post("/create_virtual_card", response_model=Dict)
+@router.post("/create_virtual_card", response_model=Dict, dependencies=[_function_rate_limit("create_virtual_card")])
 async def create_virtual_card(
     request: CreateVirtualCardRequest,
-    db: Session = Depends(get_db),
-    current_user = Depends(security.get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
 ):
     """Create a new virtual card with specified limits and categories"""
     try:
@@ -51,7 +65,7 @@ async def create_virtual_card(
             spending_limit=request.spending_limit,
             merchant_categories=request.merchant_categories
         )
-        card = crud_virtual_card.create(db, obj_in=card_data)
+        card = await crud_virtual_card.create(db, obj_in=card_data)
         return {
             "status": "success",
             "card_id": card.id,
@@ -63,12 +77,12 @@ async def create_virtual_card(
 @router.put("/update_card_limits", response_model=Dict)
 async def update_card_limits(
     request: UpdateCardLimitsRequest,
-    db: Session = Depends(get_db),
-    current_user = Depends(security.get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
 ):
     """Update spending limits and merchant categories for a virtual card"""
     try:
-        card = crud_virtual_card.get(db, id=request.card_id)
+        card = await crud_virtual_card.get(db, id=request.card_id)
         if not card:
             raise HTTPException(status_code=404, detail="Virtual card not found")
             
@@ -76,7 +90,7 @@ async def update_card_limits(
             spending_limit=request.new_spending_limit,
             merchant_categories=request.merchant_categories
         )
-        updated_card = crud_virtual_card.update(db, db_obj=card, obj_in=update_data)
+        updated_card = await crud_virtual_card.update(db, db_obj=card, obj_in=update_data)
         return {
             "status": "success",
             "card_id": updated_card.id,
@@ -90,17 +104,17 @@ async def update_card_limits(
 @router.post("/disable_card", response_model=Dict)
 async def disable_card(
     request: DisableCardRequest,
-    db: Session = Depends(get_db),
-    current_user = Depends(security.get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
 ):
     """Disable a virtual card"""
     try:
-        card = crud_virtual_card.get(db, id=request.card_id)
+        card = await crud_virtual_card.get(db, id=request.card_id)
         if not card:
             raise HTTPException(status_code=404, detail="Virtual card not found")
             
         update_data = VirtualCardUpdate(is_active=False)
-        crud_virtual_card.update(db, db_obj=card, obj_in=update_data)
+        await crud_virtual_card.update(db, db_obj=card, obj_in=update_data)
         return {
             "status": "success",
             "card_id": request.card_id,
@@ -112,53 +126,69 @@ async def disable_card(
         raise HTTPException(status_code=400, detail=str(e))
 
 # Transaction Functions
-@router.post("/make_purchase", response_model=Dict)
+@router.post("/make_purchase", response_model=Dict, dependencies=[_function_rate_limit("make_purchase")])
 async def make_purchase(
     request: MakePurchaseRequest,
-    db: Session = Depends(get_db),
-    current_user = Depends(security.get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
 ):
     """Process a purchase transaction using a virtual card"""
-    try:
-        # Verify card exists and is active
-        card = crud_virtual_card.get(db, id=request.card_id)
-        if not card:
-            raise HTTPException(status_code=404, detail="Virtual card not found")
-        if not card.is_active:
-            raise HTTPException(status_code=400, detail="Card is disabled")
-            
-        # Create transaction
-        transaction_data = TransactionCreate(
-            card_id=request.card_id,
-            amount=request.amount,
-            merchant=request.merchant,
-            merchant_category=request.merchant_category
+    # Check the card and debit it in one conditional update
+    card, rejection = await crud_virtual_card.try_debit(
+        db,
+        card_id=request.card_id,
+        user_id=current_user.id,
+        amount=Decimal(str(request.amount))
+    )
+    if not card:
+        raise HTTPException(
+            status_code=404 if rejection == CARD_NOT_FOUND else 400,
+            detail=rejection
         )
-        transaction = crud_transaction.create(db, obj_in=transaction_data)
-        return {
-            "status": "success",
-            "transaction_id": transaction.id,
-            "message": "Purchase processed successfully"
-        }
-    except HTTPException as he:
-        raise he
+
+    # The purchase row is committed together with the debit
+    transaction = Transaction(
+        user_id=current_user.id,
+        virtual_card_id=card.id,
+        amount=Decimal(str(request.amount)),
+        currency=card.currency,
+        type=TransactionType.PURCHASE,
+        status=TransactionStatus.COMPLETED,
+        merchant_name=request.merchant,
+        merchant_category=request.merchant_category,
+        provider="stripe",
+        completed_at=datetime.utcnow()
+    )
+    try:
+        db.add(transaction)
+        await db.commit()
     except Exception as e:
+        # Undo the debit explicitly rather than leaving it to session cleanup
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.post("/verify_transaction", response_model=Dict)
+    # The purchase changes the balance and spend the cached analytics report
+    await invalidate_user_cache(current_user.id)
+    return {
+        "status": "success",
+        "transaction_id": transaction.id,
+        "message": "Purchase processed successfully"
+    }
+
+@router.post("/verify_transaction", response_model=Dict, dependencies=[_function_rate_limit("verify_transaction")])
 async def verify_transaction(
     request: VerifyTransactionRequest,
-    db: Session = Depends(get_db),
-    current_user = Depends(security.get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
 ):
     """Verify a transaction's authenticity and compliance with card limits"""
     try:
-        transaction = crud_transaction.get(db, id=request.transaction_id)
-        if not transaction:
+        # The transaction and its card come back from one joined query
+        row = await crud_transaction.get_with_card(db, id=request.transaction_id)
+        if not row:
             raise HTTPException(status_code=404, detail="Transaction not found")
+        transaction, card, category_allowed = row
             
-        # Get associated card
-        card = crud_virtual_card.get(db, id=transaction.card_id)
         if not card:
             raise HTTPException(status_code=404, detail="Associated virtual card not found")
             
@@ -171,7 +201,7 @@ async def verify_transaction(
             }
             
         # Verify merchant category is allowed
-        if card.merchant_categories and transaction.merchant_category not in card.merchant_categories:
+        if not category_allowed:
             return {
                 "status": "failed",
                 "transaction_id": request.transaction_id,
@@ -191,12 +221,12 @@ async def verify_transaction(
 @router.get("/get_transaction_status/{transaction_id}", response_model=Dict)
 async def get_transaction_status(
     transaction_id: int,
-    db: Session = Depends(get_db),
-    current_user = Depends(security.get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
 ):
     """Get the current status of a transaction"""
     try:
-        transaction = crud_transaction.get(db, id=transaction_id)
+        transaction = await crud_transaction.get(db, id=transaction_id)
         if not transaction:
             raise HTTPException(status_code=404, detail="Transaction not found")
             
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Any, List
+from typing import Any, List, Optional
 
 from app.api.deps import get_current_user
+from app.crud.base import MAX_PAGE_SIZE
 from app.crud.crud_payment_method import payment_method
 from app.db.session import get_db
 from app.models.user import User
@@ -25,17 +26,34 @@ async def create_method(
 
 @router.get("/", response_model=List[PaymentMethod])
 async def read_methods(
+    response: Response,
     db: AsyncSession = Depends(get_db),
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
-    Retrieve payment methods.
+    Retrieve payment methods, newest first.
+
+    Pass the ``X-Next-Cursor`` header of one page as ``after`` to get the
+    next; ``skip`` is still honoured (as an OFFSET) for older clients.
     """
-    methods = await payment_method.get_by_user(
-        db, user_id=current_user.id, skip=skip, limit=limit
-    )
+    if skip:
+        return await payment_method.get_by_user(
+            db, user_id=current_user.id, skip=skip, limit=limit
+        )
+    try:
+        methods, next_cursor = await payment_method.get_page_by_user(
+            db, user_id=current_user.id, after=after, limit=limit
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return methods
 
 @router.get("/{method_id}", response_model=PaymentMethod)
@@ -48,13 +66,13 @@ async def read_method(
     """
     Get payment method by ID.
     """
-    method = await payment_method.get(db, id=method_id)
-    if not method:
+    method, exists = await payment_method.get_owned(db, id=method_id, user_id=current_user.id)
+    if not exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Payment method not found",
         )
-    if method.owner_id != current_user.id:
+    if not method:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
@@ -72,13 +90,13 @@ async def update_method(
     """
     Update payment method.
     """
-    method = await payment_method.get(db, id=method_id)
-    if not method:
+    method, exists = await payment_method.get_owned(db, id=method_id, user_id=current_user.id)
+    if not exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Payment method not found",
         )
-    if method.owner_id != current_user.id:
+    if not method:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
@@ -86,26 +104,27 @@ async def update_method(
     method = await payment_method.update(db, db_obj=method, obj_in=method_in)
     return method
 
-@router.delete("/{method_id}", response_model=PaymentMethod)
+@router.delete("/{method_id}", status_code=status.HTTP_204_NO_CONTENT, response_class=Response)
 async def delete_method(
     *,
     db: AsyncSession = Depends(get_db),
     method_id: int,
     current_user: User = Depends(get_current_user),
-) -> Any:
+) -> Response:
     """
     Delete payment method.
     """
-    method = await payment_method.get(db, id=method_id)
-    if not method:
+    method, exists = await payment_method.get_owned(db, id=method_id, user_id=current_user.id)
+    if not exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Payment method not found",
         )
-    if method.owner_id != current_user.id:
+    if not method:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
-    method = await payment_method.remove(db, id=method_id)
-    return method
+    await payment_method.delete(db, id=method_id)
+    # The client already has the row it deleted, so no body is sent back
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -8,7 +8,7 @@ import json
 
 from app.core.config import settings
 from app.core.oauth2 import GoogleOAuth2, GitHubOAuth2, get_social_account
-from app.core.security import create_access_token
+from app.core.security import UNUSABLE_PASSWORD, create_access_token
 from app.crud.crud_user import user
 from app.db.session import get_db
 from app.db.redis import get_redis
@@ -54,28 +54,24 @@ async def social_login(
     login_data: SocialLogin,
 ) -> Any:
     """Handle social login callback."""
-    # Verify state
+    # Verify and consume state in one round trip; GETDEL also makes the state
+    # single-use when the same callback arrives twice
     redis_key = f"oauth2_state:{login_data.state}"
-    stored_provider = await redis.get(redis_key)
+    stored_provider = await redis.getdel(redis_key)
     if not stored_provider or stored_provider != login_data.provider:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid state parameter"
         )
     
-    # Clean up state
-    await redis.delete(redis_key)
-    
     try:
-        # Get user info from provider
         social_account = await get_social_account(login_data.provider, login_data.code)
-        
-        # Check if user exists
-        db_user = await user.get_by_email(db, email=social_account.email)
-        
-        if db_user:
-            # Update existing user's social info
-            update_data = {
+
+        # Create the user or update an existing user's social info in one statement
+        db_user = await user.upsert_social(
+            db,
+            email=social_account.email,
+            social_data={
                 "social_provider": social_account.provider,
                 "social_id": social_account.account_id,
                 "social_picture": social_account.picture,
@@ -85,33 +81,20 @@ async def social_login(
                     datetime.utcnow() + timedelta(seconds=social_account.expires_at)
                     if social_account.expires_at else None
                 ),
-            }
-            db_user = await user.update(db, db_obj=db_user, obj_in=update_data)
-        else:
-            # Create new user
-            user_in = {
-                "email": social_account.email,
+            },
+            new_user_data={
                 "full_name": social_account.name,
                 "is_active": True,  # Social login users are automatically active
                 "email_verified": True,  # Email is verified by the provider
-                "social_provider": social_account.provider,
-                "social_id": social_account.account_id,
-                "social_picture": social_account.picture,
-                "social_access_token": social_account.access_token,
-                "social_refresh_token": social_account.refresh_token,
-                "social_token_expires_at": (
-                    datetime.utcnow() + timedelta(seconds=social_account.expires_at)
-                    if social_account.expires_at else None
-                ),
-                # Generate a random password for social users
-                "password": secrets.token_urlsafe(32),
+                # Not a real hash, so no KDF work is needed; an existing user keeps theirs
+                "hashed_password": UNUSABLE_PASSWORD,
             }
-            db_user = await user.create(db, obj_in=user_in)
+        )
         
         # Generate access token
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": db_user.email}, expires_delta=access_token_expires
+            db_user.id, expires_delta=access_token_expires
         )
         
         return {"access_token": access_token, "token_type": "bearer"}
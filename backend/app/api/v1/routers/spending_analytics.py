@@ -4,12 +4,14 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user, get_db
+from app.core.cache import cached
 from app.models.user import User
 from app.services.spending_analytics_service import SpendingAnalyticsService
 
 router = APIRouter()
 
 @router.get("/summary")
+@cached("analytics:summary", "card_id", "period", "end_date")
 async def get_spending_summary(
     period: str = Query("monthly", regex="^(daily|weekly|monthly|yearly|all)$"),
     card_id: Optional[int] = None,
@@ -27,6 +29,7 @@ async def get_spending_summary(
     )
 
 @router.get("/trends")
+@cached("analytics:trends", "card_id", "period", "num_periods", "end_date")
 async def get_spending_trends(
     period: str = Query("monthly", regex="^(daily|weekly|monthly|yearly)$"),
     num_periods: int = Query(12, ge=1, le=60),
@@ -46,6 +49,7 @@ async def get_spending_trends(
     )
 
 @router.get("/merchant-insights")
+@cached("analytics:merchants", "card_id", "period", "end_date")
 async def get_merchant_insights(
     period: str = Query("monthly", regex="^(daily|weekly|monthly|yearly|all)$"),
     card_id: Optional[int] = None,
@@ -63,6 +67,7 @@ async def get_merchant_insights(
     )
 
 @router.get("/cards/{card_id}/limits-analysis")
+@cached("analytics:limits", "card_id", "period")
 async def get_spending_limits_analysis(
     card_id: int,
     period: str = Query("monthly", regex="^(daily|weekly|monthly|yearly)$"),
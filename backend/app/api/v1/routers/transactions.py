@@ -1,9 +1,11 @@
-from decimal import Decimal
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Any, List, Optional
 
 from app.api.deps import get_current_user
+from app.core.cache import invalidate_user_cache
+from app.crud.base import MAX_PAGE_SIZE
 from app.crud.crud_transaction import transaction
 from app.crud.crud_virtual_card import virtual_card
 from app.db.session import get_db
@@ -26,17 +28,15 @@ async def create_new_transaction(
     """
     # If virtual card is involved, validate the transaction
     if transaction_in.virtual_card_id:
-        card = await virtual_card.get(db, id=transaction_in.virtual_card_id)
+        # Existence and ownership are checked by the same query
+        card = await virtual_card.get_for_txn(
+            db, id=transaction_in.virtual_card_id, user_id=current_user.id
+        )
         if not card:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Virtual card not found",
             )
-        if card.owner_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enough permissions",
-            )
         
         # For purchases and withdrawals, validate card controls
         if transaction_in.type in [TransactionType.PURCHASE, TransactionType.WITHDRAWAL]:
@@ -44,7 +44,7 @@ async def create_new_transaction(
                 await VirtualCardService.validate_transaction(
                     db=db,
                     card=card,
-                    amount=Decimal(str(transaction_in.amount)),
+                    amount=transaction_in.amount,
                     merchant_id=transaction_in.merchant_id,
                     merchant_category=transaction_in.merchant_category,
                     country_code=transaction_in.merchant_country,
@@ -54,41 +54,41 @@ async def create_new_transaction(
                     is_international=transaction_in.is_international,
                 )
             except HTTPException as e:
-                # Create failed transaction record
-                transaction_dict = transaction_in.dict()
+                # Reject straight away; the failed transaction is recorded
+                # after the response is sent
+                transaction_dict = transaction_in.model_dump(exclude={"location"})
                 transaction_dict.update({
                     "status": TransactionStatus.FAILED,
                     "decline_reason": e.detail,
                     "user_id": current_user.id
                 })
-                transaction_obj = await transaction.create(db, obj_in=transaction_dict)
-                
-                # Update card statistics
-                await VirtualCardService.update_spend(
-                    db=db,
-                    card=card,
-                    amount=Decimal(str(transaction_in.amount)),
-                    success=False
+                background = BackgroundTasks()
+                background.add_task(VirtualCardService.record_declined_transaction, transaction_dict, card.id)
+                background.add_task(invalidate_user_cache, current_user.id)
+                # Returned rather than raised: exception responses drop background tasks
+                return JSONResponse(
+                    status_code=e.status_code,
+                    content={"detail": e.detail},
+                    headers=e.headers,
+                    background=background
                 )
-                
-                raise e
     
     # Create the transaction
-    transaction_dict = transaction_in.dict()
+    transaction_dict = transaction_in.model_dump(exclude={"location"})
     transaction_dict.update({
         "user_id": current_user.id,
         "status": TransactionStatus.PENDING
     })
     
-    # If location is provided, flatten it
-    if transaction_in.location:
-        location_dict = transaction_in.location.dict()
+    # If location is provided, flatten it straight from the model (no nested dump)
+    location = transaction_in.location
+    if location:
         transaction_dict.update({
-            "location_city": location_dict["city"],
-            "location_country": location_dict["country"],
-            "location_postal_code": location_dict["postal_code"],
-            "location_lat": location_dict["latitude"],
-            "location_lon": location_dict["longitude"],
+            "location_city": location.city,
+            "location_country": location.country,
+            "location_postal_code": location.postal_code,
+            "location_lat": location.latitude,
+            "location_lon": location.longitude,
         })
     
     transaction_obj = await transaction.create(db, obj_in=transaction_dict)
@@ -98,25 +98,43 @@ async def create_new_transaction(
         await VirtualCardService.update_spend(
             db=db,
             card=card,
-            amount=Decimal(str(transaction_in.amount)),
+            amount=transaction_in.amount,
             success=True
         )
     
+    await invalidate_user_cache(current_user.id)
     return transaction_obj
 
 @router.get("/", response_model=List[Transaction])
 async def read_transactions(
+    response: Response,
     db: AsyncSession = Depends(get_db),
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
-    Retrieve transactions.
+    Retrieve transactions, newest first.
+
+    Pass the ``X-Next-Cursor`` header of one page as ``after`` to get the
+    next; ``skip`` is still honoured (as an OFFSET) for older clients.
     """
-    transactions = await transaction.get_by_user(
-        db, user_id=current_user.id, skip=skip, limit=limit
-    )
+    if skip:
+        return await transaction.get_by_user(
+            db, user_id=current_user.id, skip=skip, limit=limit
+        )
+    try:
+        transactions, next_cursor = await transaction.get_page_by_user(
+            db, user_id=current_user.id, after=after, limit=limit
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return transactions
 
 @router.get("/{transaction_id}", response_model=Transaction)
@@ -129,13 +147,13 @@ async def read_transaction(
     """
     Get transaction by ID.
     """
-    transaction_obj = await transaction.get(db, id=transaction_id)
-    if not transaction_obj:
+    transaction_obj, exists = await transaction.get_owned(db, id=transaction_id, user_id=current_user.id)
+    if not exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Transaction not found",
         )
-    if transaction_obj.user_id != current_user.id:
+    if not transaction_obj:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
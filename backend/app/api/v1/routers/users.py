@@ -2,14 +2,17 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Any, List
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_active_user, get_current_user
+from app.core.cache import cached
 from app.crud.crud_user import user
 from app.db.session import get_db
 from app.models.user import User
-from app.schemas.user import UserCreate, UserUpdate, UserInDB
+from app.schemas.user import User as PublicUser, UserCreate, UserUpdate, UserInDB
 
 router = APIRouter()
 
+USER_PROFILE_CACHE_TTL = 60  # seconds; other viewers may see a profile this stale
+
 @router.post("/", response_model=UserInDB)
 async def create_new_user(
     *,
@@ -20,9 +23,9 @@ async def create_new_user(
     Create new user.
     """
     user_obj = await user.create(db, obj_in=user_in)
-    return user
+    return user_obj
 
-@router.get("/me", response_model=UserInDB)
+@router.get("/me", response_model=PublicUser)
 async def read_user_me(
     current_user: User = Depends(get_current_user),
 ) -> Any:
@@ -41,25 +44,31 @@ async def update_user_me(
     """
     Update own user.
     """
-    user_obj = await user.update(db, db_obj=current_user, obj_in=user_in)
-    return user
+    # current_user only carries the cached profile columns; update the full row
+    # in this request's session
+    db_user = await user.get(db, id=current_user.id)
+    user_obj = await user.update(db, db_obj=db_user, obj_in=user_in)
+    return user_obj
 
-@router.get("/{user_id}", response_model=UserInDB)
+@router.get("/{user_id}", response_model=PublicUser)
+@cached("users:profile", "user_id", expire=USER_PROFILE_CACHE_TTL)
 async def read_user_by_id(
     user_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Get a specific user by id.
     """
-    user_obj = await user.get(db, id=user_id)
-    if not user:
+    # The caller's own profile is already loaded by authentication
+    user_obj = current_user if user_id == current_user.id else await user.get(db, id=user_id)
+    if not user_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
-    return user
+    # Plain JSON data, so the response cache can store it
+    return PublicUser.model_validate(user_obj).model_dump(mode="json")
 
 @router.get("/", response_model=List[UserInDB])
 async def read_users(
@@ -3,11 +3,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Any, List
 from datetime import datetime, timezone
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, get_current_user_id
+from app.core.cache import invalidate_user_cache
 from app.crud.crud_virtual_card import virtual_card
 from app.db.session import get_db
 from app.models.user import User
-from app.models.virtual_card import CardStatus
+from app.models.virtual_card import CardStatus, VirtualCard as VirtualCardModel
 from app.schemas.virtual_card import (
     VirtualCard,
     VirtualCardCreate,
@@ -21,6 +22,51 @@ from app.schemas.virtual_card import (
 
 router = APIRouter()
 
+async def _load_owned_card(
+    db: AsyncSession, card_id: int, user: User, for_update: bool
+) -> VirtualCardModel:
+    card, exists = await virtual_card.get_owned(
+        db, id=card_id, user_id=user.id, for_update=for_update
+    )
+    if not exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Virtual card not found",
+        )
+    if not card:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    return card
+
+async def get_owned_card(
+    card_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> VirtualCardModel:
+    """Load a card the caller owns (404 if missing, 403 if someone else's)."""
+    return await _load_owned_card(db, card_id, current_user, for_update=False)
+
+async def get_card_for_update(
+    card_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> VirtualCardModel:
+    """Like get_owned_card, but the row stays locked until the handler commits."""
+    return await _load_owned_card(db, card_id, current_user, for_update=True)
+
+async def get_updatable_card(
+    card: VirtualCardModel = Depends(get_card_for_update),
+) -> VirtualCardModel:
+    """A locked, owned card that is not cancelled."""
+    if card.status == CardStatus.CANCELLED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot update a cancelled card",
+        )
+    return card
+
 @router.post("/", response_model=VirtualCard)
 async def create_card(
     *,
@@ -39,66 +85,35 @@ async def read_cards(
     db: AsyncSession = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ) -> Any:
     """
     Retrieve virtual cards.
     """
     cards = await virtual_card.get_by_user(
-        db, user_id=current_user.id, skip=skip, limit=limit
+        db, user_id=current_user_id, skip=skip, limit=limit
     )
     return cards
 
 @router.get("/{card_id}", response_model=VirtualCard)
 async def read_card(
-    *,
-    db: AsyncSession = Depends(get_db),
-    card_id: int,
-    current_user: User = Depends(get_current_user),
+    card: VirtualCardModel = Depends(get_owned_card),
 ) -> Any:
     """
     Get virtual card by ID.
     """
-    card = await virtual_card.get(db, id=card_id)
-    if not card:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Virtual card not found",
-        )
-    if card.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions",
-        )
     return card
 
 @router.put("/{card_id}", response_model=VirtualCard)
 async def update_card(
     *,
     db: AsyncSession = Depends(get_db),
-    card_id: int,
+    card: VirtualCardModel = Depends(get_updatable_card),
     card_in: VirtualCardUpdate,
-    current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Update virtual card.
     """
-    card = await virtual_card.get(db, id=card_id)
-    if not card:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Virtual card not found",
-        )
-    if card.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions",
-        )
-    if card.status == CardStatus.CANCELLED:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot update a cancelled card",
-        )
     card = await virtual_card.update(db, db_obj=card, obj_in=card_in)
     return card
 
@@ -106,34 +121,18 @@ async def update_card(
 async def update_spending_limits(
     *,
     db: AsyncSession = Depends(get_db),
-    card_id: int,
+    card: VirtualCardModel = Depends(get_updatable_card),
     limits_in: VirtualCardSpendingUpdate,
-    current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Update card spending limits.
     """
-    card = await virtual_card.get(db, id=card_id)
-    if not card:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Virtual card not found",
-        )
-    if card.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions",
-        )
-    if card.status == CardStatus.CANCELLED:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot update a cancelled card",
-        )
     
-    # Convert spending limits to dictionary format
-    spending_limits = {}
-    for limit in limits_in.spending_limits:
-        spending_limits[limit.period.value] = float(limit.amount)
+    # Amounts are stored as decimal strings so JSON keeps them exact; readers
+    # already go through Decimal(str(...))
+    spending_limits = {
+        limit.period.value: str(limit.amount) for limit in limits_in.spending_limits
+    }
     
     card = await virtual_card.update(db, db_obj=card, obj_in={"spending_limits": spending_limits})
     return card
@@ -142,29 +141,12 @@ async def update_spending_limits(
 async def update_merchant_controls(
     *,
     db: AsyncSession = Depends(get_db),
-    card_id: int,
+    card: VirtualCardModel = Depends(get_updatable_card),
     controls_in: VirtualCardMerchantUpdate,
-    current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Update card merchant controls.
     """
-    card = await virtual_card.get(db, id=card_id)
-    if not card:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Virtual card not found",
-        )
-    if card.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions",
-        )
-    if card.status == CardStatus.CANCELLED:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot update a cancelled card",
-        )
     
     update_data = {
         "allowed_merchant_categories": controls_in.merchant_controls.allowed_categories or [],
@@ -180,29 +162,12 @@ async def update_merchant_controls(
 async def update_geographic_controls(
     *,
     db: AsyncSession = Depends(get_db),
-    card_id: int,
+    card: VirtualCardModel = Depends(get_updatable_card),
     controls_in: VirtualCardGeographicUpdate,
-    current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Update card geographic controls.
     """
-    card = await virtual_card.get(db, id=card_id)
-    if not card:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Virtual card not found",
-        )
-    if card.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions",
-        )
-    if card.status == CardStatus.CANCELLED:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot update a cancelled card",
-        )
     
     update_data = {
         "allowed_countries": controls_in.geographic_controls.allowed_countries or [],
@@ -216,29 +181,12 @@ async def update_geographic_controls(
 async def update_transaction_controls(
     *,
     db: AsyncSession = Depends(get_db),
-    card_id: int,
+    card: VirtualCardModel = Depends(get_updatable_card),
     controls_in: VirtualCardTransactionUpdate,
-    current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Update card transaction controls.
     """
-    card = await virtual_card.get(db, id=card_id)
-    if not card:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Virtual card not found",
-        )
-    if card.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions",
-        )
-    if card.status == CardStatus.CANCELLED:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot update a cancelled card",
-        )
     
     update_data = {
         "allow_online_transactions": controls_in.transaction_controls.allow_online,
@@ -257,24 +205,12 @@ async def update_transaction_controls(
 async def freeze_card(
     *,
     db: AsyncSession = Depends(get_db),
-    card_id: int,
+    card: VirtualCardModel = Depends(get_card_for_update),
     freeze_in: VirtualCardFreeze,
-    current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Freeze a virtual card.
     """
-    card = await virtual_card.get(db, id=card_id)
-    if not card:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Virtual card not found",
-        )
-    if card.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions",
-        )
     if card.status == CardStatus.CANCELLED:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -297,23 +233,11 @@ async def freeze_card(
 async def unfreeze_card(
     *,
     db: AsyncSession = Depends(get_db),
-    card_id: int,
-    current_user: User = Depends(get_current_user),
+    card: VirtualCardModel = Depends(get_card_for_update),
 ) -> Any:
     """
     Unfreeze a virtual card.
     """
-    card = await virtual_card.get(db, id=card_id)
-    if not card:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Virtual card not found",
-        )
-    if card.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions",
-        )
     if card.status == CardStatus.CANCELLED:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -336,22 +260,12 @@ async def unfreeze_card(
 async def delete_card(
     *,
     db: AsyncSession = Depends(get_db),
-    card_id: int,
-    current_user: User = Depends(get_current_user),
+    card: VirtualCardModel = Depends(get_card_for_update),
 ) -> Any:
     """
     Delete virtual card.
     """
-    card = await get_virtual_card(db, id=card_id)
-    if not card:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Virtual card not found",
-        )
-    if card.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions",
-        )
-    card = await virtual_card.remove(db, id=card_id)
+    await db.delete(card)
+    await db.commit()
+    await invalidate_user_cache(card.user_id)
     return card
@@ -1,48 +1,54 @@
 from typing import Optional
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user, get_db
-from app.models.user import User
+from app.api.deps import get_current_user_id, get_db
+from app.core.cache import cached, period_ttl
 from app.services.visualization_service import VisualizationService
 
+# Chart payloads are plain dicts of JSON types, so routes render them directly
+# with orjson and skip jsonable_encoder
 router = APIRouter()
 
 @router.get("/spending/pie-chart")
+@cached("viz:pie", "card_id", "period", "category_code", expire=period_ttl)
 async def get_spending_pie_chart(
     period: str = Query("monthly", regex="^(daily|weekly|monthly|yearly|all)$"),
     card_id: Optional[int] = None,
     category_code: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user_id: int = Depends(get_current_user_id)
 ):
     """Get pie chart data showing category spending breakdown."""
-    return await VisualizationService.get_spending_pie_chart(
+    return ORJSONResponse(await VisualizationService.get_spending_pie_chart(
         db=db,
-        user_id=current_user.id,
+        user_id=current_user_id,
         card_id=card_id,
         period=period,
         category_code=category_code
-    )
+    ))
 
 @router.get("/spending/trend-line")
+@cached("viz:trend", "card_id", "period", "num_periods", expire=period_ttl)
 async def get_spending_trend_line(
     period: str = Query("monthly", regex="^(daily|weekly|monthly|yearly)$"),
     num_periods: int = Query(12, ge=1, le=60),
     card_id: Optional[int] = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user_id: int = Depends(get_current_user_id)
 ):
     """Get line chart data showing spending trends."""
-    return await VisualizationService.get_spending_trend_line(
+    return ORJSONResponse(await VisualizationService.get_spending_trend_line(
         db=db,
-        user_id=current_user.id,
+        user_id=current_user_id,
         card_id=card_id,
         period=period,
         num_periods=num_periods
-    )
+    ))
 
 @router.get("/spending/category-bars")
+@cached("viz:bars", "card_id", "period", "top_n", "category_code", "view_type", expire=period_ttl)
 async def get_category_bar_chart(
     period: str = Query("monthly", regex="^(daily|weekly|monthly|yearly|all)$"),
     top_n: int = Query(5, ge=1, le=20),
@@ -50,34 +56,36 @@ async def get_category_bar_chart(
     category_code: Optional[str] = None,
     view_type: str = Query("spend", regex="^(spend|transactions)$"),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user_id: int = Depends(get_current_user_id)
 ):
     """Get bar chart data showing top spending categories."""
-    return await VisualizationService.get_category_bar_chart(
+    return ORJSONResponse(await VisualizationService.get_category_bar_chart(
         db=db,
-        user_id=current_user.id,
+        user_id=current_user_id,
         card_id=card_id,
         period=period,
         top_n=top_n,
         category_code=category_code,
         view_type=view_type
-    )
+    ))
 
 @router.get("/cards/{card_id}/limit-gauges")
+@cached("viz:gauges", "card_id", "period", expire=period_ttl)
 async def get_limits_gauge_charts(
     card_id: int,
     period: str = Query("monthly", regex="^(daily|weekly|monthly|yearly)$"),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user_id: int = Depends(get_current_user_id)
 ):
     """Get gauge chart data showing spending limits usage."""
-    return await VisualizationService.get_limits_gauge_charts(
+    return ORJSONResponse(await VisualizationService.get_limits_gauge_charts(
         db=db,
         card_id=card_id,
         period=period
-    )
+    ))
 
 @router.get("/spending/merchant-bubbles")
+@cached("viz:bubbles", "card_id", "period", "top_n", "category_code", "merchant_name", expire=period_ttl)
 async def get_merchant_bubble_chart(
     period: str = Query("monthly", regex="^(daily|weekly|monthly|yearly|all)$"),
     top_n: int = Query(20, ge=1, le=50),
@@ -85,15 +93,15 @@ async def get_merchant_bubble_chart(
     category_code: Optional[str] = None,
     merchant_name: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user_id: int = Depends(get_current_user_id)
 ):
     """Get bubble chart data showing merchant spending patterns."""
-    return await VisualizationService.get_merchant_bubble_chart(
+    return ORJSONResponse(await VisualizationService.get_merchant_bubble_chart(
         db=db,
-        user_id=current_user.id,
+        user_id=current_user_id,
         card_id=card_id,
         period=period,
         top_n=top_n,
         category_code=category_code,
         merchant_name=merchant_name
-    )
+    ))
@@ -0,0 +1,84 @@
+"""Redis cache of authenticated users, shared across workers."""
+import logging
+from datetime import datetime
+from typing import Optional
+
+import orjson
+from redis.exceptions import RedisError
+from sqlalchemy import DateTime, inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.db.redis import redis_client
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_TTL = 60  # seconds
+
+# Only the columns endpoints read from current_user; passwords, reset and
+# verification codes, 2FA secrets and provider tokens never reach Redis
+CACHED_USER_COLUMNS = (
+    "id",
+    "email",
+    "full_name",
+    "is_active",
+    "is_superuser",
+    "email_verified",
+    "created_at",
+    "updated_at",
+    "last_login",
+)
+_DATETIME_COLUMNS = [
+    key for key, column in inspect(User).columns.items()
+    if key in CACHED_USER_COLUMNS and isinstance(column.type, DateTime)
+]
+
+def _user_key(token_digest: bytes) -> str:
+    return "u:" + token_digest.hex()
+
+def _user_tokens_key(user_id: int) -> str:
+    """Set of a user's cached token keys, for invalidation."""
+    return f"u:tokens:{user_id}"
+
+async def get_cached_user(token_digest: bytes) -> Optional[User]:
+    """Return the user cached for a token digest, or None on a miss."""
+    try:
+        data = await redis_client.get(_user_key(token_digest))
+    except RedisError as e:
+        logger.warning(f"User cache read failed: {str(e)}")
+        return None
+    if data is None:
+        return None
+
+    fields = orjson.loads(data)
+    for key in _DATETIME_COLUMNS:
+        if fields.get(key):
+            fields[key] = datetime.fromisoformat(fields[key])
+    user = User(**fields)
+    # Mark it as an existing row; the other columns are not loaded, so a route
+    # needing them reads the user in its own session
+    make_transient_to_detached(user)
+    return user
+
+async def cache_user(token_digest: bytes, user: User) -> None:
+    """Cache a user under a token digest and record the key for invalidation."""
+    key = _user_key(token_digest)
+    tokens_key = _user_tokens_key(user.id)
+    body = orjson.dumps({column: getattr(user, column) for column in CACHED_USER_COLUMNS})
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.setex(key, USER_CACHE_TTL, body)
+            pipe.sadd(tokens_key, key)
+            pipe.expire(tokens_key, USER_CACHE_TTL)
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"User cache write failed: {str(e)}")
+
+async def invalidate_cached_user(user_id: int) -> None:
+    """Drop every cached entry for a user, e.g. after a password or 2FA change."""
+    tokens_key = _user_tokens_key(user_id)
+    try:
+        keys = await redis_client.smembers(tokens_key)
+        await redis_client.delete(tokens_key, *keys)
+    except RedisError as e:
+        logger.warning(f"User cache invalidation failed: {str(e)}")
@@ -0,0 +1,85 @@
+"""Redis cache-aside for per-user read endpoints."""
+import functools
+import logging
+from typing import Any, Awaitable, Callable, Dict, Union
+
+import orjson
+from fastapi import Response
+from redis.exceptions import RedisError
+
+from app.db.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_CACHE_TTL = 300  # seconds
+
+# Chart TTLs by reporting period; longer periods change more slowly
+PERIOD_CACHE_TTLS = {
+    "daily": 60,
+    "weekly": 300,
+    "monthly": 1800,
+    "yearly": 3600,
+    "all": 300,
+}
+
+# Outlives every cached response, so invalidation can still find them all
+_KEYS_SET_TTL = max(PERIOD_CACHE_TTLS.values())
+
+def period_ttl(kwargs: Dict[str, Any]) -> int:
+    """TTL for a route cached by its ``period`` argument."""
+    return PERIOD_CACHE_TTLS.get(kwargs.get("period"), ANALYTICS_CACHE_TTL)
+
+def _user_keys_key(user_id: int) -> str:
+    """Set of a user's cached response keys, for invalidation."""
+    return f"cache:keys:{user_id}"
+
+def cached(
+    prefix: str,
+    *key_params: str,
+    expire: Union[int, Callable[[Dict[str, Any]], int]] = ANALYTICS_CACHE_TTL
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """
+    Cache a route's JSON result per user and per value of ``key_params``.
+
+    The wrapped route must take ``current_user`` or ``current_user_id``. Hits are returned as the
+    stored bytes, so neither the query nor the serialization runs again.
+    ``expire`` is a TTL in seconds or a function of the route's arguments.
+    """
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(func)
+        async def wrapper(**kwargs: Any) -> Any:
+            user_id = kwargs["current_user"].id if "current_user" in kwargs else kwargs["current_user_id"]
+            key = ":".join([prefix, str(user_id), *(str(kwargs[name]) for name in key_params)])
+            try:
+                data = await redis_client.get(key)
+            except RedisError as e:
+                logger.warning(f"Response cache read failed: {str(e)}")
+                data = None
+            if data is not None:
+                return Response(content=data, media_type="application/json")
+
+            result = await func(**kwargs)
+            # Routes may render their own response; cache its body as is
+            body = result.body if isinstance(result, Response) else orjson.dumps(result)
+            keys_key = _user_keys_key(user_id)
+            ttl = expire(kwargs) if callable(expire) else expire
+            try:
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    pipe.setex(key, ttl, body)
+                    pipe.sadd(keys_key, key)
+                    pipe.expire(keys_key, _KEYS_SET_TTL)
+                    await pipe.execute()
+            except RedisError as e:
+                logger.warning(f"Response cache write failed: {str(e)}")
+            return result
+        return wrapper
+    return decorator
+
+async def invalidate_user_cache(user_id: int) -> None:
+    """Drop every cached response for a user, e.g. after a new transaction."""
+    keys_key = _user_keys_key(user_id)
+    try:
+        keys = await redis_client.smembers(keys_key)
+        await redis_client.delete(keys_key, *keys)
+    except RedisError as e:
+        logger.warning(f"Response cache invalidation failed: {str(e)}")
@@ -1,5 +1,6 @@
-from typing import Any, Dict, List, Optional, Union
-from pydantic import AnyHttpUrl, PostgresDsn, field_validator, SecretStr
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import PostgresDsn, field_validator, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import os
 
@@ -12,7 +13,8 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=f".env.{os.getenv('APP_ENV', 'development')}",
         case_sensitive=True,
-        env_prefix="APP_"
+        env_prefix="APP_",
+        frozen=True  # Read once per process; never mutated afterwards
     )
 
     # Environment
@@ -24,25 +26,29 @@ class Settings(BaseSettings):
     PORT: int = 8000
 
     # CORS
-    BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = [
+    # Plain strings: CORSMiddleware compares them verbatim, and URL parsing
+    # would also add a trailing slash that never matches an Origin header
+    BACKEND_CORS_ORIGINS: Tuple[str, ...] = (
         "http://localhost:3000",  # Development frontend
         "http://localhost:8080",  # Development alternative
         "https://staging.windsurf.com",  # Staging
         "https://windsurf.com"  # Production
-    ]
+    )
 
     @field_validator("BACKEND_CORS_ORIGINS", mode='before')
-    def assemble_cors_origins(cls, v: Union[str, List[str]]) -> Union[List[str], str]:
+    @classmethod
+    def assemble_cors_origins(cls, v: Any) -> Any:
         if isinstance(v, str) and not v.startswith("["):
-            return [i.strip() for i in v.split(",")]
-        elif isinstance(v, (list, str)):
-            return v
-        raise ValueError(v)
+            return tuple(i.strip() for i in v.split(",") if i.strip())
+        return v
 
     # Security
     JWT_SECRET: SecretStr
     SECRET_KEY: SecretStr
+    BACKUP_CODE_PEPPER: Optional[SecretStr] = None  # Falls back to SECRET_KEY
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    AUTH_MODE: str = "mock"  # "mock" or "jwt"
+    JWT_FAST_ENCODE: bool = True  # False signs tokens with python-jose instead
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
     VERIFICATION_CODE_EXPIRE_MINUTES: int = 15
     PASSWORD_RESET_TOKEN_EXPIRE_MINUTES: int = 60
@@ -80,9 +86,10 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: SecretStr
     POSTGRES_DB: str
     SQLALCHEMY_DATABASE_URI: Optional[PostgresDsn] = None
-    SQLALCHEMY_POOL_SIZE: int = 5
-    SQLALCHEMY_MAX_OVERFLOW: int = 10
+    SQLALCHEMY_POOL_SIZE: int = 25
+    SQLALCHEMY_MAX_OVERFLOW: int = 25
     SQLALCHEMY_POOL_TIMEOUT: int = 30
+    SQLALCHEMY_POOL_RECYCLE: int = 1800  # Seconds; below typical server/proxy idle timeouts
 
     @field_validator("SQLALCHEMY_DATABASE_URI", mode='before')
     def assemble_db_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
@@ -91,7 +98,8 @@ class Settings(BaseSettings):
         return PostgresDsn.build(
             scheme="postgresql+asyncpg",
             username=values.data.get("POSTGRES_USER"),
-            password=str(values.data.get("POSTGRES_PASSWORD")),
+            # str() of a SecretStr is the masked "**********"
+            password=values.data["POSTGRES_PASSWORD"].get_secret_value() if values.data.get("POSTGRES_PASSWORD") else None,
             host=values.data.get("POSTGRES_SERVER"),
             path=f"{values.data.get('POSTGRES_DB') or ''}",
         )
@@ -119,6 +127,10 @@ class Settings(BaseSettings):
     RATE_LIMIT_EMAIL_VERIFY_WINDOW: int = 300
     RATE_LIMIT_API_KEY_MAX: int = 1000
     RATE_LIMIT_API_KEY_WINDOW: int = 3600
+    RATE_LIMIT_AI_FUNCTION_MAX: int = 30  # Per user, per OpenAI function endpoint
+    RATE_LIMIT_AI_FUNCTION_WINDOW: int = 60
+    # Rule keys counted exactly (sorted set per client); others use two counters
+    RATE_LIMIT_EXACT_KEYS: List[str] = ["login"]
 
     # OpenAI
     OPENAI_API_KEY: SecretStr
@@ -181,4 +193,12 @@ class Settings(BaseSettings):
                 env_vars[key] = "***"
         return env_vars
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """The process-wide settings, also usable as a FastAPI dependency."""
+    return Settings()
+
+settings = get_settings()
+
+# Rendered once; the engine and alembic take a plain string, not a PostgresDsn
+DATABASE_URL = str(settings.SQLALCHEMY_DATABASE_URI)
@@ -0,0 +1,13 @@
+"""Process-wide HTTP client for outbound API calls."""
+import httpx
+
+from app.core.config import settings
+
+# One pool for every OpenAI client in the app (the advisor agent and
+# openai_service), so warm TLS connections are reused across requests and
+# HTTP/2 lets concurrent calls share a connection. Closed in the app lifespan.
+http_client = httpx.AsyncClient(
+    http2=True,
+    timeout=settings.OPENAI_REQUEST_TIMEOUT,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+)
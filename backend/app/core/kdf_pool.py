@@ -0,0 +1,8 @@
+"""Process pool for password hashing (bcrypt), kept off the event loop."""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Each bcrypt round takes tens to hundreds of milliseconds of CPU, so hashes run
+# in worker processes sized to the machine. Workers start on first use; the
+# pool is shut down in the app lifespan.
+kdf_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
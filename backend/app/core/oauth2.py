@@ -1,4 +1,5 @@
 from typing import Dict, Optional, Tuple
+from urllib.parse import urlencode
 import httpx
 from fastapi import HTTPException, status
 from pydantic import BaseModel
@@ -22,20 +23,20 @@ class GoogleOAuth2:
     TOKEN_ENDPOINT = "https://oauth2.googleapis.com/token"
     USERINFO_ENDPOINT = "https://www.googleapis.com/oauth2/v2/userinfo"
     
+    # Everything but the state is fixed, so the query string is built once
+    AUTHORIZE_URL_PREFIX = AUTHORIZE_ENDPOINT + "?" + urlencode({
+        "client_id": settings.GOOGLE_CLIENT_ID,
+        "response_type": "code",
+        "scope": "openid email profile",
+        "redirect_uri": settings.GOOGLE_REDIRECT_URI,
+        "access_type": "offline",  # To get refresh token
+        "prompt": "consent",  # To always get refresh token
+    }) + "&state="
+    
     @classmethod
     def get_authorize_url(cls, state: str) -> str:
         """Get Google OAuth2 authorization URL."""
-        params = {
-            "client_id": settings.GOOGLE_CLIENT_ID,
-            "response_type": "code",
-            "scope": "openid email profile",
-            "redirect_uri": settings.GOOGLE_REDIRECT_URI,
-            "state": state,
-            "access_type": "offline",  # To get refresh token
-            "prompt": "consent",  # To always get refresh token
-        }
-        query = "&".join(f"{k}={v}" for k, v in params.items())
-        return f"{cls.AUTHORIZE_ENDPOINT}?{query}"
+        return cls.AUTHORIZE_URL_PREFIX + state
     
     @classmethod
     async def get_token(cls, code: str) -> Dict[str, str]:
@@ -84,16 +85,15 @@ class GitHubOAuth2:
     USERINFO_ENDPOINT = "https://api.github.com/user"
     EMAIL_ENDPOINT = "https://api.github.com/user/emails"
     
+    AUTHORIZE_URL_PREFIX = AUTHORIZE_ENDPOINT + "?" + urlencode({
+        "client_id": settings.GITHUB_CLIENT_ID,
+        "scope": "read:user user:email",
+    }) + "&state="
+    
     @classmethod
     def get_authorize_url(cls, state: str) -> str:
         """Get GitHub OAuth2 authorization URL."""
-        params = {
-            "client_id": settings.GITHUB_CLIENT_ID,
-            "scope": "read:user user:email",
-            "state": state,
-        }
-        query = "&".join(f"{k}={v}" for k, v in params.items())
-        return f"{cls.AUTHORIZE_ENDPOINT}?{query}"
+        return cls.AUTHORIZE_URL_PREFIX + state
     
     @classmethod
     async def get_token(cls, code: str) -> Dict[str, str]:
@@ -0,0 +1,22 @@
+-- Approximate sliding window: one counter per fixed window, with the previous
+-- window's count weighted by how much of it still overlaps the sliding window.
+-- KEYS = {current window counter, previous window counter}
+-- ARGV = {now_ms, window_ms, limit}
+-- Returns {allowed (1 or 0), weighted count, retry_after_ms}
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local remaining = window - (now % window)
+local weighted = previous * remaining / window + current
+
+if weighted >= limit then
+    return {0, math.floor(weighted), remaining}
+end
+
+redis.call('INCR', KEYS[1])
+-- Kept for a second window, while it is the previous counter
+redis.call('PEXPIRE', KEYS[1], window * 2)
+return {1, math.floor(weighted) + 1, 0}
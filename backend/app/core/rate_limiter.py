@@ -1,11 +1,14 @@
+import asyncio
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Tuple, List, Union
 from enum import Enum
 import time
 import logging
-import json
+import uuid
+from pathlib import Path
 from fastapi import HTTPException, Request, status
 from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
 from dataclasses import dataclass
 
 from app.core.config import settings
@@ -57,6 +60,14 @@ class RateLimitStats:
 
 rate_limit_stats = RateLimitStats()
 
+# Atomic sliding window checks, loaded into Redis once and run with EVALSHA:
+# two counters per key by default, or a sorted-set log for exact counting
+RATE_LIMIT_SCRIPTS = {
+    name: Path(__file__).with_name(f"{name}.lua").read_text()
+    for name in ("rate_limiter", "rate_limiter_exact")
+}
+_script_shas: Dict[str, str] = {}
+
 class RateLimiter:
     def __init__(self, redis: Redis):
         self.redis = redis
@@ -94,22 +105,31 @@ class RateLimiter:
         refill_time: int
     ) -> Tuple[int, float]:
         """Get current token count and last update time"""
-        bucket_key = f"tokenbucket:{key}"
-        bucket_data = await self.redis.get(bucket_key)
+        # New prefix: keys left over from the JSON string format would fail with WRONGTYPE
+        bucket_key = f"tokenbucket:h:{key}"
+        tokens, last_update = await self.redis.hmget(bucket_key, "tokens", "last_update")
         
-        if bucket_data:
-            data = json.loads(bucket_data)
-            return data["tokens"], data["last_update"]
+        if tokens is not None:
+            return int(tokens), float(last_update)
         
         # Initialize new bucket
         now = time.time()
-        await self.redis.setex(
-            bucket_key,
-            refill_time,
-            json.dumps({"tokens": max_tokens, "last_update": now})
-        )
+        await self._store_token_bucket(bucket_key, max_tokens, now, refill_time)
         return max_tokens, now
 
+    async def _store_token_bucket(
+        self,
+        bucket_key: str,
+        tokens: int,
+        last_update: float,
+        refill_time: int
+    ) -> None:
+        """Write bucket state as a small hash (no JSON round trip) and reset its TTL"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(bucket_key, mapping={"tokens": tokens, "last_update": last_update})
+            pipe.expire(bucket_key, refill_time)
+            await pipe.execute()
+
     async def _update_token_bucket(
         self,
         key: str,
@@ -119,7 +139,7 @@ class RateLimiter:
         last_update: float
     ) -> None:
         """Update token bucket state"""
-        bucket_key = f"tokenbucket:{key}"
+        bucket_key = f"tokenbucket:h:{key}"
         now = time.time()
         
         # Calculate token refill
@@ -128,11 +148,7 @@ class RateLimiter:
         refill_tokens = int(elapsed * refill_rate)
         new_tokens = min(max_tokens, tokens + refill_tokens)
         
-        await self.redis.setex(
-            bucket_key,
-            refill_time,
-            json.dumps({"tokens": new_tokens, "last_update": now})
-        )
+        await self._store_token_bucket(bucket_key, new_tokens, now, refill_time)
 
     async def check_rate_limit(
         self,
@@ -160,7 +176,8 @@ class RateLimiter:
                     redis_key,
                     rule.max_requests,
                     rule.window_seconds,
-                    rule.burst_multiplier
+                    rule.burst_multiplier,
+                    exact=rule.key in settings.RATE_LIMIT_EXACT_KEYS
                 )
             else:  # Default to fixed window
                 return await self._check_fixed_window(
@@ -205,31 +222,46 @@ class RateLimiter:
         key: str,
         max_requests: int,
         window_seconds: int,
-        burst_multiplier: float
+        burst_multiplier: float,
+        exact: bool = False
     ) -> Tuple[bool, Optional[int]]:
         """Sliding window rate limiting strategy"""
-        now = time.time()
-        window_start = now - window_seconds
-        
-        # Get request timestamps in window
-        request_data = await self.redis.zrangebyscore(
-            key,
-            window_start,
-            now,
-            withscores=True
-        )
-        
-        if len(request_data) >= int(max_requests * burst_multiplier):
-            oldest_request = float(request_data[0][1])
-            retry_after = int(oldest_request + window_seconds - now)
-            return True, max(0, retry_after)
-        
-        # Add current request
-        await self.redis.zadd(key, {str(now): now})
-        await self.redis.expire(key, window_seconds)
-        
+        now_ms = int(time.time() * 1000)
+        window_ms = window_seconds * 1000
+        limit = int(max_requests * burst_multiplier)
+
+        if exact:
+            # Unique member so requests in the same millisecond are all counted
+            allowed, _count, oldest_ms = await self._run_script(
+                "rate_limiter_exact",
+                [key],
+                [now_ms, window_ms, limit, f"{now_ms}:{uuid.uuid4().hex}"]
+            )
+            retry_after_ms = oldest_ms + window_ms - now_ms
+        else:
+            bucket = now_ms // window_ms
+            allowed, _count, retry_after_ms = await self._run_script(
+                "rate_limiter",
+                [f"{key}:{bucket}", f"{key}:{bucket - 1}"],
+                [now_ms, window_ms, limit]
+            )
+
+        if not allowed:
+            return True, max(0, retry_after_ms // 1000)
+
         return False, None
 
+    async def _run_script(self, name: str, keys: List[str], args: List) -> List[int]:
+        """Run a rate limit script in a single round trip."""
+        script = RATE_LIMIT_SCRIPTS[name]
+        if name not in _script_shas:
+            _script_shas[name] = await self.redis.script_load(script)
+        try:
+            return await self.redis.evalsha(_script_shas[name], len(keys), *keys, *args)
+        except NoScriptError:
+            # Script cache was flushed (e.g. Redis restart); EVAL caches it again
+            return await self.redis.eval(script, len(keys), *keys, *args)
+
     async def _check_fixed_window(
         self,
         key: str,
@@ -262,8 +294,11 @@ async def rate_limit_middleware(
     limiter = RateLimiter(redis)
     rules_list = [rules] if isinstance(rules, RateLimitRule) else rules
     
-    for rule in rules_list:
-        is_limited, retry_after = await limiter.check_rate_limit(request, rule)
+    # Rules are independent, so their Redis checks run concurrently
+    results = await asyncio.gather(
+        *(limiter.check_rate_limit(request, rule) for rule in rules_list)
+    )
+    for rule, (is_limited, retry_after) in zip(rules_list, results):
         rate_limit_stats.record_request(rule.key, is_limited)
         
         if is_limited:
@@ -0,0 +1,18 @@
+-- Exact sliding window (sorted-set log): prune, count and record atomically.
+-- KEYS[1] = bucket, ARGV = {now_ms, window_ms, limit, member}
+-- Returns {allowed (1 or 0), count, oldest_ms}
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now - window)
+local count = redis.call('ZCARD', KEYS[1])
+
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return {1, count + 1, 0}
+end
+
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, count, tonumber(oldest[2])}
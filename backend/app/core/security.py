@@ -1,12 +1,40 @@
+import asyncio
+import base64
+import calendar
+import hashlib
+import hmac
 from datetime import datetime, timedelta
 from typing import Any, Union
+import orjson
 from passlib.context import CryptContext
 from jose import jwt
 
 from app.core.config import settings
+from app.core.kdf_pool import kdf_pool
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Hash of a random throwaway password, checked when no user matches so that
+# unknown emails take as long as wrong passwords
+DUMMY_PASSWORD_HASH = "$2b$12$VXD.OkrmlFL3W7Hdl.9EEuw3T.KrI3f7AF3pP4Qbw9GfFHSM8s9N6"
+
+# Stored for users who can only sign in through a social provider; it is not
+# a bcrypt hash, so no password matches it
+UNUSABLE_PASSWORD = "!social"
+
+# base64url of {"alg":"HS256","typ":"JWT"}, identical for every token we sign
+_JWT_HEADER_B64 = b"eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9"
+_JWT_KEY = settings.SECRET_KEY.get_secret_value().encode()
+
+def _b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+def _encode_hs256(claims: dict) -> str:
+    """Sign claims as an HS256 JWT, reusing the pre-encoded header."""
+    signing_input = _JWT_HEADER_B64 + b"." + _b64url(orjson.dumps(claims))
+    signature = hmac.new(_JWT_KEY, signing_input, hashlib.sha256).digest()
+    return (signing_input + b"." + _b64url(signature)).decode()
+
 def create_access_token(
     subject: Union[str, Any], expires_delta: timedelta = None
 ) -> str:
@@ -17,14 +45,31 @@ def create_access_token(
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
-    return encoded_jwt
+    if not settings.JWT_FAST_ENCODE:
+        to_encode = {"exp": expire, "sub": str(subject)}
+        return jwt.encode(to_encode, _JWT_KEY.decode(), algorithm="HS256")
+
+    # Same claims python-jose produces: exp as a UTC unix timestamp
+    return _encode_hs256({"exp": calendar.timegm(expire.utctimetuple()), "sub": str(subject)})
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash."""
+    if hashed_password == UNUSABLE_PASSWORD:
+        # Same bcrypt work as a real check, so timing does not reveal social accounts
+        pwd_context.verify(plain_password, DUMMY_PASSWORD_HASH)
+        return False
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Hash a password."""
     return pwd_context.hash(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against a hash in the KDF process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(kdf_pool, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password in the KDF process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(kdf_pool, get_password_hash, password)
@@ -1,7 +1,7 @@
 import secrets
 import string
 from datetime import datetime, timedelta
-from typing import Tuple
+from typing import Optional, Tuple
 
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -122,32 +122,17 @@ async def check_user_lock_status(user_obj: User) -> None:
             detail=f"Account locked. Try again in {minutes_left} minutes"
         )
 
-async def update_login_attempt(db: AsyncSession, user_obj: User, success: bool) -> None:
-    """Update user's login attempt status."""
+async def update_login_attempt(db: AsyncSession, user_obj: User, success: bool) -> Optional[datetime]:
+    """
+    Update user's login attempt status.
+
+    Returns ``locked_until`` after a failed attempt, taken from the UPDATE's
+    RETURNING clause so no follow-up SELECT is needed.
+    """
     if success:
         # Reset failed attempts on successful login
-        await user.update(
-            db,
-            db_obj=user_obj,
-            obj_in={
-                "failed_login_attempts": 0,
-                "locked_until": None,
-                "last_login": datetime.utcnow()
-            }
-        )
-    else:
-        # Increment failed attempts and possibly lock account
-        failed_attempts = user_obj.failed_login_attempts + 1
-        locked_until = None
-        
-        if failed_attempts >= settings.MAX_LOGIN_ATTEMPTS:
-            locked_until = datetime.utcnow() + timedelta(minutes=settings.ACCOUNT_LOCKOUT_MINUTES)
-        
-        await user.update(
-            db,
-            db_obj=user_obj,
-            obj_in={
-                "failed_login_attempts": failed_attempts,
-                "locked_until": locked_until
-            }
-        )
+        await user.record_successful_login(db, db_obj=user_obj)
+        return None
+
+    # Increment failed attempts and possibly lock account
+    return await user.record_failed_login(db, db_obj=user_obj)
@@ -1,13 +1,23 @@
+import asyncio
+import hashlib
+import hmac
 import pyotp
 import qrcode
 import io
 import base64
-from typing import Tuple
+from typing import Optional, Tuple
 from datetime import datetime, timedelta
 
 from app.core.config import settings
+from app.db.redis import redis_client
 from app.models.user import User
 
+# Backup codes are random, so a keyed hash is enough; stretching adds nothing
+_BACKUP_CODE_KEY = (settings.BACKUP_CODE_PEPPER or settings.SECRET_KEY).get_secret_value().encode()[:64]
+
+# Long enough to cover a TOTP code's whole validity, including clock drift
+TOTP_REPLAY_TTL = 90  # seconds
+
 def generate_totp_secret() -> str:
     """Generate a new TOTP secret."""
     return pyotp.random_base32()
@@ -47,19 +57,44 @@ def verify_totp(secret: str, token: str) -> bool:
     totp = pyotp.TOTP(secret)
     return totp.verify(token)
 
+async def claim_totp(user_id: int, token: str) -> bool:
+    """
+    Record a TOTP code as used, returning False if it was already used.
+
+    A single SET NX EX both checks and marks the code, so two concurrent
+    requests with the same code cannot both succeed.
+    """
+    return bool(await redis_client.set(f"totp_used:{user_id}:{token}", "1", ex=TOTP_REPLAY_TTL, nx=True))
+
 def generate_backup_codes(count: int = 8) -> list[str]:
     """Generate backup codes for 2FA recovery."""
     return [pyotp.random_base32()[:16] for _ in range(count)]
 
+def _backup_code_digest(code: str) -> str:
+    return hashlib.blake2b(code.encode(), key=_BACKUP_CODE_KEY, digest_size=16).hexdigest()
+
 def hash_backup_codes(codes: list[str]) -> list[str]:
     """Hash backup codes for storage."""
-    from app.core.security import get_password_hash
-    return [get_password_hash(code) for code in codes]
+    return [_backup_code_digest(code) for code in codes]
+
+async def match_backup_code(code: str, hashed_codes: list[str]) -> Optional[str]:
+    """Return the stored hash matching a backup code, if any."""
+    digest = _backup_code_digest(code)
+    match = next((hashed for hashed in hashed_codes if hmac.compare_digest(digest, hashed)), None)
+    if match is not None:
+        return match
 
-def verify_backup_code(code: str, hashed_codes: list[str]) -> bool:
+    # Codes issued before the switch are bcrypt hashes; check those in the KDF pool
+    legacy = [hashed for hashed in hashed_codes if hashed.startswith("$2")]
+    if not legacy:
+        return None
+    from app.core.security import verify_password_async
+    matches = await asyncio.gather(*(verify_password_async(code, hashed) for hashed in legacy))
+    return next((hashed for hashed, matched in zip(legacy, matches) if matched), None)
+
+async def verify_backup_code(code: str, hashed_codes: list[str]) -> bool:
     """Verify a backup code."""
-    from app.core.security import verify_password
-    return any(verify_password(code, hashed) for hashed in hashed_codes)
+    return await match_backup_code(code, hashed_codes) is not None
 
 async def setup_2fa(user: User) -> Tuple[str, str, list[str]]:
     """
@@ -80,17 +115,15 @@ async def verify_2fa(user: User, token: str) -> bool:
     if not user.two_factor_enabled or not user.two_factor_secret:
         return True
     
-    # Try TOTP first
+    # Try TOTP first; each code is accepted only once
     if verify_totp(user.two_factor_secret, token):
-        return True
+        return await claim_totp(user.id, token)
     
     # Try backup code
-    if user.backup_codes and verify_backup_code(token, user.backup_codes):
+    used_code = await match_backup_code(token, user.backup_codes) if user.backup_codes else None
+    if used_code is not None:
         # Remove used backup code
-        user.backup_codes = [
-            code for code in user.backup_codes
-            if not verify_password(token, code)
-        ]
+        user.backup_codes = [code for code in user.backup_codes if code != used_code]
         return True
     
     return False
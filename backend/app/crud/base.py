@@ -1,7 +1,9 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+import base64
+from datetime import datetime
+from typing import Any, Dict, Generic, List, Optional, Tuple, Type, TypeVar, Union
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import exists, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import Base
@@ -10,6 +12,18 @@ ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# Largest page the list endpoints will return in one request
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Opaque keyset cursor for the row a page ended on."""
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{id}".encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of :func:`encode_cursor`; raises ValueError if it is malformed."""
+    created_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+    return datetime.fromisoformat(created_at), int(id)
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         """
@@ -19,12 +33,58 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             model: A SQLAlchemy model class
         """
         self.model = model
+        # Attributes update() may assign; read off the table so building a
+        # CRUD object does not force mapper configuration
+        self._column_keys = frozenset(model.__table__.columns.keys())
 
     async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
         """Get a record by ID."""
         result = await db.execute(select(self.model).filter(self.model.id == id))
         return result.scalar_one_or_none()
 
+    async def get_owned(
+        self, db: AsyncSession, *, id: Any, user_id: int, for_update: bool = False
+    ) -> Tuple[Optional[ModelType], bool]:
+        """
+        Get a record by ID if it belongs to the user.
+
+        Returns (record, exists). A record owned by someone else comes back as
+        (None, True); the extra EXISTS query only runs on that miss path.
+        With ``for_update`` the row stays locked until the session commits.
+        """
+        query = select(self.model).filter(self.model.id == id, self.model.user_id == user_id)
+        if for_update:
+            query = query.with_for_update()
+        result = await db.execute(query)
+        obj = result.scalar_one_or_none()
+        if obj is not None:
+            return obj, True
+        return None, bool(await db.scalar(select(exists().where(self.model.id == id))))
+
+    async def get_page_by_user(
+        self, db: AsyncSession, *, user_id: int, after: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Get a user's records newest first, one keyset page at a time.
+
+        Pages continue from the ``after`` cursor with a (created_at, id)
+        comparison, so deep pages cost the same as the first. Returns the
+        records and the cursor for the next page (None on the last page).
+        """
+        query = (
+            select(self.model)
+            .filter(self.model.user_id == user_id)
+            .order_by(self.model.created_at.desc(), self.model.id.desc())
+            .limit(limit)
+        )
+        if after:
+            query = query.filter(tuple_(self.model.created_at, self.model.id) < decode_cursor(after))
+        result = await db.execute(query)
+        records = result.scalars().all()
+        if not records or len(records) < limit:
+            return records, None
+        return records, encode_cursor(records[-1].created_at, records[-1].id)
+
     async def get_multi(
         self, db: AsyncSession, *, skip: int = 0, limit: int = 100
     ) -> List[ModelType]:
@@ -50,18 +110,23 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_obj: ModelType,
         obj_in: Union[UpdateSchemaType, Dict[str, Any]]
     ) -> ModelType:
-        """Update a record."""
-        obj_data = jsonable_encoder(db_obj)
+        """
+        Update a record.
+
+        Only the given columns are assigned, and the flush writes just the ones
+        whose value actually changed, so untouched JSON columns are not rewritten.
+        """
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        for field, value in update_data.items():
+            if field in self._column_keys:
+                setattr(db_obj, field, value)
         db.add(db_obj)
         await db.commit()
-        await db.refresh(db_obj)
+        # No refresh: sessions keep state on commit (expire_on_commit=False) and
+        # updated_at is set client-side, so the object already matches the row
         return db_obj
 
     async def delete(self, db: AsyncSession, *, id: int) -> ModelType:
@@ -1,10 +1,12 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime
-from sqlalchemy import select
+from sqlalchemy import func, or_, select, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.base import CRUDBase
 from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.models.virtual_card import VirtualCard
 from app.schemas.transaction import TransactionCreate, TransactionUpdate
 
 class CRUDTransaction(CRUDBase[Transaction, TransactionCreate, TransactionUpdate]):
@@ -47,6 +49,29 @@ class CRUDTransaction(CRUDBase[Transaction, TransactionCreate, TransactionUpdate
         )
         return result.scalars().all()
 
+    async def get_with_card(
+        self, db: AsyncSession, *, id: int
+    ) -> Optional[Tuple[Transaction, Optional[VirtualCard], Optional[bool]]]:
+        """
+        Get a transaction and its virtual card (None if it has none) in one query.
+
+        The third item says whether the card allows the transaction's merchant
+        category (an empty list allows all), computed in the same query with a
+        JSONB containment test.
+        """
+        allowed = type_coerce(VirtualCard.allowed_merchant_categories, JSONB)
+        category_allowed = or_(
+            func.coalesce(func.jsonb_array_length(allowed), 0) == 0,
+            allowed.contains(func.jsonb_build_array(Transaction.merchant_category))
+        ).label("category_allowed")
+        result = await db.execute(
+            select(Transaction, VirtualCard, category_allowed)
+            .outerjoin(VirtualCard, Transaction.virtual_card_id == VirtualCard.id)
+            .filter(Transaction.id == id)
+        )
+        row = result.one_or_none()
+        return tuple(row) if row else None
+
     async def get_by_provider_id(
         self, db: AsyncSession, *, provider_transaction_id: str
     ) -> Optional[Transaction]:
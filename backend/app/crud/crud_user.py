@@ -1,9 +1,15 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Any, Dict, Optional, Union
-from sqlalchemy import select, or_
+from sqlalchemy import case, func, select, or_, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, raiseload
 
-from app.core.security import get_password_hash, verify_password
+from app.core.auth_cache import CACHED_USER_COLUMNS, invalidate_cached_user
+from app.core.cache import invalidate_user_cache
+from app.core.config import settings
+
+from app.core.security import DUMMY_PASSWORD_HASH, get_password_hash_async, verify_password_async
 from app.crud.base import CRUDBase
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
@@ -14,6 +20,83 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         result = await db.execute(select(User).filter(User.email == email))
         return result.scalar_one_or_none()
     
+    async def get_for_auth(self, db: AsyncSession, *, id: int) -> Optional[User]:
+        """
+        Get the user behind an access token, in a single query.
+
+        Only the columns cached for authentication are loaded, and no
+        relationships: touching anything else raises instead of issuing a lazy
+        load per request.
+        """
+        result = await db.execute(
+            select(User)
+            .options(
+                load_only(*(getattr(User, key) for key in CACHED_USER_COLUMNS)),
+                raiseload("*"),
+            )
+            .filter(User.id == id)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_with_lock_state(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        """
+        Get a user by email with only the columns login needs.
+
+        One query covers the lookup, the lock check and the password check.
+        """
+        result = await db.execute(
+            select(User)
+            .options(load_only(
+                User.id,
+                User.email,
+                User.full_name,
+                User.hashed_password,
+                User.is_active,
+                User.email_verified,
+                User.two_factor_enabled,
+                User.failed_login_attempts,
+                User.locked_until
+            ))
+            .filter(User.email == email)
+        )
+        return result.scalar_one_or_none()
+
+    async def record_failed_login(self, db: AsyncSession, *, db_obj: User) -> Optional[datetime]:
+        """
+        Count a failed login, locking the account once the limit is reached.
+
+        The increment and the lock decision happen in a single UPDATE, so
+        concurrent failures are all counted. Returns the new ``locked_until``.
+        """
+        failed_attempts = func.coalesce(User.failed_login_attempts, 0) + 1
+        lock_until = datetime.utcnow() + timedelta(minutes=settings.ACCOUNT_LOCKOUT_MINUTES)
+        result = await db.execute(
+            update(User)
+            .where(User.id == db_obj.id)
+            .values(
+                failed_login_attempts=failed_attempts,
+                locked_until=case(
+                    (failed_attempts >= settings.MAX_LOGIN_ATTEMPTS, lock_until),
+                    else_=None
+                )
+            )
+            .returning(User.locked_until)
+            .execution_options(synchronize_session="fetch")
+        )
+        locked_until = result.scalar_one()
+        await db.commit()
+        return locked_until
+
+    async def record_successful_login(self, db: AsyncSession, *, db_obj: User) -> None:
+        """Reset the failed login counter and stamp the login time in one UPDATE."""
+        await db.execute(
+            update(User)
+            .where(User.id == db_obj.id)
+            .values(failed_login_attempts=0, locked_until=None, last_login=datetime.utcnow())
+            .execution_options(synchronize_session="fetch")
+        )
+        await db.commit()
+
     async def get_by_reset_token(self, db: AsyncSession, *, token: str) -> Optional[User]:
         """Get a user by password reset token."""
         result = await db.execute(
@@ -28,7 +111,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         """Create new user with hashed password."""
         db_obj = User(
             email=obj_in.email,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=await get_password_hash_async(obj_in.password),
             full_name=obj_in.full_name,
             is_active=False,  # User starts inactive until email is verified
             email_verified=False
@@ -52,19 +135,61 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             update_data = obj_in.dict(exclude_unset=True)
         
         # Handle password update
-        if "password" in update_data:
-            hashed_password = get_password_hash(update_data["password"])
+        password_changed = "password" in update_data
+        if password_changed:
+            hashed_password = await get_password_hash_async(update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
+            # Stamped by the database (in UTC, like the other naive timestamps)
+            update_data["last_password_change"] = func.timezone("utc", func.now())
         
-        return await super().update(db, db_obj=db_obj, obj_in=update_data)
+        updated = await super().update(db, db_obj=db_obj, obj_in=update_data)
+        if password_changed:
+            # The SQL-generated value is expired after the flush; load just that column
+            await db.refresh(updated, attribute_names=["last_password_change"])
+        # Drop cached auth lookups and responses so the change applies to the next request
+        await invalidate_cached_user(updated.id)
+        await invalidate_user_cache(updated.id)
+        return updated
+
+    async def upsert_social(
+        self,
+        db: AsyncSession,
+        *,
+        email: str,
+        social_data: Dict[str, Any],
+        new_user_data: Dict[str, Any]
+    ) -> User:
+        """
+        Create a social login user, or refresh an existing user's social fields.
+
+        One INSERT ... ON CONFLICT (email) DO UPDATE does both; new_user_data
+        (name, password hash, activation flags) only applies to a new row.
+        """
+        result = await db.execute(
+            insert(User)
+            .values(email=email, **social_data, **new_user_data)
+            .on_conflict_do_update(
+                index_elements=[User.email],
+                # onupdate does not fire for ON CONFLICT, so updated_at is set here
+                set_={**social_data, "updated_at": datetime.utcnow()}
+            )
+            .returning(User)
+            .execution_options(populate_existing=True)
+        )
+        db_user = result.scalar_one()
+        await db.commit()
+        await invalidate_cached_user(db_user.id)
+        return db_user
 
     async def authenticate(self, db: AsyncSession, *, email: str, password: str) -> Optional[User]:
         """Authenticate user by email and password."""
         user = await self.get_by_email(db, email=email)
         if not user:
+            # Same bcrypt work as a real check, so response time does not reveal the email exists
+            await verify_password_async(password, DUMMY_PASSWORD_HASH)
             return None
-        if not verify_password(password, user.hashed_password):
+        if not await verify_password_async(password, user.hashed_password):
             return None
         return user
 
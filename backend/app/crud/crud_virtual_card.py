@@ -1,19 +1,48 @@
-from typing import List, Optional
-from sqlalchemy import select
+from typing import Any, Dict, List, Optional, Tuple, Union
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
 from decimal import Decimal
 
+from app.core.cache import invalidate_user_cache
 from app.crud.base import CRUDBase
-from app.models.virtual_card import VirtualCard
+from app.models.virtual_card import CardStatus, VirtualCard
 from app.schemas.virtual_card import VirtualCardCreate, VirtualCardUpdate
 
+CARD_NOT_FOUND = "Virtual card not found"
+
 class CRUDVirtualCard(CRUDBase[VirtualCard, VirtualCardCreate, VirtualCardUpdate]):
+    async def create(self, db: AsyncSession, *, obj_in: VirtualCardCreate) -> VirtualCard:
+        """Create a card and drop the owner's cached analytics."""
+        card = await super().create(db, obj_in=obj_in)
+        await invalidate_user_cache(card.user_id)
+        return card
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: VirtualCard,
+        obj_in: Union[VirtualCardUpdate, Dict[str, Any]]
+    ) -> VirtualCard:
+        """Update a card; limits, status and balance feed the owner's cached analytics."""
+        card = await super().update(db, db_obj=db_obj, obj_in=obj_in)
+        await invalidate_user_cache(card.user_id)
+        return card
+
     async def get_by_user(
         self, db: AsyncSession, *, user_id: int, skip: int = 0, limit: int = 100
     ) -> List[VirtualCard]:
-        """Get all virtual cards for a specific user."""
+        """
+        Get all virtual cards for a specific user.
+
+        The card schema only reads columns, so relationships are never loaded;
+        raiseload makes any future per-card lazy load fail instead of adding a
+        query per row.
+        """
         result = await db.execute(
             select(VirtualCard)
+            .options(raiseload("*"))
             .filter(VirtualCard.user_id == user_id)
             .offset(skip)
             .limit(limit)
@@ -30,6 +59,15 @@ class CRUDVirtualCard(CRUDBase[VirtualCard, VirtualCardCreate, VirtualCardUpdate
         )
         return result.scalars().all()
 
+    async def get_for_txn(
+        self, db: AsyncSession, *, id: int, user_id: int
+    ) -> Optional[VirtualCard]:
+        """Get a card only if it belongs to the user, in a single query."""
+        result = await db.execute(
+            select(VirtualCard).filter(VirtualCard.id == id, VirtualCard.user_id == user_id)
+        )
+        return result.scalar_one_or_none()
+
     async def get_by_card_number(
         self, db: AsyncSession, *, card_number: str
     ) -> Optional[VirtualCard]:
@@ -43,14 +81,58 @@ class CRUDVirtualCard(CRUDBase[VirtualCard, VirtualCardCreate, VirtualCardUpdate
         self, db: AsyncSession, *, card_id: int, amount: Decimal
     ) -> Optional[VirtualCard]:
         """Update the balance of a virtual card."""
+        # Added in SQL, so concurrent updates cannot overwrite each other
         result = await db.execute(
-            select(VirtualCard).filter(VirtualCard.id == card_id)
+            update(VirtualCard)
+            .where(VirtualCard.id == card_id)
+            .values(balance=VirtualCard.balance + amount)
+            .returning(VirtualCard)
+            .execution_options(populate_existing=True)
         )
         card = result.scalar_one_or_none()
-        if card:
-            card.balance += amount
-            await db.commit()
-            await db.refresh(card)
+        await db.commit()
+        if card is not None:
+            await invalidate_user_cache(card.user_id)
         return card
 
+    async def try_debit(
+        self, db: AsyncSession, *, card_id: int, user_id: int, amount: Decimal
+    ) -> Tuple[Optional[VirtualCard], Optional[str]]:
+        """
+        Debit the user's active card if its balance covers the amount.
+
+        The ownership, status and balance checks and the debit are one
+        conditional UPDATE, so two purchases cannot both spend the same funds.
+        Returns (card, None) on success, or (None, reason) after a lookup that
+        explains the miss; someone else's card reads as not found. The debit is
+        not committed; the caller's next commit applies it.
+        """
+        result = await db.execute(
+            update(VirtualCard)
+            .where(
+                VirtualCard.id == card_id,
+                VirtualCard.user_id == user_id,
+                VirtualCard.status == CardStatus.ACTIVE,
+                VirtualCard.balance >= amount
+            )
+            .values(balance=VirtualCard.balance - amount)
+            .returning(VirtualCard)
+            .execution_options(populate_existing=True)
+        )
+        card = result.scalar_one_or_none()
+        if card is not None:
+            return card, None
+
+        result = await db.execute(
+            select(VirtualCard.status).filter(
+                VirtualCard.id == card_id, VirtualCard.user_id == user_id
+            )
+        )
+        card_status = result.scalar_one_or_none()
+        if card_status is None:
+            return None, CARD_NOT_FOUND
+        if card_status != CardStatus.ACTIVE:
+            return None, f"Card is {card_status.value}"
+        return None, "Insufficient funds"
+
 virtual_card = CRUDVirtualCard(VirtualCard)
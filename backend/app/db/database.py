@@ -7,20 +7,20 @@ import logging
 import time
 from contextlib import asynccontextmanager
 
-from ..core.config import settings
+from ..core.config import DATABASE_URL, settings
 from ..core.exceptions import DatabaseError
 
 logger = logging.getLogger(__name__)
 
 # Create async engine with proper connection pooling
 engine = create_async_engine(
-    settings.SQLALCHEMY_DATABASE_URI,
+    DATABASE_URL,
     poolclass=AsyncAdaptedQueuePool,
     pool_pre_ping=True,  # Enable connection health checks
     pool_size=settings.SQLALCHEMY_POOL_SIZE,
     max_overflow=settings.SQLALCHEMY_MAX_OVERFLOW,
     pool_timeout=settings.SQLALCHEMY_POOL_TIMEOUT,
-    pool_recycle=3600,  # Recycle connections after 1 hour
+    pool_recycle=settings.SQLALCHEMY_POOL_RECYCLE,
     echo=settings.DEBUG,
     connect_args={
         "server_settings": {
@@ -83,8 +83,9 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
     db_stats.active_connections += 1
 
     try:
-        # Test connection with ping
-        await session.execute("SELECT 1")
+        # No ping here: pool_pre_ping checks connections at checkout, and
+        # checkout waits for the first query, so handlers that do other I/O
+        # first (e.g. OAuth calls) don't hold a pooled connection meanwhile
         yield session
     except OperationalError as e:
         db_stats.record_error(e)
@@ -0,0 +1,208 @@
+"""Helpers shared by alembic migrations for online schema changes."""
+import time
+from typing import Dict, Iterable, Tuple
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateColumn
+
+BACKFILL_BATCH_SIZE = 10000
+BACKFILL_PAUSE_SECONDS = 0.05  # Keeps replica lag low between batches
+
+# JSONB on PostgreSQL, plain JSON on SQLite dev databases
+JSONB = postgresql.JSONB(astext_type=sa.Text()).with_variant(sa.JSON(), "sqlite")
+
+def is_postgresql() -> bool:
+    """Whether the migration is running against PostgreSQL."""
+    return op.get_context().dialect.name == "postgresql"
+
+def is_squashed() -> bool:
+    """Whether ``-x squash=1`` asked for the squashed path on a fresh database."""
+    return bool(context.get_x_argument(as_dictionary=True).get("squash"))
+
+def alter_table(table_name: str, clauses: Iterable[str]) -> None:
+    """Apply several ALTER TABLE actions as one statement (one lock acquisition)."""
+    op.execute(f"ALTER TABLE {table_name} " + ", ".join(clauses))
+
+def add_column_clause(column: sa.Column) -> str:
+    """Render an ``ADD COLUMN`` action for use with :func:`alter_table`."""
+    return f"ADD COLUMN {CreateColumn(column).compile(dialect=op.get_context().dialect)}"
+
+def add_columns(table_name: str, *columns: sa.Column) -> None:
+    """Add columns to a table with a single ALTER TABLE statement."""
+    if not is_postgresql():
+        with op.batch_alter_table(table_name) as batch_op:
+            for column in columns:
+                batch_op.add_column(column)
+        return
+
+    alter_table(table_name, (add_column_clause(column) for column in columns))
+
+def drop_columns(table_name: str, *column_names: str) -> None:
+    """Drop columns from a table with a single ALTER TABLE statement."""
+    if not is_postgresql():
+        # SQLite rebuilds the table once for the whole batch
+        with op.batch_alter_table(table_name) as batch_op:
+            for name in column_names:
+                batch_op.drop_column(name)
+        return
+
+    alter_table(table_name, (f"DROP COLUMN {name}" for name in column_names))
+
+def add_foreign_keys(
+    table_name: str,
+    foreign_keys: Dict[str, Tuple[str, str]],
+    validate: bool = True
+) -> None:
+    """
+    Add foreign keys as NOT VALID, then validate them in a separate statement.
+
+    NOT VALID is a catalog-only change, so the constraints are in place for new
+    writes immediately. VALIDATE CONSTRAINT scans existing rows under a SHARE
+    UPDATE EXCLUSIVE lock, which does not block inserts or updates; pass
+    ``validate=False`` to leave that to a later migration or scheduled job.
+
+    Args:
+        table_name: Referencing table
+        foreign_keys: Mapping of constraint name to (column, "table.column")
+        validate: Whether to run VALIDATE CONSTRAINT straight away
+    """
+    if not is_postgresql():
+        with op.batch_alter_table(table_name) as batch_op:
+            for name, (column, target) in foreign_keys.items():
+                referent, remote_column = target.split(".")
+                batch_op.create_foreign_key(name, referent, [column], [remote_column])
+        return
+
+    clauses = []
+    for name, (column, target) in foreign_keys.items():
+        referent, remote_column = target.split(".")
+        clauses.append(
+            f"ADD CONSTRAINT {name} FOREIGN KEY ({column}) "
+            f"REFERENCES {referent} ({remote_column}) NOT VALID"
+        )
+    alter_table(table_name, clauses)
+
+    if validate:
+        alter_table(table_name, (f"VALIDATE CONSTRAINT {name}" for name in foreign_keys))
+
+def set_column_defaults(table_name: str, defaults: Dict[str, str]) -> None:
+    """Set server defaults, given as SQL literal bodies, in one statement."""
+    if not is_postgresql():
+        with op.batch_alter_table(table_name) as batch_op:
+            for column, default in defaults.items():
+                batch_op.alter_column(column, server_default=default)
+        return
+
+    alter_table(
+        table_name,
+        (f"ALTER COLUMN {column} SET DEFAULT '{default}'" for column, default in defaults.items())
+    )
+
+def set_not_null(table_name: str, column_names: Iterable[str]) -> None:
+    """Mark columns NOT NULL in one statement, so the table is scanned once."""
+    if not is_postgresql():
+        with op.batch_alter_table(table_name) as batch_op:
+            for name in column_names:
+                batch_op.alter_column(name, nullable=False)
+        return
+
+    alter_table(table_name, (f"ALTER COLUMN {name} SET NOT NULL" for name in column_names))
+
+def add_backfilled_columns(
+    table_name: str,
+    columns: Iterable[sa.Column],
+    defaults: Dict[str, str],
+    not_null: bool = True,
+    drop: Iterable[str] = ()
+) -> None:
+    """
+    Add columns whose existing rows take a server default, optionally NOT NULL.
+
+    On PostgreSQL the drops and adds are one catalog-only ALTER TABLE, then the
+    defaults are set, existing rows are backfilled in id batches and the
+    constraints are applied last, so the table is never rewritten. Other
+    dialects get the whole change in one batch, so SQLite rebuilds the table
+    once and the copy fills the new columns from their defaults.
+
+    Args:
+        table_name: Table to alter
+        columns: Columns to add, declared nullable and without a default
+        defaults: Mapping of column name to its default as a SQL literal body
+        not_null: Whether the defaulted columns end up NOT NULL
+        drop: Columns to drop in the same statement
+    """
+    columns = list(columns)
+    if not is_postgresql():
+        with op.batch_alter_table(table_name) as batch_op:
+            for name in drop:
+                batch_op.drop_column(name)
+            for column in columns:
+                batch_op.add_column(column)
+                if column.name in defaults:
+                    default = defaults[column.name]
+                    # Booleans and numbers are SQL keywords/literals, not strings
+                    if isinstance(column.type, (sa.Boolean, sa.Integer, sa.Numeric)):
+                        default = sa.text(default)
+                    batch_op.alter_column(
+                        column.name,
+                        server_default=default,
+                        nullable=not not_null
+                    )
+        return
+
+    alter_table(
+        table_name,
+        [f"DROP COLUMN {name}" for name in drop]
+        + [add_column_clause(column) for column in columns]
+    )
+
+    # Defaults first so rows inserted during the backfill are already filled
+    set_column_defaults(table_name, defaults)
+
+    backfill_in_batches(table_name, defaults)
+
+    if not_null:
+        set_not_null(table_name, defaults)
+
+def backfill_in_batches(
+    table_name: str,
+    defaults: Dict[str, str],
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    pause: float = BACKFILL_PAUSE_SECONDS
+) -> None:
+    """
+    Replace NULLs in the given columns with their defaults, one id range at a time.
+
+    Each batch commits on its own so no single statement holds row locks across
+    the whole table. In offline (--sql) mode a single UPDATE is emitted instead.
+
+    Args:
+        table_name: Table to backfill
+        defaults: Mapping of column name to its default as a SQL literal body
+        batch_size: Number of ids covered by each UPDATE
+        pause: Seconds to sleep between batches
+    """
+    assignments = ", ".join(
+        f"{column} = COALESCE({column}, '{default}')" for column, default in defaults.items()
+    )
+    update = f"UPDATE {table_name} SET {assignments}"
+
+    context = op.get_context()
+    if context.as_sql:
+        op.execute(update)
+        return
+
+    with context.autocommit_block():
+        bind = op.get_bind()
+        low, high = bind.execute(sa.text(f"SELECT min(id), max(id) FROM {table_name}")).one()
+        if low is None:
+            return
+
+        for start in range(low, high + 1, batch_size):
+            bind.execute(
+                sa.text(f"{update} WHERE id BETWEEN :low AND :high"),
+                {"low": start, "high": start + batch_size - 1}
+            )
+            time.sleep(pause)
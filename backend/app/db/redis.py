@@ -5,7 +5,7 @@ from redis.backoff import ExponentialBackoff
 from contextlib import asynccontextmanager
 import logging
 import time
-import json
+import orjson
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from app.core.config import settings
@@ -151,8 +151,8 @@ async def cache_get(key: str) -> Optional[Any]:
     value = await execute_redis_operation('get', key)
     if value:
         try:
-            return json.loads(value)
-        except json.JSONDecodeError:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
             return value
     return None
 
@@ -163,7 +163,8 @@ async def cache_set(
 ) -> bool:
     """Set cache value with JSON serialization"""
     if isinstance(value, (dict, list)):
-        value = json.dumps(value)
+        # orjson returns bytes, which Redis stores as-is
+        value = orjson.dumps(value)
     if expire:
         return await execute_redis_operation('setex', key, expire, value)
     return await execute_redis_operation('set', key, value)
@@ -0,0 +1,2 @@
+"""Session dependencies, re-exported for routers that import them from here."""
+from app.db.database import AsyncSessionLocal, engine, get_db
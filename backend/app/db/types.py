@@ -0,0 +1,16 @@
+"""Column types for PostgreSQL extensions that SQLAlchemy does not ship."""
+from sqlalchemy import String
+from sqlalchemy.types import UserDefinedType
+
+
+class Ltree(UserDefinedType):
+    """PostgreSQL ``ltree`` label path, e.g. ``retail.electronics.phones``."""
+
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "LTREE"
+
+
+# ltree on PostgreSQL, plain text on SQLite dev databases
+LTREE = Ltree().with_variant(String(), "sqlite")
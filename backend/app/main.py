@@ -1,5 +1,5 @@
 from fastapi import FastAPI, Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.openapi.utils import get_openapi
 import logging
@@ -12,6 +12,8 @@ from app.core.middleware import setup_middleware
 from app.db.database import engine, SessionLocal
 from app.core.exceptions import APIError
 from app.db.redis import redis_client
+from app.core.http_client import http_client
+from app.core.kdf_pool import kdf_pool
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +48,8 @@ async def lifespan(app: FastAPI):
         logger.info("Shutting down application")
         await engine.dispose()
         await redis_client.close()
+        await http_client.aclose()
+        kdf_pool.shutdown(cancel_futures=True)
         logger.info("Cleanup complete")
 
 def custom_openapi():
@@ -132,6 +136,8 @@ app = FastAPI(
     openapi_url=f"{settings.API_V1_STR}/openapi.json" if settings.ENABLE_DOCS else None,
     docs_url=f"{settings.API_V1_STR}/docs" if settings.ENABLE_SWAGGER_UI else None,
     redoc_url=f"{settings.API_V1_STR}/redoc" if settings.ENABLE_REDOC else None,
+    # orjson encodes responses in C
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -159,7 +165,8 @@ async def api_error_handler(request: Request, exc: APIError):
             "code": exc.code,
             "params": exc.params,
             "request_id": request.state.request_id
-        }
+        },
+        headers={"Retry-After": str(exc.params["retry_after"])} if "retry_after" in exc.params else None
     )
 
 @app.exception_handler(Exception)
@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, Enum, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, SmallInteger, String, DateTime, Boolean, JSON, Enum, ForeignKey, Numeric
 from sqlalchemy.orm import relationship
 import enum
 
@@ -35,7 +35,7 @@ class AgentTransaction(Base):
     
     # Status and tracking
     status = Column(Enum(TransactionStatus), default=TransactionStatus.PENDING)
-    external_transaction_id = Column(String)  # Reference to payment processor transaction
+    external_transaction_id = Column(String(64))  # Reference to payment processor transaction
     
     # AI Context and Reasoning
     conversation_context = Column(JSON)  # Stores the conversation leading to this transaction
@@ -43,7 +43,7 @@ class AgentTransaction(Base):
     user_intent = Column(String)  # Captured user intent for the transaction
     
     # Risk Assessment
-    risk_score = Column(Integer)  # 0-100 risk score
+    risk_score = Column(SmallInteger)  # 0-100 risk score
     risk_level = Column(Enum(RiskLevel))
     risk_factors = Column(JSON)  # List of identified risk factors
     
@@ -3,6 +3,7 @@ from sqlalchemy.orm import relationship
 from typing import List, Optional
 
 from . import Base
+from app.db.types import LTREE
 
 class MerchantCategory(Base):
     __tablename__ = "merchant_categories"
@@ -14,7 +15,7 @@ class MerchantCategory(Base):
     
     # Hierarchical structure
     parent_id = Column(Integer, ForeignKey("merchant_categories.id"), nullable=True)
-    path = Column(String, nullable=False)  # e.g., "retail/food_and_drink/restaurants"
+    path = Column(LTREE, nullable=False)  # e.g., "retail.food_and_drink.restaurants"
     level = Column(Integer, nullable=False)  # 0 for root categories
     
     # Legacy MCC mapping
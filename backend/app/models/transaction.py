@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Enum as SQLEnum, Boolean
+from sqlalchemy import Column, Integer, SmallInteger, String, DateTime, ForeignKey, Numeric, Double, JSON, Enum as SQLEnum, Boolean
 from sqlalchemy.orm import relationship
 import enum
 
@@ -33,7 +33,7 @@ class Transaction(Base):
     description = Column(String)
     merchant_name = Column(String)
     merchant_category = Column(String)
-    merchant_id = Column(String)
+    merchant_id = Column(String(64))
     merchant_country = Column(String(2))  # ISO 3166-1 alpha-2
     
     # Transaction characteristics
@@ -43,19 +43,19 @@ class Transaction(Base):
     is_recurring = Column(Boolean, default=False)
     
     # Location data
-    location_city = Column(String)
+    location_city = Column(String(128))
     location_country = Column(String(2))  # ISO 3166-1 alpha-2
-    location_postal_code = Column(String)
-    location_lat = Column(Numeric(9, 6))
-    location_lon = Column(Numeric(9, 6))
+    location_postal_code = Column(String(16))
+    location_lat = Column(Double)
+    location_lon = Column(Double)
     
     # Risk indicators
-    risk_score = Column(Integer)  # 0-100
-    risk_factors = Column(String)  # JSON string of risk factors
+    risk_score = Column(SmallInteger)  # 0-100
+    risk_factors = Column(JSON)  # List of identified risk factors
     
     # Error handling
-    decline_reason = Column(String)
-    error_code = Column(String)
+    decline_reason = Column(String(128))
+    error_code = Column(String(16))
     error_message = Column(String)
     
     provider_transaction_id = Column(String, unique=True)
@@ -107,58 +107,70 @@ class VirtualCard(Base):
     owner = relationship("User", back_populates="virtual_cards")
     transactions = relationship("Transaction", back_populates="virtual_card")
     
-    def apply_template(self, template: "CardTemplate") -> None:
-        """Apply settings from a card template."""
-        self.spending_limits = template.spending_limits
-        self.category_spending_limits = template.category_spending_limits
-        self.subcategory_spending_limits = template.subcategory_spending_limits
-        self.allowed_merchant_categories = template.allowed_merchant_categories
-        self.blocked_merchant_categories = template.blocked_merchant_categories
-        self.allowed_merchants = template.allowed_merchants
-        self.blocked_merchants = template.blocked_merchants
-        self.allowed_countries = template.allowed_countries
-        self.blocked_countries = template.blocked_countries
-        self.allow_online_transactions = template.allow_online_transactions
-        self.allow_contactless_transactions = template.allow_contactless_transactions
-        self.allow_cash_withdrawals = template.allow_cash_withdrawals
-        self.allow_international_transactions = template.allow_international_transactions
-        self.auto_expiry_enabled = template.auto_expiry_enabled
-        self.auto_renewal_enabled = template.auto_renewal_enabled
+    @staticmethod
+    def template_settings(template: "CardTemplate") -> Dict:
+        """Column values a card takes from a card template."""
+        settings = {
+            "spending_limits": template.spending_limits,
+            "category_spending_limits": template.category_spending_limits,
+            "subcategory_spending_limits": template.subcategory_spending_limits,
+            "allowed_merchant_categories": template.allowed_merchant_categories,
+            "blocked_merchant_categories": template.blocked_merchant_categories,
+            "allowed_merchants": template.allowed_merchants,
+            "blocked_merchants": template.blocked_merchants,
+            "allowed_countries": template.allowed_countries,
+            "blocked_countries": template.blocked_countries,
+            "allow_online_transactions": template.allow_online_transactions,
+            "allow_contactless_transactions": template.allow_contactless_transactions,
+            "allow_cash_withdrawals": template.allow_cash_withdrawals,
+            "allow_international_transactions": template.allow_international_transactions,
+            "auto_expiry_enabled": template.auto_expiry_enabled,
+            "auto_renewal_enabled": template.auto_renewal_enabled,
+        }
         
         if template.auto_expiry_enabled and template.auto_expiry_days:
             new_expiry = datetime.utcnow() + timedelta(days=template.auto_expiry_days)
-            self.expiry_month = new_expiry.month
-            self.expiry_year = new_expiry.year
-    
+            settings["expiry_month"] = new_expiry.month
+            settings["expiry_year"] = new_expiry.year
+        return settings
+
+    def apply_template(self, template: "CardTemplate") -> None:
+        """Apply settings from a card template."""
+        for key, value in self.template_settings(template).items():
+            setattr(self, key, value)
+    
+    def clone_values(self) -> Dict:
+        """Column values for a clone of this card, without new card details."""
+        return {
+            "user_id": self.user_id,
+            "card_number": None,  # Will be generated
+            "expiry_month": self.expiry_month,
+            "expiry_year": self.expiry_year,
+            "cvv": None,  # Will be generated
+            "cardholder_name": self.cardholder_name,
+            "currency": self.currency,
+            "spending_limits": self.spending_limits.copy(),
+            "category_spending_limits": self.category_spending_limits.copy(),
+            "subcategory_spending_limits": self.subcategory_spending_limits.copy(),
+            "allowed_merchant_categories": self.allowed_merchant_categories.copy() if self.allowed_merchant_categories else None,
+            "blocked_merchant_categories": self.blocked_merchant_categories.copy() if self.blocked_merchant_categories else None,
+            "allowed_merchants": self.allowed_merchants.copy() if self.allowed_merchants else None,
+            "blocked_merchants": self.blocked_merchants.copy() if self.blocked_merchants else None,
+            "allowed_countries": self.allowed_countries.copy() if self.allowed_countries else None,
+            "blocked_countries": self.blocked_countries.copy() if self.blocked_countries else None,
+            "allow_online_transactions": self.allow_online_transactions,
+            "allow_contactless_transactions": self.allow_contactless_transactions,
+            "allow_cash_withdrawals": self.allow_cash_withdrawals,
+            "allow_international_transactions": self.allow_international_transactions,
+            "template_id": self.template_id,
+            "parent_card_id": self.id,
+            "auto_expiry_enabled": self.auto_expiry_enabled,
+            "auto_renewal_enabled": self.auto_renewal_enabled,
+        }
+
     def clone(self) -> "VirtualCard":
         """Create a clone of this card with the same settings."""
-        clone = VirtualCard(
-            user_id=self.user_id,
-            card_number=None,  # Will be generated
-            expiry_month=self.expiry_month,
-            expiry_year=self.expiry_year,
-            cvv=None,  # Will be generated
-            cardholder_name=self.cardholder_name,
-            currency=self.currency,
-            spending_limits=self.spending_limits.copy(),
-            category_spending_limits=self.category_spending_limits.copy(),
-            subcategory_spending_limits=self.subcategory_spending_limits.copy(),
-            allowed_merchant_categories=self.allowed_merchant_categories.copy() if self.allowed_merchant_categories else None,
-            blocked_merchant_categories=self.blocked_merchant_categories.copy() if self.blocked_merchant_categories else None,
-            allowed_merchants=self.allowed_merchants.copy() if self.allowed_merchants else None,
-            blocked_merchants=self.blocked_merchants.copy() if self.blocked_merchants else None,
-            allowed_countries=self.allowed_countries.copy() if self.allowed_countries else None,
-            blocked_countries=self.blocked_countries.copy() if self.blocked_countries else None,
-            allow_online_transactions=self.allow_online_transactions,
-            allow_contactless_transactions=self.allow_contactless_transactions,
-            allow_cash_withdrawals=self.allow_cash_withdrawals,
-            allow_international_transactions=self.allow_international_transactions,
-            template_id=self.template_id,
-            parent_card_id=self.id,
-            auto_expiry_enabled=self.auto_expiry_enabled,
-            auto_renewal_enabled=self.auto_renewal_enabled
-        )
-        return clone
+        return VirtualCard(**self.clone_values())
     
     def freeze(self, reason: str, duration: Optional[int] = None) -> None:
         """Freeze the card with an optional auto-unfreeze duration in hours."""
@@ -1,9 +1,13 @@
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 class Token(BaseModel):
     access_token: str
     token_type: str
 
 class TokenPayload(BaseModel):
+    # Tokens carry other claims that are not needed here
+    model_config = ConfigDict(extra="ignore")
+
     sub: Optional[int] = None
+    exp: Optional[int] = None
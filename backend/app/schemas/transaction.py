@@ -1,13 +1,12 @@
-from typing import Optional
-from pydantic import BaseModel, condecimal
+from typing import List, Optional
+from pydantic import BaseModel, condecimal, constr
 from datetime import datetime
-from decimal import Decimal
 from app.models.transaction import TransactionType, TransactionStatus
 
 class Location(BaseModel):
-    city: Optional[str] = None
+    city: Optional[constr(max_length=128)] = None
     country: Optional[str] = None
-    postal_code: Optional[str] = None
+    postal_code: Optional[constr(max_length=16)] = None
     latitude: Optional[condecimal(max_digits=9, decimal_places=6)] = None
     longitude: Optional[condecimal(max_digits=9, decimal_places=6)] = None
 
@@ -20,7 +19,7 @@ class TransactionBase(BaseModel):
     # Merchant information
     merchant_name: Optional[str] = None
     merchant_category: Optional[str] = None
-    merchant_id: Optional[str] = None
+    merchant_id: Optional[constr(max_length=64)] = None
     merchant_country: Optional[str] = None
     
     # Transaction characteristics
@@ -54,7 +53,7 @@ class TransactionInDBBase(TransactionBase):
     
     # Risk information
     risk_score: Optional[int] = None
-    risk_factors: Optional[str] = None
+    risk_factors: Optional[List[str]] = None
     
     # Error information
     decline_reason: Optional[str] = None
@@ -65,8 +64,8 @@ class TransactionInDBBase(TransactionBase):
     location_city: Optional[str] = None
     location_country: Optional[str] = None
     location_postal_code: Optional[str] = None
-    location_lat: Optional[Decimal] = None
-    location_lon: Optional[Decimal] = None
+    location_lat: Optional[float] = None
+    location_lon: Optional[float] = None
     
     created_at: datetime
     updated_at: datetime
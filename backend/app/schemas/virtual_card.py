@@ -1,5 +1,5 @@
 from typing import Optional, List, Dict
-from pydantic import BaseModel, condecimal, constr
+from pydantic import BaseModel, ConfigDict, condecimal, constr
 from datetime import datetime
 from decimal import Decimal
 
@@ -60,6 +60,8 @@ class VirtualCardFreeze(BaseModel):
     reason: Optional[str] = None
 
 class VirtualCardInDBBase(VirtualCardBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     user_id: int
     card_number: str
@@ -96,9 +98,6 @@ class VirtualCardInDBBase(VirtualCardBase):
     total_transaction_count: int
     total_spend: Decimal
 
-    class Config:
-        from_attributes = True
-
 class VirtualCard(VirtualCardInDBBase):
     pass
 
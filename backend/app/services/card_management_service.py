@@ -1,13 +1,13 @@
+import asyncio
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 from uuid import uuid4
-from sqlalchemy import select, and_, func
+from sqlalchemy import inspect, insert, select, and_, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload, aliased
 
 from app.models.virtual_card import VirtualCard, CardStatus
 from app.models.card_template import CardTemplate
-from app.services.virtual_card_service import VirtualCardService
 from app.core.stripe import stripe_client
 
 class CardManagementService:
@@ -155,29 +155,57 @@ class CardManagementService:
         if not template:
             raise ValueError("Template not found")
 
-        # Get cards
-        cards = []
+        # One lookup for all requested cards, to report per-card errors
+        result = await db.execute(
+            select(VirtualCard.id, VirtualCard.user_id).where(VirtualCard.id.in_(card_ids))
+        )
+        owners = dict(result.all())
         errors = []
+        valid_ids = []
         for card_id in card_ids:
-            card = await db.get(VirtualCard, card_id)
-            if not card:
+            if card_id not in owners:
                 errors.append({"card_id": card_id, "error": "Card not found"})
-                continue
-            if card.user_id != template.user_id:
+            elif owners[card_id] != template.user_id:
                 errors.append({"card_id": card_id, "error": "Card belongs to different user"})
-                continue
-            
-            try:
-                card.apply_template(template)
-                cards.append(card)
-            except Exception as e:
-                errors.append({"card_id": card_id, "error": str(e)})
+            else:
+                valid_ids.append(card_id)
 
-        if cards:
-            await db.commit()
-        
+        if not valid_ids:
+            return [], errors
+
+        # Then one UPDATE ... RETURNING applies the template to all of them
+        cards, _ = await cls._bulk_update(db, valid_ids, VirtualCard.template_settings(template))
         return cards, errors
 
+    @staticmethod
+    async def _issue_cards(count: int) -> Tuple[List, List[Dict]]:
+        """Issue card details with Stripe concurrently; failures are reported per index."""
+        issued = await asyncio.gather(
+            *(stripe_client.create_virtual_card() for _ in range(count)),
+            return_exceptions=True
+        )
+        stripe_cards = []
+        errors = []
+        for i, stripe_card in enumerate(issued):
+            if isinstance(stripe_card, Exception):
+                errors.append({
+                    "index": i,
+                    "error": str(stripe_card)
+                })
+            else:
+                stripe_cards.append(stripe_card)
+        return stripe_cards, errors
+
+    @staticmethod
+    async def _insert_cards(db: AsyncSession, rows: List[Dict]) -> List[VirtualCard]:
+        """Insert cards with one multi-row INSERT ... RETURNING."""
+        if not rows:
+            return []
+        result = await db.execute(insert(VirtualCard).returning(VirtualCard), rows)
+        cards = result.scalars().all()
+        await db.commit()
+        return cards
+
     @classmethod
     async def bulk_create_cards(
         cls,
@@ -190,8 +218,6 @@ class CardManagementService:
     ) -> Tuple[List[VirtualCard], List[Dict]]:
         """Create multiple cards in bulk."""
         batch_id = str(uuid4())
-        cards = []
-        errors = []
 
         # Get template if provided
         template = None
@@ -200,35 +226,29 @@ class CardManagementService:
             if not template or template.user_id != user_id:
                 raise ValueError("Invalid template")
 
-        for i in range(count):
-            try:
-                # Create card
-                card = await VirtualCardService.create_card(
-                    db=db,
-                    user_id=user_id,
-                    name=f"{base_name} {i+1}",
-                    **card_settings
-                )
-                
-                # Apply template if provided
-                if template:
-                    card.apply_template(template)
-                
-                card.batch_id = batch_id
-                cards.append(card)
-                
-            except Exception as e:
-                errors.append({
-                    "index": i,
-                    "error": str(e)
-                })
-
-        if cards:
-            await db.commit()
-            for card in cards:
-                await db.refresh(card)
+        # VirtualCard has no name column, so base_name is not stored
+        shared_values = {
+            "user_id": user_id,
+            "batch_id": batch_id,
+            **{key: value for key, value in card_settings.items() if value is not None},
+            **(VirtualCard.template_settings(template) if template else {}),
+        }
 
-        return cards, errors
+        stripe_cards, errors = await cls._issue_cards(count)
+        rows = [
+            {
+                "card_number": stripe_card.number,
+                "cvv": stripe_card.cvv,
+                "stripe_card_id": stripe_card.id,
+                "expiry_month": stripe_card.exp_month,
+                "expiry_year": stripe_card.exp_year,
+                # Template expiry, when set, overrides the issued one
+                **shared_values,
+            }
+            for stripe_card in stripe_cards
+        ]
+
+        return await cls._insert_cards(db, rows), errors
 
     @classmethod
     async def clone_card(
@@ -244,38 +264,53 @@ class CardManagementService:
         if not source_card:
             raise ValueError("Source card not found")
 
-        batch_id = str(uuid4())
-        clones = []
-        errors = []
+        # VirtualCard has no name column, so name_prefix is not stored
+        clone_values = {**source_card.clone_values(), "batch_id": str(uuid4())}
+        stripe_cards, errors = await cls._issue_cards(count)
+        rows = [
+            {
+                **clone_values,
+                "card_number": stripe_card.number,
+                "cvv": stripe_card.cvv,
+                "stripe_card_id": stripe_card.id,
+            }
+            for stripe_card in stripe_cards
+        ]
+
+        return await cls._insert_cards(db, rows), errors
+
+    @staticmethod
+    def _missing_card_errors(card_ids: List[int], cards: List[VirtualCard]) -> List[Dict]:
+        """Errors for requested ids that matched no card."""
+        found_ids = {card.id for card in cards}
+        return [
+            {"card_id": card_id, "error": "Card not found"}
+            for card_id in card_ids
+            if card_id not in found_ids
+        ]
 
-        for i in range(count):
-            try:
-                clone = source_card.clone()
-                if name_prefix:
-                    clone.name = f"{name_prefix} {i+1}"
-                clone.batch_id = batch_id
-                
-                # Generate new card details via Stripe
-                stripe_card = await stripe_client.create_virtual_card()
-                clone.card_number = stripe_card.number
-                clone.cvv = stripe_card.cvv
-                clone.stripe_card_id = stripe_card.id
-                
-                db.add(clone)
-                clones.append(clone)
-                
-            except Exception as e:
-                errors.append({
-                    "index": i,
-                    "error": str(e)
-                })
-
-        if clones:
-            await db.commit()
-            for clone in clones:
-                await db.refresh(clone)
-
-        return clones, errors
+    @classmethod
+    async def _bulk_update(
+        cls,
+        db: AsyncSession,
+        card_ids: List[int],
+        values: Dict
+    ) -> Tuple[List[VirtualCard], List[Dict]]:
+        """
+        Apply the same column values to many cards in one UPDATE ... RETURNING.
+
+        Ids that match no card are reported as errors, like a per-card lookup.
+        """
+        result = await db.execute(
+            update(VirtualCard)
+            .where(VirtualCard.id.in_(card_ids))
+            .values(**values)
+            .returning(VirtualCard)
+            .execution_options(populate_existing=True)
+        )
+        cards = result.scalars().all()
+        await db.commit()
+        return cards, cls._missing_card_errors(card_ids, cards)
 
     @classmethod
     async def bulk_update_cards(
@@ -285,34 +320,15 @@ class CardManagementService:
         updates: Dict
     ) -> Tuple[List[VirtualCard], List[Dict]]:
         """Update multiple cards with the same settings."""
-        cards = []
-        errors = []
+        # Only mapped columns can be set; other keys are ignored
+        columns = inspect(VirtualCard).columns.keys()
+        values = {key: value for key, value in updates.items() if key in columns}
+        if not values:
+            result = await db.execute(select(VirtualCard).where(VirtualCard.id.in_(card_ids)))
+            cards = result.scalars().all()
+            return cards, cls._missing_card_errors(card_ids, cards)
 
-        for card_id in card_ids:
-            try:
-                card = await db.get(VirtualCard, card_id)
-                if not card:
-                    raise ValueError("Card not found")
-                
-                # Apply updates
-                for key, value in updates.items():
-                    if hasattr(card, key):
-                        setattr(card, key, value)
-                
-                cards.append(card)
-                
-            except Exception as e:
-                errors.append({
-                    "card_id": card_id,
-                    "error": str(e)
-                })
-
-        if cards:
-            await db.commit()
-            for card in cards:
-                await db.refresh(card)
-
-        return cards, errors
+        return await cls._bulk_update(db, card_ids, values)
 
     @classmethod
     async def bulk_freeze_cards(
@@ -323,30 +339,12 @@ class CardManagementService:
         duration: Optional[int] = None
     ) -> Tuple[List[VirtualCard], List[Dict]]:
         """Freeze multiple cards."""
-        cards = []
-        errors = []
+        # Same effect as VirtualCard.freeze, for every card at once
+        values = {"status": CardStatus.FROZEN, "freeze_reason": reason}
+        if duration:
+            values["auto_unfreeze_at"] = datetime.utcnow() + timedelta(hours=duration)
 
-        for card_id in card_ids:
-            try:
-                card = await db.get(VirtualCard, card_id)
-                if not card:
-                    raise ValueError("Card not found")
-                
-                card.freeze(reason, duration)
-                cards.append(card)
-                
-            except Exception as e:
-                errors.append({
-                    "card_id": card_id,
-                    "error": str(e)
-                })
-
-        if cards:
-            await db.commit()
-            for card in cards:
-                await db.refresh(card)
-
-        return cards, errors
+        return await cls._bulk_update(db, card_ids, values)
 
     @classmethod
     async def process_auto_unfreezes(
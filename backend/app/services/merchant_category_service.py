@@ -208,3 +208,18 @@ class MerchantCategoryService:
                 break
         
         return hierarchy
+
+    @classmethod
+    async def get_category_descendants(
+        cls,
+        db: AsyncSession,
+        category: MerchantCategory
+    ) -> List[MerchantCategory]:
+        """Get every category below the given one, served by the ltree GiST index."""
+        result = await db.execute(
+            select(MerchantCategory).where(
+                MerchantCategory.path.op("<@")(category.path),
+                MerchantCategory.id != category.id
+            ).order_by(MerchantCategory.path)
+        )
+        return list(result.scalars().all())
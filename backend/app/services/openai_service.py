@@ -5,6 +5,7 @@ from openai import AsyncOpenAI, OpenAIError
 from fastapi import HTTPException, status
 
 from app.core.config import settings
+from app.core.http_client import http_client
 from app.models.ai_agent import AIAgent
 from app.schemas.ai_agent import AgentCreate, AgentUpdate
 
@@ -13,7 +14,10 @@ logger = logging.getLogger(__name__)
 
 class OpenAIService:
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY.get_secret_value(),
+            http_client=http_client
+        )
         self.model = settings.OPENAI_MODEL_NAME
         
     async def register_assistant(self, agent_data: AgentCreate) -> str:
@@ -1,7 +1,8 @@
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from typing import Dict, List, Optional, Tuple, Any
-from sqlalchemy import func, and_, or_, desc
+from sqlalchemy import JSON, DateTime, Integer, column, func, and_, or_, desc, values
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
@@ -48,57 +49,63 @@ class SpendingAnalyticsService:
         """Get spending summary for a user or specific card."""
         start_date, end_date = cls._get_date_range(period, end_date)
         
-        # Base query for completed transactions
-        query = (
-            select(
-                func.count(Transaction.id).label("transaction_count"),
-                func.sum(Transaction.amount).label("total_spend"),
-                func.avg(Transaction.amount).label("average_transaction"),
-                func.min(Transaction.amount).label("smallest_transaction"),
-                func.max(Transaction.amount).label("largest_transaction"),
-            )
-            .where(
-                and_(
-                    Transaction.user_id == user_id,
-                    Transaction.status == TransactionStatus.COMPLETED,
-                    Transaction.type == TransactionType.PURCHASE,
-                    Transaction.created_at.between(start_date, end_date)
-                )
-            )
-        )
-        
+        conditions = [
+            Transaction.user_id == user_id,
+            Transaction.status == TransactionStatus.COMPLETED,
+            Transaction.type == TransactionType.PURCHASE,
+            Transaction.created_at.between(start_date, end_date)
+        ]
         if card_id:
-            query = query.where(Transaction.virtual_card_id == card_id)
-            
-        result = await db.execute(query)
-        stats = result.mappings().first()
-        
-        # Get category breakdown
-        category_query = (
+            conditions.append(Transaction.virtual_card_id == card_id)
+
+        # Completed purchases in the period, selected once and shared by the
+        # summary stats and the category breakdown
+        base = (
+            select(Transaction.id, Transaction.amount, Transaction.merchant_category)
+            .where(and_(*conditions))
+            .cte("base")
+        )
+
+        # Category breakdown, built into a JSON array by the database
+        by_category = (
             select(
                 MerchantCategory.code,
                 MerchantCategory.name,
-                func.count(Transaction.id).label("transaction_count"),
-                func.sum(Transaction.amount).label("total_spend"),
-            )
-            .join(Transaction, Transaction.merchant_category == MerchantCategory.code)
-            .where(
-                and_(
-                    Transaction.user_id == user_id,
-                    Transaction.status == TransactionStatus.COMPLETED,
-                    Transaction.type == TransactionType.PURCHASE,
-                    Transaction.created_at.between(start_date, end_date)
-                )
+                func.count(base.c.id).label("transaction_count"),
+                func.sum(base.c.amount).label("total_spend"),
             )
+            .join(base, base.c.merchant_category == MerchantCategory.code)
             .group_by(MerchantCategory.code, MerchantCategory.name)
-            .order_by(desc("total_spend"))
+            .subquery("by_category")
         )
-        
-        if card_id:
-            category_query = category_query.where(Transaction.virtual_card_id == card_id)
-            
-        category_result = await db.execute(category_query)
-        categories = category_result.mappings().all()
+        category_json = select(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(
+                        "code", by_category.c.code,
+                        "name", by_category.c.name,
+                        "transaction_count", by_category.c.transaction_count,
+                        "total_spend", by_category.c.total_spend
+                    ),
+                    by_category.c.total_spend.desc()
+                ),
+                type_=JSON
+            )
+        ).scalar_subquery()
+
+        # One round trip for both the summary and the breakdown
+        query = select(
+            func.count(base.c.id).label("transaction_count"),
+            func.sum(base.c.amount).label("total_spend"),
+            func.avg(base.c.amount).label("average_transaction"),
+            func.min(base.c.amount).label("smallest_transaction"),
+            func.max(base.c.amount).label("largest_transaction"),
+            category_json.label("categories"),
+        ).select_from(base)
+
+        result = await db.execute(query)
+        stats = result.mappings().first()
+        categories = stats["categories"] or []
         
         # Calculate percentages for category breakdown
         total_spend = Decimal(str(stats["total_spend"] or 0))
@@ -142,41 +149,12 @@ class SpendingAnalyticsService:
         if end_date is None:
             end_date = datetime.now(timezone.utc)
             
-        trends = []
+        # Period boundaries, newest first
+        periods = []
         current_end = end_date
-        
         for _ in range(num_periods):
-            period_start, period_end = cls._get_date_range(period, current_end)
-            
-            # Get spending for this period
-            query = (
-                select(
-                    func.count(Transaction.id).label("transaction_count"),
-                    func.sum(Transaction.amount).label("total_spend"),
-                )
-                .where(
-                    and_(
-                        Transaction.user_id == user_id,
-                        Transaction.status == TransactionStatus.COMPLETED,
-                        Transaction.type == TransactionType.PURCHASE,
-                        Transaction.created_at.between(period_start, period_end)
-                    )
-                )
-            )
-            
-            if card_id:
-                query = query.where(Transaction.virtual_card_id == card_id)
-                
-            result = await db.execute(query)
-            stats = result.mappings().first()
-            
-            trends.append({
-                "period_start": period_start.isoformat(),
-                "period_end": period_end.isoformat(),
-                "transaction_count": stats["transaction_count"] or 0,
-                "total_spend": float(stats["total_spend"] or 0)
-            })
-            
+            periods.append(cls._get_date_range(period, current_end))
+
             # Move to previous period
             if period == "daily":
                 current_end = current_end - timedelta(days=1)
@@ -186,7 +164,50 @@ class SpendingAnalyticsService:
                 current_end = (current_end.replace(day=1) - timedelta(days=1))
             elif period == "yearly":
                 current_end = current_end.replace(year=current_end.year - 1)
-                
+
+        # Every period is aggregated in one GROUP BY instead of a query each;
+        # the outer join keeps periods without purchases in the result
+        bounds = (
+            values(
+                column("idx", Integer),
+                column("period_start", DateTime(timezone=True)),
+                column("period_end", DateTime(timezone=True)),
+                name="periods"
+            )
+            .data([(idx, start, end) for idx, (start, end) in enumerate(periods)])
+        )
+        join_conditions = [
+            Transaction.user_id == user_id,
+            Transaction.status == TransactionStatus.COMPLETED,
+            Transaction.type == TransactionType.PURCHASE,
+            Transaction.created_at.between(bounds.c.period_start, bounds.c.period_end)
+        ]
+        if card_id:
+            join_conditions.append(Transaction.virtual_card_id == card_id)
+
+        query = (
+            select(
+                bounds.c.idx,
+                func.count(Transaction.id).label("transaction_count"),
+                func.sum(Transaction.amount).label("total_spend"),
+            )
+            .select_from(bounds)
+            .outerjoin(Transaction, and_(*join_conditions))
+            .group_by(bounds.c.idx)
+        )
+        result = await db.execute(query)
+        stats_by_period = {row["idx"]: row for row in result.mappings().all()}
+
+        trends = []
+        for idx, (period_start, period_end) in enumerate(periods):
+            stats = stats_by_period.get(idx, {})
+            trends.append({
+                "period_start": period_start.isoformat(),
+                "period_end": period_end.isoformat(),
+                "transaction_count": stats.get("transaction_count") or 0,
+                "total_spend": float(stats.get("total_spend") or 0)
+            })
+
         return {
             "period": period,
             "num_periods": num_periods,
@@ -3,9 +3,11 @@ from decimal import Decimal
 from typing import Dict, Optional, Tuple
 
 from fastapi import HTTPException, status
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.crud.crud_virtual_card import virtual_card
+from app.db.database import AsyncSessionLocal
+from app.models.transaction import Transaction
 from app.models.virtual_card import VirtualCard, CardStatus, SpendingLimitPeriod
 from app.services.merchant_category_service import MerchantCategoryService
 
@@ -312,14 +314,26 @@ class VirtualCardService:
     ) -> VirtualCard:
         """Update card spending statistics after a transaction."""
         now = datetime.now(timezone.utc)
-        update_data = {
-            "total_spend": float(Decimal(str(card.total_spend)) + amount) if success else card.total_spend,
-            "total_transaction_count": card.total_transaction_count + (1 if success else 0),
-            "failed_transaction_count": card.failed_transaction_count + (0 if success else 1),
-            "last_transaction_at": now,
-        }
+        # Counters are incremented in SQL, so concurrent transactions on the card don't lose updates
+        update_data = {"last_transaction_at": now}
+        if success:
+            update_data["total_spend"] = VirtualCard.total_spend + amount
+            update_data["total_transaction_count"] = VirtualCard.total_transaction_count + 1
+        else:
+            update_data["failed_transaction_count"] = VirtualCard.failed_transaction_count + 1
 
         if success:
+            # The period spend JSON is recomputed in Python and written back
+            # whole, so re-read the card under a row lock first; a concurrent
+            # purchase then waits and builds on this one's totals
+            result = await db.execute(
+                select(VirtualCard)
+                .where(VirtualCard.id == card.id)
+                .with_for_update()
+                .execution_options(populate_existing=True)
+            )
+            card = result.scalar_one()
+
             # Update overall spending limits
             if card.spending_limits:
                 current_spend = card.current_spend or {}
@@ -418,4 +432,32 @@ class VirtualCardService:
                     update_data["subcategory_current_spend"] = card.subcategory_current_spend | {merchant_category: subcategory_spend}
                     update_data["subcategory_transaction_counts"] = subcategory_transaction_counts
 
-        return await virtual_card.update(db, db_obj=card, obj_in=update_data)
+        result = await db.execute(
+            update(VirtualCard)
+            .where(VirtualCard.id == card.id)
+            .values(**update_data)
+            .returning(VirtualCard)
+            .execution_options(populate_existing=True)
+        )
+        card = result.scalar_one()
+        await db.commit()
+        return card
+
+    @staticmethod
+    async def record_declined_transaction(transaction_data: Dict, card_id: int) -> None:
+        """
+        Store a declined transaction and count the failure on its card.
+
+        Meant to run as a background task after the rejection has been sent, so
+        it opens its own session and writes both rows in one transaction.
+        """
+        async with AsyncSessionLocal() as db, db.begin():
+            db.add(Transaction(**transaction_data))
+            await db.execute(
+                update(VirtualCard)
+                .where(VirtualCard.id == card_id)
+                .values(
+                    failed_transaction_count=VirtualCard.failed_transaction_count + 1,
+                    last_transaction_at=datetime.now(timezone.utc)
+                )
+            )
@@ -0,0 +1,23 @@
+import os
+
+import pytest
+import pytest_asyncio
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+# A scratch database; every test using the redis fixture starts from FLUSHDB
+TEST_REDIS_URL = os.environ.get("TEST_REDIS_URL", "redis://localhost:6379/15")
+
+@pytest_asyncio.fixture
+async def redis():
+    """Redis client on the scratch database, skipping the test if no server is up."""
+    client = Redis.from_url(TEST_REDIS_URL, decode_responses=True)
+    try:
+        await client.ping()
+    except RedisConnectionError:
+        await client.aclose()
+        pytest.skip(f"Redis is not available at {TEST_REDIS_URL}")
+    await client.flushdb()
+    yield client
+    await client.flushdb()
+    await client.aclose()
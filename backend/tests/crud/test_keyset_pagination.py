@@ -0,0 +1,73 @@
+import pytest
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.base import decode_cursor, encode_cursor
+from app.crud.crud_payment_method import payment_method
+from app.models.payment_method import PaymentMethod
+from app.models.user import User
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 2, 13, 10, 30, 15, 123456)
+    cursor = encode_cursor(created_at, 42)
+
+    assert decode_cursor(cursor) == (created_at, 42)
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor(datetime(2025, 2, 13, 10, 30), 7)
+
+    assert all(c.isalnum() or c in "-_=" for c in cursor)
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", "bm8tc2VwYXJhdG9y"])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+@pytest.fixture
+async def user_with_methods(db: AsyncSession):
+    """User with five payment methods sharing one created_at"""
+    user = User(email="pager@example.com", hashed_password="x", is_active=True)
+    db.add(user)
+    await db.commit()
+
+    created_at = datetime(2025, 2, 13, 12, 0, 0)
+    for i in range(5):
+        db.add(PaymentMethod(
+            user_id=user.id,
+            type="credit_card",
+            provider="stripe",
+            provider_payment_id=f"pm_pager_{i}",
+            created_at=created_at
+        ))
+    await db.commit()
+    return user
+
+@pytest.mark.asyncio
+async def test_pages_across_equal_created_at(db: AsyncSession, user_with_methods):
+    seen = []
+    after = None
+    while True:
+        records, after = await payment_method.get_page_by_user(
+            db, user_id=user_with_methods.id, after=after, limit=2
+        )
+        seen.extend(record.id for record in records)
+        if after is None:
+            break
+
+    # Ties on created_at are broken by id, so no row is skipped or repeated
+    assert len(seen) == 5
+    assert seen == sorted(seen, reverse=True)
+
+@pytest.mark.asyncio
+async def test_exact_final_page_returns_empty_page_without_cursor(db: AsyncSession, user_with_methods):
+    records, after = await payment_method.get_page_by_user(
+        db, user_id=user_with_methods.id, limit=5
+    )
+    assert len(records) == 5
+    assert after is not None
+
+    records, after = await payment_method.get_page_by_user(
+        db, user_id=user_with_methods.id, after=after, limit=5
+    )
+    assert records == []
+    assert after is None
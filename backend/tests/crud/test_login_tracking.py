@@ -0,0 +1,58 @@
+import pytest
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.crud_user import user as crud_user
+from app.models.user import User
+
+@pytest.fixture
+async def account(db: AsyncSession):
+    account = User(email="lockout@example.com", hashed_password="x", is_active=True)
+    db.add(account)
+    await db.commit()
+    return account
+
+@pytest.mark.asyncio
+async def test_failures_below_limit_do_not_lock(db: AsyncSession, account):
+    for _ in range(settings.MAX_LOGIN_ATTEMPTS - 1):
+        assert await crud_user.record_failed_login(db, db_obj=account) is None
+
+    await db.refresh(account)
+    assert account.failed_login_attempts == settings.MAX_LOGIN_ATTEMPTS - 1
+    assert account.locked_until is None
+
+@pytest.mark.asyncio
+async def test_reaching_limit_locks_account(db: AsyncSession, account):
+    for _ in range(settings.MAX_LOGIN_ATTEMPTS - 1):
+        await crud_user.record_failed_login(db, db_obj=account)
+
+    locked_until = await crud_user.record_failed_login(db, db_obj=account)
+
+    assert locked_until is not None
+    assert locked_until > datetime.utcnow()
+    await db.refresh(account)
+    assert account.failed_login_attempts == settings.MAX_LOGIN_ATTEMPTS
+    assert account.locked_until == locked_until
+
+@pytest.mark.asyncio
+async def test_counter_starts_from_null(db: AsyncSession, account):
+    account.failed_login_attempts = None
+    await db.commit()
+
+    await crud_user.record_failed_login(db, db_obj=account)
+
+    await db.refresh(account)
+    assert account.failed_login_attempts == 1
+
+@pytest.mark.asyncio
+async def test_successful_login_resets_counter_and_lock(db: AsyncSession, account):
+    for _ in range(settings.MAX_LOGIN_ATTEMPTS):
+        await crud_user.record_failed_login(db, db_obj=account)
+
+    await crud_user.record_successful_login(db, db_obj=account)
+
+    await db.refresh(account)
+    assert account.failed_login_attempts == 0
+    assert account.locked_until is None
+    assert account.last_login is not None
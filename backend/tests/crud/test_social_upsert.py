@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import UNUSABLE_PASSWORD
+from app.crud.crud_user import user as crud_user
+from app.models.user import User
+
+SOCIAL_DATA = {"social_provider": "github", "social_id": "42"}
+NEW_USER_DATA = {
+    "full_name": "Social User",
+    "is_active": True,
+    "email_verified": True,
+    "hashed_password": UNUSABLE_PASSWORD,
+}
+
+@pytest.mark.asyncio
+async def test_new_social_user_has_no_usable_password(db: AsyncSession):
+    created = await crud_user.upsert_social(
+        db, email="social@example.com", social_data=SOCIAL_DATA, new_user_data=NEW_USER_DATA
+    )
+
+    assert created.hashed_password == UNUSABLE_PASSWORD
+    assert await crud_user.authenticate(db, email="social@example.com", password=UNUSABLE_PASSWORD) is None
+
+@pytest.mark.asyncio
+async def test_existing_user_keeps_password_hash(db: AsyncSession):
+    existing = User(email="linked@example.com", hashed_password="$2b$12$existing", full_name="Kept")
+    db.add(existing)
+    await db.commit()
+
+    linked = await crud_user.upsert_social(
+        db, email="linked@example.com", social_data=SOCIAL_DATA, new_user_data=NEW_USER_DATA
+    )
+
+    assert linked.id == existing.id
+    assert linked.hashed_password == "$2b$12$existing"
+    assert linked.full_name == "Kept"
+    assert linked.social_provider == "github"
@@ -0,0 +1,92 @@
+import pytest
+from decimal import Decimal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.crud_virtual_card import CARD_NOT_FOUND, virtual_card
+from app.models.user import User
+from app.models.virtual_card import CardStatus, VirtualCard
+
+@pytest.fixture
+async def owner(db: AsyncSession):
+    user = User(email="debit-owner@example.com", hashed_password="x", is_active=True)
+    db.add(user)
+    await db.commit()
+    return user
+
+@pytest.fixture
+async def card(db: AsyncSession, owner):
+    card = VirtualCard(
+        user_id=owner.id,
+        card_number="4000000000000002",
+        expiry_month=12,
+        expiry_year=2030,
+        cvv="123",
+        cardholder_name="Debit Owner",
+        balance=Decimal("100.00"),
+        status=CardStatus.ACTIVE
+    )
+    db.add(card)
+    await db.commit()
+    return card
+
+async def balance_of(db: AsyncSession, card: VirtualCard) -> Decimal:
+    await db.refresh(card)
+    return card.balance
+
+@pytest.mark.asyncio
+async def test_debit_within_balance(db: AsyncSession, owner, card):
+    debited, reason = await virtual_card.try_debit(
+        db, card_id=card.id, user_id=owner.id, amount=Decimal("40.00")
+    )
+    await db.commit()
+
+    assert reason is None
+    assert debited.balance == Decimal("60.00")
+    assert await balance_of(db, card) == Decimal("60.00")
+
+@pytest.mark.asyncio
+async def test_debits_cannot_overdraw(db: AsyncSession, owner, card):
+    first, _ = await virtual_card.try_debit(
+        db, card_id=card.id, user_id=owner.id, amount=Decimal("60.00")
+    )
+    second, reason = await virtual_card.try_debit(
+        db, card_id=card.id, user_id=owner.id, amount=Decimal("60.00")
+    )
+    await db.commit()
+
+    assert first is not None
+    assert second is None
+    assert reason == "Insufficient funds"
+    assert await balance_of(db, card) == Decimal("40.00")
+
+@pytest.mark.asyncio
+async def test_inactive_card_is_not_debited(db: AsyncSession, owner, card):
+    card.status = CardStatus.FROZEN
+    await db.commit()
+
+    debited, reason = await virtual_card.try_debit(
+        db, card_id=card.id, user_id=owner.id, amount=Decimal("10.00")
+    )
+
+    assert debited is None
+    assert reason == "Card is frozen"
+    assert await balance_of(db, card) == Decimal("100.00")
+
+@pytest.mark.asyncio
+async def test_other_users_card_reads_as_not_found(db: AsyncSession, owner, card):
+    debited, reason = await virtual_card.try_debit(
+        db, card_id=card.id, user_id=owner.id + 1, amount=Decimal("10.00")
+    )
+
+    assert debited is None
+    assert reason == CARD_NOT_FOUND
+    assert await balance_of(db, card) == Decimal("100.00")
+
+@pytest.mark.asyncio
+async def test_missing_card(db: AsyncSession, owner):
+    debited, reason = await virtual_card.try_debit(
+        db, card_id=999_999, user_id=owner.id, amount=Decimal("10.00")
+    )
+
+    assert debited is None
+    assert reason == CARD_NOT_FOUND
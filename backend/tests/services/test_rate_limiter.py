@@ -0,0 +1,118 @@
+import pytest
+
+from app.core import rate_limiter
+from app.core.rate_limiter import RateLimiter
+
+WINDOW_MS = 60_000
+# 15s into fixed window 100, so 45s of window 99 still overlaps the sliding window
+NOW_MS = 100 * WINDOW_MS + 15_000
+
+async def run_sliding(limiter: RateLimiter, key: str, now_ms: int, limit: int):
+    bucket = now_ms // WINDOW_MS
+    return await limiter._run_script(
+        "rate_limiter",
+        [f"{key}:{bucket}", f"{key}:{bucket - 1}"],
+        [now_ms, WINDOW_MS, limit]
+    )
+
+async def run_exact(limiter: RateLimiter, key: str, now_ms: int, window_ms: int, limit: int, member: str):
+    return await limiter._run_script(
+        "rate_limiter_exact",
+        [key],
+        [now_ms, window_ms, limit, member]
+    )
+
+@pytest.fixture
+def freeze_time(monkeypatch):
+    def freeze(seconds: float):
+        monkeypatch.setattr(rate_limiter.time, "time", lambda: seconds)
+    return freeze
+
+@pytest.mark.asyncio
+async def test_sliding_window_weights_previous_window(redis):
+    limiter = RateLimiter(redis)
+    key = "ratelimit:test:client"
+    await redis.set(f"{key}:99", 10)
+
+    # 10 previous requests weigh 10 * 45/60 = 7.5
+    results = [await run_sliding(limiter, key, NOW_MS, 10) for _ in range(4)]
+
+    assert results[:3] == [[1, 8, 0], [1, 9, 0], [1, 10, 0]]
+    # 7.5 + 3 reaches the limit; retry once the fixed window rolls over
+    assert results[3] == [0, 10, 45_000]
+    assert int(await redis.get(f"{key}:100")) == 3
+
+@pytest.mark.asyncio
+async def test_sliding_window_previous_window_fades_out(redis):
+    limiter = RateLimiter(redis)
+    key = "ratelimit:test:client"
+    await redis.set(f"{key}:99", 10)
+
+    # 1ms before window 100 ends almost nothing of window 99 overlaps
+    allowed, count, retry_after_ms = await run_sliding(limiter, key, 101 * WINDOW_MS - 1, 10)
+
+    assert (allowed, count, retry_after_ms) == (1, 1, 0)
+
+@pytest.mark.asyncio
+async def test_sliding_window_counter_outlives_its_window(redis):
+    limiter = RateLimiter(redis)
+    key = "ratelimit:test:client"
+
+    await run_sliding(limiter, key, NOW_MS, 10)
+
+    # Still needed as the previous counter during the next window
+    assert WINDOW_MS < await redis.pttl(f"{key}:100") <= 2 * WINDOW_MS
+
+@pytest.mark.asyncio
+async def test_sliding_window_retry_after_seconds(redis, freeze_time):
+    limiter = RateLimiter(redis)
+    freeze_time(NOW_MS / 1000)
+
+    results = [
+        await limiter._check_sliding_window("ratelimit:test:client", 2, 60, 1.0)
+        for _ in range(3)
+    ]
+
+    assert results == [(False, None), (False, None), (True, 45)]
+
+@pytest.mark.asyncio
+async def test_sliding_window_burst_multiplier_raises_limit(redis, freeze_time):
+    limiter = RateLimiter(redis)
+    freeze_time(NOW_MS / 1000)
+
+    results = [
+        await limiter._check_sliding_window("ratelimit:test:client", 2, 60, 1.5)
+        for _ in range(4)
+    ]
+
+    assert [limited for limited, _ in results] == [False, False, False, True]
+
+@pytest.mark.asyncio
+async def test_exact_window_counts_and_expires_entries(redis):
+    limiter = RateLimiter(redis)
+    key = "ratelimit:login:client"
+
+    results = [
+        await run_exact(limiter, key, now_ms, 1000, 3, f"m{now_ms}")
+        for now_ms in (1000, 1100, 1200, 1300)
+    ]
+
+    assert results[:3] == [[1, 1, 0], [1, 2, 0], [1, 3, 0]]
+    # Denied requests are not recorded; the oldest entry sets the retry time
+    assert results[3] == [0, 3, 1000]
+    assert await redis.zcard(key) == 3
+
+    # Once the entry at 1000 leaves the window there is room again
+    assert await run_exact(limiter, key, 2001, 1000, 3, "m2001") == [1, 3, 0]
+
+@pytest.mark.asyncio
+async def test_exact_window_counts_requests_in_the_same_millisecond(redis, freeze_time):
+    limiter = RateLimiter(redis)
+    freeze_time(5.0)
+
+    results = [
+        await limiter._check_sliding_window("ratelimit:login:client", 3, 1, 1.0, exact=True)
+        for _ in range(4)
+    ]
+
+    assert results == [(False, None), (False, None), (False, None), (True, 1)]
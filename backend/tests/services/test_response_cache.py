@@ -0,0 +1,86 @@
+import pytest
+from types import SimpleNamespace
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+from app.core import cache
+from app.core.cache import PERIOD_CACHE_TTLS, cached, invalidate_user_cache, period_ttl
+
+@pytest.fixture
+def cache_redis(redis, monkeypatch):
+    monkeypatch.setattr(cache, "redis_client", redis)
+    return redis
+
+@pytest.fixture
+def route():
+    calls = []
+
+    @cached("test:route", "period", expire=period_ttl)
+    async def handler(period: str, current_user):
+        calls.append((current_user.id, period))
+        return {"period": period, "call": len(calls)}
+
+    handler.calls = calls
+    return handler
+
+def user(id: int):
+    return SimpleNamespace(id=id)
+
+@pytest.mark.asyncio
+async def test_hit_returns_stored_body_without_calling_route(cache_redis, route):
+    first = await route(period="monthly", current_user=user(1))
+    second = await route(period="monthly", current_user=user(1))
+
+    assert first == {"period": "monthly", "call": 1}
+    assert orjson.loads(second.body) == first
+    assert second.media_type == "application/json"
+    assert len(route.calls) == 1
+
+@pytest.mark.asyncio
+async def test_key_covers_user_and_params(cache_redis, route):
+    await route(period="monthly", current_user=user(1))
+    await route(period="weekly", current_user=user(1))
+    await route(period="monthly", current_user=user(2))
+
+    assert route.calls == [(1, "monthly"), (1, "weekly"), (2, "monthly")]
+
+@pytest.mark.asyncio
+async def test_ttl_follows_period(cache_redis, route):
+    await route(period="daily", current_user=user(1))
+    await route(period="yearly", current_user=user(1))
+
+    assert 0 < await cache_redis.ttl("test:route:1:daily") <= PERIOD_CACHE_TTLS["daily"]
+    assert PERIOD_CACHE_TTLS["monthly"] < await cache_redis.ttl("test:route:1:yearly") <= PERIOD_CACHE_TTLS["yearly"]
+
+@pytest.mark.asyncio
+async def test_invalidation_drops_only_that_users_entries(cache_redis, route):
+    await route(period="monthly", current_user=user(1))
+    await route(period="weekly", current_user=user(1))
+    await route(period="monthly", current_user=user(2))
+
+    await invalidate_user_cache(1)
+    await route(period="monthly", current_user=user(1))
+    await route(period="monthly", current_user=user(2))
+
+    assert route.calls == [(1, "monthly"), (1, "weekly"), (2, "monthly"), (1, "monthly")]
+    assert not await cache_redis.exists("test:route:1:weekly")
+
+@pytest.mark.asyncio
+async def test_key_set_outlives_every_entry(cache_redis, route):
+    await route(period="yearly", current_user=user(1))
+    # A shorter-lived entry must not shorten the set tracking the longer one
+    await route(period="daily", current_user=user(1))
+
+    assert await cache_redis.ttl("cache:keys:1") >= await cache_redis.ttl("test:route:1:yearly")
+
+@pytest.mark.asyncio
+async def test_rendered_responses_are_cached_by_body(cache_redis):
+    @cached("test:rendered", expire=60)
+    async def handler(current_user_id: int):
+        return ORJSONResponse({"user": current_user_id})
+
+    await handler(current_user_id=7)
+    hit = await handler(current_user_id=7)
+
+    assert orjson.loads(hit.body) == {"user": 7}